@@ -1,53 +1,83 @@
-from flask import Flask
-import os
-from .config import Config
-from flask_cors import CORS
-
-def create_app(config_class=Config):
-    from .extension import db, bcrypt, migrate, mail, celery, cache
-    app = Flask(__name__)
-    app.config.from_object(config_class)
-
-    # Initialize extensions
-    CORS(app)
-    db.init_app(app)
-    bcrypt.init_app(app)
-    mail.init_app(app)
-    migrate.init_app(app, db)
-    cache.init_app(app)
-    
-    celery.conf.update(
-        broker_url=Config.broker_url,
-        result_backend=Config.result_backend
-    )
-    celery.conf.beat_schedule = Config.CELERY_BEAT_SCHEDULE
-    class ContextTask(celery.Task):
-        def __call__(self, *args, **kwargs):
-            with app.app_context():
-                return self.run(*args, **kwargs)
-    celery.Task = ContextTask
-
-    # Register blueprints
-    from .controllers.auth import auth_bp
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    from .controllers.admin import admin_bp
-    app.register_blueprint(admin_bp, url_prefix='/api/admin')
-    from .controllers.student import student_bp
-    app.register_blueprint(student_bp, url_prefix='/api/student')
-
-    with app.app_context():
-        from . import models
-        db.create_all()
-        admin = models.Admin.query.get(1)
-        if not admin:
-            admin = models.Admin(
-                AdminID=1,
-                Name=os.getenv('Admin_Username'),
-                Email=os.getenv('Admin_Email'),
-            )
-            password = os.getenv('Admin_Password')
-            admin.set_password(password)
-            db.session.add(admin)
-            db.session.commit()
-
+from flask import Flask
+import os
+from sqlalchemy.exc import IntegrityError
+from .config import Config
+from flask_cors import CORS
+
+def create_app(config_class=Config):
+    from .extension import db, bcrypt, migrate, mail, celery, cache, redis_client
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    # Initialize extensions
+    CORS(app)
+    from .database import configure_database
+    configure_database(app)
+    db.init_app(app)
+    bcrypt.init_app(app)
+    mail.init_app(app)
+    migrate.init_app(app, db)
+    cache.init_app(app)
+    redis_client.init_app(app)
+    
+    celery.conf.update(
+        broker_url=Config.broker_url,
+        result_backend=Config.result_backend
+    )
+    celery.conf.beat_schedule = Config.CELERY_BEAT_SCHEDULE
+    # Tasks keep the Task class they were registered with, so it looks up the latest app
+    # instead of closing over the first one
+    celery.flask_app = app
+    class ContextTask(celery.Task):
+        def __call__(self, *args, **kwargs):
+            with celery.flask_app.app_context():
+                return self.run(*args, **kwargs)
+    celery.Task = ContextTask
+
+    # Register blueprints
+    from .controllers.auth import auth_bp
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    from .controllers.admin import admin_bp
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    from .controllers.student import student_bp
+    app.register_blueprint(student_bp, url_prefix='/api/student')
+
+    from .rollups import rebuild_rollups_command
+    app.cli.add_command(rebuild_rollups_command)
+    from .indexes import ensure_indexes, ensure_indexes_command, check_query_plans_command
+    app.cli.add_command(ensure_indexes_command)
+    app.cli.add_command(check_query_plans_command)
+    from .search import ensure_search_index
+    from .packed_answers import pack_answers_command
+    app.cli.add_command(pack_answers_command)
+
+    with app.app_context():
+        from .database import apply_sqlite_profile
+        for engine in db.engines.values():
+            apply_sqlite_profile(engine, app.config)
+        from . import models
+        from .schema import create_tables, ensure_columns, ensure_sqlite_autoincrement
+        from .archive import reserve_archived_ids
+        create_tables()
+        ensure_columns()
+        ensure_sqlite_autoincrement()
+        reserve_archived_ids()
+        ensure_indexes()
+        ensure_search_index()
+        admin = models.Admin.query.get(1)
+        if not admin:
+            admin = models.Admin(
+                AdminID=1,
+                Name=os.getenv('Admin_Username'),
+                Email=os.getenv('Admin_Email'),
+            )
+            password = os.getenv('Admin_Password')
+            admin.set_password(password)
+            db.session.add(admin)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # another worker seeded the admin first
+                db.session.rollback()
+
     return app
\ No newline at end of file
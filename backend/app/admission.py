@@ -0,0 +1,63 @@
+from functools import wraps
+import math
+import time
+from flask import current_app, jsonify
+import redis
+from app.extension import redis_client
+
+# Takes one token from a bucket refilled at `rate` tokens/s and capped at `burst`.
+# Returns 0 when the caller is admitted, or the wait in ms until the next token is due
+# when the bucket is empty, in which case nothing is taken.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+if tokens < 1 then
+    return math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return 0
+"""
+
+
+def take_token(bucket):
+    config = current_app.config
+    return int(redis_client.eval(
+        TOKEN_BUCKET_SCRIPT, 1, f"admission:{bucket}",
+        config['ADMISSION_RATE'],
+        config['ADMISSION_BURST'],
+        int(time.time() * 1000)
+    ))
+
+
+def admission_control(bucket):
+    """
+    Caps an endpoint at the bucket's rate: a caller is admitted while a token is left,
+    otherwise answered 429 at once with a Retry-After for when the next one is due.
+    No request is held in the worker waiting for its turn.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                wait = take_token(bucket)
+            except redis.RedisError as e:
+                # Fail open: losing the limiter must not take the endpoint down with it
+                current_app.logger.warning(f"Admission control unavailable: {e}")
+                wait = 0
+            if wait:
+                retry_after = max(1, math.ceil(wait / 1000))
+                response = jsonify({
+                    'message': 'Too many students are starting right now, please retry shortly.',
+                    'retry_after': retry_after
+                })
+                response.headers['Retry-After'] = str(retry_after)
+                return response, 429
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,106 @@
+from datetime import datetime
+from itertools import groupby
+import numpy as np
+from sqlalchemy import func, select, text, union_all
+from sqlalchemy.orm import joinedload
+from app.extension import db
+from app.models import Attempt, ArchivedAttempt, Exam, SelectedAnswer
+from app.grading import get_answer_key
+from app.packed_answers import ensure_layout, pack, selection_from_rows
+
+# Cold tier for attempt history. Completed attempts older than ARCHIVE_AFTER_DAYS move,
+# with their answers packed, into ArchivedAttempt under their original AttemptID, which is
+# never handed out again (the attempt table uses AUTOINCREMENT on SQLite). Attempt and
+# SelectedAnswer thus stay sized by recent activity. Rollups are left as they are (their
+# rebuilds read both tables) and the history and results views reach archived attempts
+# on request.
+
+
+def archive_attempts(cutoff, batch_size):
+    """
+    Moves completed attempts dated before `cutoff` into the archive, one committed
+    batch at a time. Returns the number of attempts moved.
+    """
+    moved = 0
+    while True:
+        attempts = db.session.execute(
+            select(
+                Attempt.AttemptID, Attempt.StudentID, Attempt.ExamID, Attempt.AttemptDate,
+                Attempt.Marks, Attempt.TotalMarks, Attempt.PackedAnswers, Attempt.PackedVersion
+            ).filter(
+                Attempt.Status == 'completed',
+                Attempt.AttemptDate < cutoff
+            ).order_by(Attempt.AttemptID).limit(batch_size)
+        ).all()
+        if not attempts:
+            return moved
+
+        # Attempts still stored as SelectedAnswer rows are packed on the way out
+        packed = {}
+        unpacked = sorted((a for a in attempts if a.PackedAnswers is None), key=lambda a: (a.ExamID, a.AttemptID))
+        for exam_id, group in groupby(unpacked, key=lambda a: a.ExamID):
+            key = get_answer_key(db.session.get(Exam, exam_id))
+            ensure_layout(key)
+            attempt_ids = np.array([a.AttemptID for a in group], dtype=np.int64)
+            for attempt_id, selected in zip(attempt_ids.tolist(), selection_from_rows(key, attempt_ids)):
+                packed[attempt_id] = (pack(selected), key.version)
+
+        archived_at = datetime.utcnow()
+        db.session.execute(ArchivedAttempt.__table__.insert(), [{
+            'AttemptID': a.AttemptID,
+            'StudentID': a.StudentID,
+            'ExamID': a.ExamID,
+            'AttemptDate': a.AttemptDate,
+            'Marks': a.Marks,
+            'TotalMarks': a.TotalMarks,
+            'PackedAnswers': packed[a.AttemptID][0] if a.PackedAnswers is None else a.PackedAnswers,
+            'PackedVersion': packed[a.AttemptID][1] if a.PackedAnswers is None else a.PackedVersion,
+            'ArchivedAt': archived_at
+        } for a in attempts])
+        attempt_ids = [a.AttemptID for a in attempts]
+        SelectedAnswer.query.filter(SelectedAnswer.AttemptID.in_(attempt_ids)).delete(synchronize_session=False)
+        Attempt.query.filter(Attempt.AttemptID.in_(attempt_ids)).delete(synchronize_session=False)
+        db.session.commit()
+        moved += len(attempts)
+
+
+def reserve_archived_ids():
+    """
+    Keeps new attempts from taking the id of an archived one on SQLite, where the attempt
+    table counts ids in sqlite_sequence. Attempts archived before that table was rebuilt
+    with AUTOINCREMENT can hold ids above every live one, so the counter is raised past them.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    archived = db.session.scalar(select(func.max(ArchivedAttempt.AttemptID)))
+    if archived is None:
+        return
+    seq = db.session.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'attempt'")).scalar()
+    if seq is None:
+        db.session.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('attempt', :seq)"), {'seq': archived})
+    elif seq < archived:
+        db.session.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'attempt'"), {'seq': archived})
+    db.session.commit()
+
+
+def history_rows(student_id, include_archived=False):
+    """
+    A student's attempts as (AttemptID, ExamID, ExamName, Marks, TotalMarks, AttemptDate)
+    rows, optionally including archived ones. Returns (query, [AttemptDate, AttemptID] keys).
+    """
+    def attempts_of(model):
+        return select(
+            model.AttemptID, model.ExamID, Exam.ExamName, model.Marks, model.TotalMarks, model.AttemptDate
+        ).join(Exam, Exam.ExamID == model.ExamID).filter(model.StudentID == student_id)
+
+    history = attempts_of(Attempt)
+    if include_archived:
+        history = union_all(history, attempts_of(ArchivedAttempt))
+    history = history.subquery('history')
+    return db.session.query(history), [history.c.AttemptDate, history.c.AttemptID]
+
+
+def find_archived_attempt(student_id, attempt_id):
+    return ArchivedAttempt.query.options(
+        joinedload(ArchivedAttempt.exam).joinedload(Exam.questions)
+    ).filter(ArchivedAttempt.AttemptID == attempt_id, ArchivedAttempt.StudentID == student_id).first()
@@ -0,0 +1,134 @@
+from flask import current_app
+import redis
+from sqlalchemy import insert, select
+from app.extension import db, redis_client
+from app.models import Attempt, Question, SelectedAnswer
+
+UNANSWERED = -1
+AUTOSAVE_TTL = 24 * 60 * 60
+DIRTY_SET = 'autosave:dirty'
+
+
+def _answers_key(attempt_id):
+    return f"autosave:{attempt_id}:answers"
+
+
+def _owner_key(attempt_id):
+    return f"autosave:{attempt_id}:student"
+
+
+def register_attempt(attempt_id, student_id, exam_id):
+    redis_client.set(_owner_key(attempt_id), f"{student_id}:{exam_id}", ex=AUTOSAVE_TTL)
+
+
+def owner_of(attempt_id):
+    """(StudentID, ExamID) the attempt was registered with, or None if it is not registered."""
+    owner = redis_client.get(_owner_key(attempt_id))
+    if owner is None:
+        return None
+    student_id, _, exam_id = (owner.decode() if isinstance(owner, bytes) else owner).partition(':')
+    # Registrations without the exam predate it; they are re-registered from the database
+    return (int(student_id), int(exam_id)) if exam_id else None
+
+
+def record_answers(attempt_id, answers):
+    # One HSET per call regardless of attempt size; a cleared answer is kept as UNANSWERED
+    mapping = {
+        int(question_id): UNANSWERED if option is None else int(option)
+        for question_id, option in answers.items()
+    }
+    if not mapping:
+        return
+    pipe = redis_client.pipeline()
+    pipe.hset(_answers_key(attempt_id), mapping=mapping)
+    pipe.expire(_answers_key(attempt_id), AUTOSAVE_TTL)
+    pipe.sadd(DIRTY_SET, attempt_id)
+    pipe.execute()
+
+
+def buffered_answers(attempt_id):
+    raw = redis_client.hgetall(_answers_key(attempt_id))
+    return {
+        int(question_id): None if int(option) == UNANSWERED else int(option)
+        for question_id, option in raw.items()
+    }
+
+
+def saved_answers(attempt_id):
+    """
+    The autosaved answers of an attempt: the rows the write-behind already flushed to
+    SelectedAnswer, overlaid with the newer Redis buffer. Returns None when neither can
+    be relied on, i.e. Redis is unreachable or lost the buffer and nothing was flushed.
+    """
+    flushed = {
+        row.QuestionID: row.SelectedOption
+        for row in SelectedAnswer.query.filter_by(AttemptID=attempt_id)
+    }
+    try:
+        # Every attempt is registered when it starts, so a missing registration means Redis
+        # lost the buffer along with it
+        buffered = buffered_answers(attempt_id) if owner_of(attempt_id) is not None else None
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Autosave buffer unavailable for attempt {attempt_id}: {e}")
+        buffered = None
+    if buffered is None:
+        return flushed or None
+    flushed.update(buffered)
+    return flushed
+
+
+def discard(attempt_id):
+    pipe = redis_client.pipeline()
+    pipe.delete(_answers_key(attempt_id), _owner_key(attempt_id))
+    pipe.srem(DIRTY_SET, attempt_id)
+    pipe.execute()
+
+
+def flush_dirty(limit):
+    """
+    Write-behind: persists the buffered answers of up to `limit` changed attempts
+    to SelectedAnswer in one transaction. Returns the number of attempts flushed.
+    """
+    attempt_ids = [int(a) for a in (redis_client.spop(DIRTY_SET, limit) or [])]
+    if not attempt_ids:
+        return 0
+    still_open = db.select(Attempt.AttemptID).filter(
+        Attempt.AttemptID.in_(attempt_ids),
+        Attempt.Status == 'in_progress'
+    )
+    try:
+        # Lock the attempts so a concurrent submit cannot finalize one between this check and
+        # the writes below (PostgreSQL row locks; SQLite has none, see the re-check)
+        in_progress = set(db.session.scalars(still_open.with_for_update()).all())
+        if in_progress:
+            SelectedAnswer.query.filter(
+                SelectedAnswer.AttemptID.in_(still_open.filter(Attempt.AttemptID.in_(in_progress)))
+            ).delete(synchronize_session=False)
+            # The delete holds SQLite's write lock until commit, so this read cannot go stale
+            in_progress &= set(db.session.scalars(still_open).all())
+            # Only answers to questions of the attempt's exam are written; anything else (a
+            # question deleted since, or a bad payload) would fail the whole batch on its FK
+            questions = {(row.AttemptID, row.QuestionID) for row in db.session.execute(
+                select(Attempt.AttemptID, Question.QuestionID)
+                .join(Question, Question.ExamID == Attempt.ExamID)
+                .filter(Attempt.AttemptID.in_(in_progress))
+            )}
+            rows = []
+            for attempt_id in in_progress:
+                rows.extend({
+                    'AttemptID': attempt_id,
+                    'QuestionID': question_id,
+                    'SelectedOption': option
+                } for question_id, option in buffered_answers(attempt_id).items()
+                    if option is not None and (attempt_id, question_id) in questions)
+            if rows:
+                db.session.execute(insert(SelectedAnswer), rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        redis_client.sadd(DIRTY_SET, *attempt_ids)
+        raise
+    # Buffers left behind by attempts that were submitted meanwhile are of no further use
+    for attempt_id in set(attempt_ids) - in_progress:
+        discard(attempt_id)
+    return len(attempt_ids)
@@ -0,0 +1,95 @@
+from functools import wraps
+from urllib.parse import urlencode
+import hashlib
+from flask import request, current_app, g
+from app.extension import cache
+
+# Cached responses are stored under a key that embeds the current version of each of
+# their tags (e.g. 'subjects', 'subject:3', 'exam:7'). Invalidating a tag bumps its
+# version, so every entry built against the old version simply stops being addressed
+# and ages out, while entries under other tags keep being served.
+
+
+def _tag_key(tag):
+    return f"tag:{tag}"
+
+
+def _stats_key(name, outcome):
+    return f"cache_stats:{name}:{outcome}"
+
+
+def tag_versions(tags):
+    versions = cache.get_many(*[_tag_key(tag) for tag in tags]) if tags else []
+    return [version or 0 for version in versions]
+
+
+def invalidate(*tags):
+    for tag in set(tags):
+        cache.cache.inc(_tag_key(tag))
+
+
+def _caller_role():
+    # Set by authentication(), which runs before any cached view
+    return g.get('user_type') or 'anonymous'
+
+
+def _normalized_query():
+    # Order-independent, and empty values dropped since the views treat them as absent
+    args = sorted((k, v) for k, v in request.args.items(multi=True) if v != '')
+    return urlencode(args)
+
+
+def _not_modified(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_tagged(tags, timeout=300):
+    """
+    Caches a view's successful response under the given tags; `tags` is a callable
+    receiving the view kwargs and returning the list of tags the response depends on.
+    Entries are keyed on path, normalized query string and caller role, and carry a
+    strong ETag so a matching If-None-Match is answered with 304.
+    """
+    def decorator(f):
+        name = f.__name__
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            view_tags = sorted(tags(**kwargs))
+            versions = '.'.join(str(v) for v in tag_versions(view_tags))
+            key = f"tagged:{_caller_role()}:{request.path}?{_normalized_query()}:{versions}"
+
+            entry = cache.get(key)
+            if entry is not None:
+                cache.cache.inc(_stats_key(name, 'hits'))
+                body, status, mimetype, etag = entry
+                if request.if_none_match.contains(etag):
+                    return _not_modified(etag)
+            else:
+                cache.cache.inc(_stats_key(name, 'misses'))
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body, status, mimetype = response.get_data(), response.status_code, response.mimetype
+                etag = hashlib.sha256(body).hexdigest()
+                cache.set(key, (body, status, mimetype, etag), timeout=timeout)
+                if request.if_none_match.contains(etag):
+                    return _not_modified(etag)
+
+            response = current_app.response_class(body, status=status, mimetype=mimetype)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+
+def cache_stats(names):
+    stats = {}
+    for name in names:
+        hits, misses = cache.get_many(_stats_key(name, 'hits'), _stats_key(name, 'misses'))
+        stats[name] = {'hits': hits or 0, 'misses': misses or 0}
+    return stats
@@ -1,279 +1,443 @@
-from app.extension import celery, mail
-from flask_mail import Message
-from app.models import Student, Exam, Attempt
-from datetime import datetime, timedelta
-from sqlalchemy.orm import joinedload
-import io
-import csv
-
-@celery.task
-def send_new_exam_notification(exam_id):
-    exam = Exam.query.get(exam_id)
-    if not exam:
-        return "Exam not found."
-
-    students = Student.query.all()
-    if not students:
-        return "No students to notify."
-    
-    subject = f"New Quiz Published: {exam.ExamName}"
-    body = f"""
-    Hi students,
-
-    A new quiz, '{exam.ExamName}', has just been published.
-
-    It covers the topic: {exam.chapter.ChapterName}
-    Total Marks: {exam.TotalMarks}
-    Duration: {exam.TotalDuration} minutes
-
-    Log in to your dashboard to attempt it. Good luck!
-
-    Thanks,
-    The QuizMaster Team
-    """
-
-    with mail.connect() as conn:
-        for student in students:
-            msg = Message(subject=subject, recipients=[student.Email], body=body)
-            conn.send(msg)
-
-    return f"Notification sent for exam '{exam.ExamName}' to {len(students)} students."
-
-@celery.task
-def send_daily_reminders():
-    """
-    Sends a daily email to students with exams that are due today.
-    """
-    today = datetime.utcnow().date()
-    upcoming_exams = Exam.query.filter(Exam.ExamDate.date() == today, Exam.Published == True).all()
-
-    if not upcoming_exams:
-        return "No upcoming exams today."
-
-    students = Student.query.all()
-    for student in students:
-        attempted_exam_ids = {a.ExamID for a in student.attempts}
-        pending_exams = [exam for exam in upcoming_exams if exam.ExamID not in attempted_exam_ids]
-
-        if pending_exams:
-            exam_names = ", ".join([exam.ExamName for exam in pending_exams])
-            msg = Message(
-                "Quiz Reminder!",
-                recipients=[student.Email],
-                body=f"""Hi {student.Name},
-                
-                This is a reminder that the following quizzes are due today: 
-                {exam_names}
-
-                Good luck!
-                QuizMaster Team"""
-            )
-            mail.send(msg)
-
-    return f"Sent reminders for {len(upcoming_exams)} exams."
-
-@celery.task
-def generate_monthly_report(student_id):
-    try:
-        student = Student.query.get(student_id)
-        if not student:
-            return "Student not found."
-        print(student)
-        attempts = Attempt.query.filter_by(StudentID=student_id)
-        print(attempts)
-        if not attempts:
-            report_body = f"""
-            <p>Hi {student.Name},</p>
-            <p>You have not attempted any quizzes in the last 30 days.</p>
-            <p>Thanks,<br>The QuizMaster Team</p>
-            """
-        else:
-            table_rows = ""
-            for attempt in attempts:
-                table_rows += f"""
-                <tr>
-                    <td>{attempt.AttemptDate.strftime('%Y-%m-%d %H:%M')}</td>
-                    <td>{attempt.exam.ExamName}</td>
-                    <td>{attempt.TotalMarks}</td>
-                    <td>{attempt.Marks}</td>
-                </tr>
-                """
-
-            report_body = f"""
-            <html>
-                <head>
-                    <style>
-                        body {{ font-family: sans-serif; }}
-                        table {{ border-collapse: collapse; width: 100%; }}
-                        th, td {{ border: 1px solid #dddddd; text-align: left; padding: 8px; }}
-                        th {{ background-color: #f2f2f2; }}
-                    </style>
-                </head>
-                <body>
-                    <h2>Hi {student.Name},</h2>
-                    <p>Here is your monthly performance report:</p>
-                    <table>
-                        <thead>
-                            <tr>
-                                <th>Attempt Date</th>
-                                <th>Exam Name</th>
-                                <th>Total Marks</th>
-                                <th>Marks Obtained</th>
-                            </tr>
-                        </thead>
-                        <tbody>
-                            {table_rows}
-                        </tbody>
-                    </table>
-                    <p>Keep up the great work!</p>
-                    <p>Thanks,<br>The QuizMaster Team</p>
-                </body>
-            </html>
-            """
-
-        msg = Message(
-            "Your Monthly Performance Report",
-            recipients=[student.Email],
-            html=report_body
-        )
-        mail.send(msg)
-        return f"Monthly report sent to {student.Name}."
-    except Exception as e:
-        print(f"Error generating monthly report: {e}")
-        return "Error generating monthly report."
-
-@celery.task
-def generate_exam_report_for_student(student_id): #specific to student button
-    student = Student.query.get(student_id)
-    if not student:
-        return "Student not found."
-
-    last_month = datetime.utcnow() - timedelta(days=30)
-    attempts = Attempt.query.options(joinedload(Attempt.exam)).filter(
-        Attempt.StudentID == student_id,
-        Attempt.AttemptDate >= last_month
-    ).order_by(Attempt.AttemptDate.desc()).all()
-
-    if not attempts:
-        report_body = f"""
-        <p>Hi {student.Name},</p>
-        <p>You have not attempted any quizzes in the last 30 days.</p>
-        <p>Thanks,<br>The QuizMaster Team</p>
-        """
-        csv_data = None
-    else:
-        table_rows = ""
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['Attempt Date', 'Exam Name', 'Total Marks', 'Marks Obtained'])
-        for attempt in attempts:
-            table_rows += f"""
-            <tr>
-                <td>{attempt.AttemptDate.strftime('%Y-%m-%d %H:%M')}</td>
-                <td>{attempt.exam.ExamName}</td>
-                <td>{attempt.TotalMarks}</td>
-                <td>{attempt.Marks}</td>
-            </tr>
-            """
-            writer.writerow([
-                attempt.AttemptDate.strftime('%Y-%m-%d %H:%M'),
-                attempt.exam.ExamName,
-                attempt.TotalMarks,
-                attempt.Marks
-            ])
-        csv_data = output.getvalue()
-        report_body = f"""
-        <html>
-            <head>
-                <style>
-                    body {{ font-family: sans-serif; }}
-                    table {{ border-collapse: collapse; width: 100%; }}
-                    th, td {{ border: 1px solid #dddddd; text-align: left; padding: 8px; }}
-                    th {{ background-color: #f2f2f2; }}
-                </style>
-            </head>
-            <body>
-                <h2>Hi {student.Name},</h2>
-                <p>Here is your performance report for the last 30 days:</p>
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Attempt Date</th>
-                            <th>Exam Name</th>
-                            <th>Total Marks</th>
-                            <th>Marks Obtained</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {table_rows}
-                    </tbody>
-                </table>
-                <p>Keep up the great work!</p>  
-                <p>Thanks,<br>The QuizMaster Team</p>
-            </body>
-        </html>
-        """
-
-    msg = Message(
-        "Your Monthly Performance Report",
-        recipients=[student.Email],
-        html=report_body
-    )
-
-    if csv_data:
-        msg.attach(
-            "performance_report.csv",
-            "text/csv",
-            csv_data
-        )
-
-    mail.send(msg)
-    #print(f"Exam report for the last 30 days sent to {student.Name}.")
-    return f"Exam report for the last 30 days sent to {student.Name}."
-
-@celery.task
-def export_student_history_to_csv(student_id):
-    student = Student.query.get(student_id)
-    if not student:
-        return "Student not found"
-
-    attempts = Attempt.query.filter_by(StudentID=student_id).all()
-    if not attempts:
-        return "No attempts found for this student."
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    
-    writer.writerow(['Attempt ID', 'Exam Name', 'Marks Obtained', 'Total Marks', 'Attempt Date'])
-    
-    for attempt in attempts:
-        writer.writerow([
-            attempt.AttemptID,
-            attempt.exam.ExamName,
-            attempt.Marks,
-            attempt.TotalMarks,
-            attempt.AttemptDate.strftime('%Y-%m-%d %H:%M:%S')
-        ])
-    
-    csv_data = output.getvalue()
-    
-    msg = Message(
-        "Your Quiz History Export",
-        recipients=[student.Email],
-        body="Please find your quiz history attached."
-    )
-    msg.attach(
-        "quiz_history.csv",
-        "text/csv",
-        csv_data
-    )
-    
-    mail.send(msg)
-    return f"Quiz history sent to {student.Email}"
-
-@celery.task
-def export_all_student_reports():
-    students = Student.query.all()
-    for student in students:
-        generate_exam_report_for_student.delay(student.StudentID)
-    return f"Triggered performance report generation for {len(students)} students."
\ No newline at end of file
+from flask import current_app
+from app.extension import celery, mail, db
+from flask_mail import Message
+from app.models import Student, Exam, Attempt, ArchivedAttempt, PendingSubmission
+from app.grading import rescore_exam, record_submission, warm_answer_key
+from app.paper_cache import warm_paper
+from app import autosave
+from app.rollups import record_scores, record_student_score
+from app.leaderboard import publish_scores, rebuild_leaderboards
+from app.item_analysis import analyse_exam
+from app.archive import archive_attempts
+from app.mailing import send_messages, chunked
+from app.exports import (
+    HISTORY_HEADER, ATTEMPTS_HEADER, history_csv_rows, attempts_csv_rows, export_path, write_export, purge_exports
+)
+from app.reports import (
+    REPORT_DAYS, report_query, report_message, block_reports, start_progress, set_total, record_block
+)
+from celery import chord
+from datetime import datetime, timedelta
+from sqlalchemy import select, and_, func
+import time
+import json
+from collections import defaultdict
+from itertools import groupby
+from uuid import uuid4
+
+@celery.task
+def send_new_exam_notification(exam_id):
+    """
+    Announces a newly published exam to every student in MAIL_BATCH_SIZE chunks. Only
+    the StudentID bounds of each chunk are read here, by keyset paging; each
+    send_bulk_email task reads its own recipients, and a chord callback reports the
+    overall throughput.
+    """
+    exam = Exam.query.get(exam_id)
+    if not exam:
+        return "Exam not found."
+
+    subject = f"New Quiz Published: {exam.ExamName}"
+    body = f"""
+    Hi students,
+
+    A new quiz, '{exam.ExamName}', has just been published.
+
+    It covers the topic: {exam.chapter.ChapterName}
+    Total Marks: {exam.TotalMarks}
+    Duration: {exam.TotalDuration} minutes
+
+    Log in to your dashboard to attempt it. Good luck!
+
+    Thanks,
+    The QuizMaster Team
+    """
+
+    batches = [send_bulk_email.s(after_id, last_id, subject, body)
+               for after_id, last_id in student_chunks(current_app.config['MAIL_BATCH_SIZE'])]
+    if not batches:
+        return "No students to notify."
+
+    chord(batches)(report_bulk_email.s(f"New exam '{exam.ExamName}'", time.time()))
+    return f"Notification for exam '{exam.ExamName}' queued in {len(batches)} batches."
+
+def student_chunks(size):
+    """
+    Yields (after_id, last_id) bounds splitting the students, in StudentID order, into
+    chunks of `size`; a chunk holds the students with after_id < StudentID <= last_id.
+    Each bound is one index seek, so no chunk's rows are loaded here.
+    """
+    after_id = 0
+    while True:
+        last_id = db.session.scalar(
+            select(Student.StudentID).filter(Student.StudentID > after_id)
+            .order_by(Student.StudentID).offset(size - 1).limit(1)
+        )
+        if last_id is None:
+            # the final, partial chunk
+            last_id = db.session.scalar(select(func.max(Student.StudentID)).filter(Student.StudentID > after_id))
+            if last_id is not None:
+                yield after_id, last_id
+            return
+        yield after_id, last_id
+        after_id = last_id
+
+@celery.task
+def send_bulk_email(after_id, last_id, subject, body):
+    """
+    Sends the same email to each student with after_id < StudentID <= last_id, one
+    message apiece, over one SMTP connection.
+    """
+    recipients = db.session.scalars(
+        select(Student.Email).filter(Student.StudentID > after_id, Student.StudentID <= last_id)
+        .order_by(Student.StudentID)
+    ).all()
+    sent, failed = send_messages(
+        Message(subject=subject, recipients=[recipient], body=body) for recipient in recipients
+    )
+    return {'sent': sent, 'failed': len(failed)}
+
+@celery.task
+def report_bulk_email(results, label, started_at):
+    """Chord callback: totals the batches of a bulk send and logs its throughput."""
+    sent = sum(result['sent'] for result in results)
+    failed = sum(result['failed'] for result in results)
+    elapsed = max(time.time() - started_at, 0.001)
+    summary = f"{label}: {sent} emails sent, {failed} failed in {elapsed:.1f}s ({sent / elapsed:.1f} emails/s)."
+    current_app.logger.info(summary)
+    return summary
+
+@celery.task
+def send_daily_reminders():
+    """
+    Sends a daily email to students with exams that are due today. The pending
+    (student, exam) pairs come from one anti-join, streamed in StudentID order and
+    dispatched MAIL_BATCH_SIZE students at a time to send_email_batch.
+    """
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    due_today = and_(Exam.Published == True, Exam.ExamDate >= start, Exam.ExamDate < start + timedelta(days=1))
+    exam_count = Exam.query.filter(due_today).count()
+    if not exam_count:
+        return "No upcoming exams today."
+
+    attempted = select(Attempt.AttemptID).filter(Attempt.StudentID == Student.StudentID, Attempt.ExamID == Exam.ExamID)
+    archived = select(ArchivedAttempt.AttemptID).filter(
+        ArchivedAttempt.StudentID == Student.StudentID,
+        ArchivedAttempt.ExamID == Exam.ExamID
+    )
+    batch_size = current_app.config['MAIL_BATCH_SIZE']
+    pending = db.session.execute(
+        select(Student.StudentID, Student.Name, Student.Email, Exam.ExamName)
+        .select_from(Student).join(Exam, due_today)
+        .filter(~attempted.exists(), ~archived.exists())
+        .order_by(Student.StudentID, Exam.ExamID)
+        .execution_options(yield_per=batch_size)
+    )
+
+    reminders = (
+        {
+            'recipient': email,
+            'subject': "Quiz Reminder!",
+            'body': f"""Hi {name},
+                
+                This is a reminder that the following quizzes are due today: 
+                {", ".join(row.ExamName for row in rows)}
+
+                Good luck!
+                QuizMaster Team"""
+        }
+        for (student_id, name, email), rows in groupby(pending, key=lambda row: (row.StudentID, row.Name, row.Email))
+    )
+    students = batches = 0
+    for batch in chunked(reminders, batch_size):
+        send_email_batch.delay(batch)
+        students += len(batch)
+        batches += 1
+
+    return f"Queued reminders for {exam_count} exams to {students} students in {batches} batches."
+
+@celery.task
+def send_email_batch(messages):
+    """Sends a batch of {recipient, subject, body} emails over one SMTP connection."""
+    sent, failed = send_messages(
+        Message(subject=message['subject'], recipients=[message['recipient']], body=message['body'])
+        for message in messages
+    )
+    return {'sent': sent, 'failed': len(failed)}
+
+@celery.task
+def generate_monthly_report(student_id):
+    try:
+        student = Student.query.get(student_id)
+        if not student:
+            return "Student not found."
+        print(student)
+        attempts = Attempt.query.filter_by(StudentID=student_id)
+        print(attempts)
+        if not attempts:
+            report_body = f"""
+            <p>Hi {student.Name},</p>
+            <p>You have not attempted any quizzes in the last 30 days.</p>
+            <p>Thanks,<br>The QuizMaster Team</p>
+            """
+        else:
+            table_rows = ""
+            for attempt in attempts:
+                table_rows += f"""
+                <tr>
+                    <td>{attempt.AttemptDate.strftime('%Y-%m-%d %H:%M')}</td>
+                    <td>{attempt.exam.ExamName}</td>
+                    <td>{attempt.TotalMarks}</td>
+                    <td>{attempt.Marks}</td>
+                </tr>
+                """
+
+            report_body = f"""
+            <html>
+                <head>
+                    <style>
+                        body {{ font-family: sans-serif; }}
+                        table {{ border-collapse: collapse; width: 100%; }}
+                        th, td {{ border: 1px solid #dddddd; text-align: left; padding: 8px; }}
+                        th {{ background-color: #f2f2f2; }}
+                    </style>
+                </head>
+                <body>
+                    <h2>Hi {student.Name},</h2>
+                    <p>Here is your monthly performance report:</p>
+                    <table>
+                        <thead>
+                            <tr>
+                                <th>Attempt Date</th>
+                                <th>Exam Name</th>
+                                <th>Total Marks</th>
+                                <th>Marks Obtained</th>
+                            </tr>
+                        </thead>
+                        <tbody>
+                            {table_rows}
+                        </tbody>
+                    </table>
+                    <p>Keep up the great work!</p>
+                    <p>Thanks,<br>The QuizMaster Team</p>
+                </body>
+            </html>
+            """
+
+        msg = Message(
+            "Your Monthly Performance Report",
+            recipients=[student.Email],
+            html=report_body
+        )
+        mail.send(msg)
+        return f"Monthly report sent to {student.Name}."
+    except Exception as e:
+        print(f"Error generating monthly report: {e}")
+        return "Error generating monthly report."
+
+@celery.task
+def generate_exam_report_for_student(student_id): #specific to student button
+    student = Student.query.get(student_id)
+    if not student:
+        return "Student not found."
+
+    since = datetime.utcnow() - timedelta(days=REPORT_DAYS)
+    attempts = db.session.execute(
+        report_query(since).filter(Student.StudentID == student_id, Attempt.AttemptID.isnot(None))
+    ).all()
+    mail.send(report_message(student.Email, student.Name, attempts))
+    #print(f"Exam report for the last 30 days sent to {student.Name}.")
+    return f"Exam report for the last 30 days sent to {student.Name}."
+
+@celery.task
+def export_student_history_to_csv(student_id, export_id=None):
+    """
+    Writes a student's full attempt history as a gzip CSV under EXPORT_DIR and
+    emails them that it can be downloaded.
+    """
+    student = Student.query.get(student_id)
+    if not student:
+        return "Student not found"
+
+    export_id = export_id or uuid4().hex
+    rows = write_export(export_path('history', student_id, export_id), HISTORY_HEADER, history_csv_rows(student_id))
+    if not rows:
+        return "No attempts found for this student."
+
+    msg = Message(
+        "Your Quiz History Export",
+        recipients=[student.Email],
+        body=f"Your quiz history export ({rows} attempts) is ready. "
+             f"Download it from your history page within {current_app.config['EXPORT_TTL_HOURS']} hours "
+             f"(export id {export_id})."
+    )
+    mail.send(msg)
+    return f"Quiz history export {export_id} written for {student.Email}"
+
+@celery.task
+def export_all_attempts_to_csv(export_id):
+    """Writes every completed attempt as a gzip CSV under EXPORT_DIR for admin download."""
+    rows = write_export(export_path('attempts', 'all', export_id), ATTEMPTS_HEADER, attempts_csv_rows())
+    return f"Attempts export {export_id} written with {rows} rows."
+
+@celery.task
+def purge_expired_exports():
+    removed = purge_exports(timedelta(hours=current_app.config['EXPORT_TTL_HOURS']))
+    return f"Removed {removed} expired exports."
+
+@celery.task
+def export_all_student_reports(export_id=None, admin_id=None):
+    """
+    Sends every student their performance report. Students are split into blocks
+    of REPORT_BLOCK_SIZE consecutive StudentIDs, each handled by one
+    send_report_block task; progress is tracked under `export_id`.
+    """
+    if export_id is None:
+        export_id = uuid4().hex
+        start_progress(export_id, admin_id)
+    block_size = current_app.config['REPORT_BLOCK_SIZE']
+    total = db.session.scalar(select(func.count(Student.StudentID)))
+    set_total(export_id, total)
+
+    student_ids = db.session.execute(
+        select(Student.StudentID).order_by(Student.StudentID).execution_options(yield_per=block_size)
+    ).scalars()
+    blocks = 0
+    for block in student_ids.partitions():
+        send_report_block.delay(export_id, block[0], block[-1])
+        blocks += 1
+    return f"Triggered performance report generation for {total} students in {blocks} blocks."
+
+@celery.task
+def send_report_block(export_id, first_id, last_id):
+    """Renders and emails the reports of one block of students over one SMTP connection."""
+    sent, failed = send_messages(block_reports(first_id, last_id))
+    record_block(export_id, sent, len(failed))
+    return f"Sent {sent} performance reports ({len(failed)} failed) for students {first_id}-{last_id}."
+
+@celery.task
+def rescore_exam_attempts(exam_id):
+    """
+    Re-grades all attempts of an exam in one vectorized batch.
+    """
+    exam = Exam.query.get(exam_id)
+    if not exam:
+        return "Exam not found."
+    count = rescore_exam(exam)
+    rebuild_leaderboards([exam.ExamID])
+    return f"Re-scored {count} attempts for exam '{exam.ExamName}'."
+
+@celery.task
+def analyse_exam_items(exam_id):
+    """
+    Recomputes difficulty, discrimination and option frequencies for each question of an exam.
+    """
+    exam = Exam.query.get(exam_id)
+    if not exam:
+        return "Exam not found."
+    count = analyse_exam(exam)
+    return f"Analysed {count} attempts for exam '{exam.ExamName}'."
+
+@celery.task
+def grade_pending_submissions():
+    """
+    Drains the staged submissions in batches, grading each batch and writing its
+    marks and answers in a single transaction.
+    """
+    batch_size = current_app.config['GRADING_BATCH_SIZE']
+    graded = 0
+    while True:
+        pending = PendingSubmission.query.order_by(PendingSubmission.id).limit(batch_size).all()
+        if not pending:
+            break
+
+        # Claim the batch first; if another worker got to some of it, back off and re-read
+        claimed = PendingSubmission.query.filter(
+            PendingSubmission.id.in_([p.id for p in pending])
+        ).delete(synchronize_session=False)
+        if claimed != len(pending):
+            db.session.rollback()
+            continue
+
+        attempts = {a.AttemptID: a for a in Attempt.query.filter(
+            Attempt.AttemptID.in_([p.AttemptID for p in pending])
+        ).all()}
+        exams = {e.ExamID: e for e in Exam.query.filter(
+            Exam.ExamID.in_({a.ExamID for a in attempts.values()})
+        ).all()}
+
+        scores = defaultdict(list)
+        best = defaultdict(dict)
+        for submission in pending:
+            attempt = attempts.get(submission.AttemptID)
+            if not attempt or attempt.Status != 'grading':
+                continue
+            exam = exams[attempt.ExamID]
+            # Checked at submit time; an option removed since then is dropped rather than failing the batch
+            marks = record_submission(attempt, exam, json.loads(submission.Answers), strict=False)
+            scores[attempt.ExamID].append(marks)
+            best[attempt.ExamID][attempt.StudentID] = max(marks, best[attempt.ExamID].get(attempt.StudentID, marks))
+            record_student_score(attempt.StudentID, exam.chapter.SubjectID, marks, attempt.TotalMarks)
+            attempt.Status = 'completed'
+            graded += 1
+        for exam_id, marks in scores.items():
+            record_scores(exams[exam_id], marks)
+        db.session.commit()
+        for exam_id, students in best.items():
+            publish_scores(exam_id, students)
+
+    return f"Graded {graded} pending submissions."
+
+@celery.task
+def archive_old_attempts():
+    """Moves completed attempts older than ARCHIVE_AFTER_DAYS into the archive table."""
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['ARCHIVE_AFTER_DAYS'])
+    moved = archive_attempts(cutoff, current_app.config['ARCHIVE_BATCH_SIZE'])
+    return f"Archived {moved} attempts older than {cutoff:%Y-%m-%d}."
+
+@celery.task
+def rebuild_exam_leaderboards(exam_id=None):
+    """
+    Repopulates leaderboards from completed attempts, archived included: one exam, or all of them.
+    """
+    count = rebuild_leaderboards([exam_id] if exam_id else None)
+    return f"Rebuilt leaderboards for {count} exams."
+
+@celery.task
+def prewarm_scheduled_exams():
+    """
+    Writes the paper and answer key of every published exam whose fixed StartTime
+    falls within the lead window to the shared cache, so the start-time spike and
+    the submissions after it are served from cache by every web worker.
+    """
+    # StartTime is entered as local wall-clock time
+    now = datetime.now()
+    lead = timedelta(minutes=current_app.config['PREWARM_LEAD_MINUTES'])
+    exams = Exam.query.filter(
+        Exam.Published == True,
+        Exam.ExamType == 'specific_time',
+        Exam.StartTime >= now,
+        Exam.StartTime <= now + lead
+    ).all()
+
+    # Always rewritten, as this worker's own LRU says nothing about what the shared cache still holds
+    for exam in exams:
+        warm_paper(exam)
+        warm_answer_key(exam)
+
+    return f"Pre-warmed {len(exams)} scheduled exams."
+
+@celery.task
+def flush_autosaved_answers():
+    """
+    Write-behind flusher: persists autosaved answers of changed attempts to
+    SelectedAnswer in batches.
+    """
+    batch_size = current_app.config['AUTOSAVE_FLUSH_BATCH_SIZE']
+    flushed = 0
+    while True:
+        count = autosave.flush_dirty(batch_size)
+        flushed += count
+        if count < batch_size:
+            break
+    return f"Flushed autosaved answers for {flushed} attempts."
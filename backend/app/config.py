@@ -1,35 +1,140 @@
-import os
-from datetime import timedelta
-from dotenv import load_dotenv
-load_dotenv()
-
-class Config:
-    SECRET_KEY = os.getenv('SECRET_KEY')
-    CSRF_ENABLED = True
-    DEBUG = True
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///quiz_master.db'
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-    
-     # Email settings
-    MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.googlemail.com')
-    MAIL_PORT = int(os.getenv('MAIL_PORT', '587'))
-    MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
-    MAIL_USERNAME = os.getenv('MAIL_USERNAME')
-    MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
-    MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER')
-
-    # Celery settings
-    broker_url = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
-    result_backend = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
-    
-    # Celery beat schedule
-    CELERY_BEAT_SCHEDULE = {
-        'send-daily-reminders': {
-            'task': 'app.celery_tasks.send_daily_reminders',
-            'schedule': timedelta(days=1),
-        },
-    }
-
-    CACHE_TYPE = 'RedisCache'
-    CACHE_REDIS_URL = 'redis://localhost:6379/1' 
-    CACHE_DEFAULT_TIMEOUT = 300
\ No newline at end of file
+import os
+from datetime import timedelta
+from dotenv import load_dotenv
+load_dotenv()
+
+class Config:
+    SECRET_KEY = os.getenv('SECRET_KEY')
+    CSRF_ENABLED = True
+    DEBUG = True
+    # DATABASE_URL may point at PostgreSQL; without it the app runs on a local SQLite file
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///quiz_master.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Optional read replica; views marked @read_replica send their SELECTs there
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+
+    # PostgreSQL connection pool (per process) and per-statement time limit
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '15000'))
+
+    # SQLite connection profile, applied to every connection (see app/database.py)
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', '-65536')) # negative = KiB, i.e. 64 MiB
+    
+     # Email settings
+    MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.googlemail.com')
+    MAIL_PORT = int(os.getenv('MAIL_PORT', '587'))
+    MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
+    MAIL_USERNAME = os.getenv('MAIL_USERNAME')
+    MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
+    MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER')
+    # Bulk email is sent MAIL_BATCH_SIZE recipients per task over one SMTP connection; a failed
+    # message is retried MAIL_SEND_RETRIES times, waiting MAIL_RETRY_DELAY seconds, doubling each time
+    MAIL_BATCH_SIZE = int(os.getenv('MAIL_BATCH_SIZE', '500'))
+    MAIL_SEND_RETRIES = int(os.getenv('MAIL_SEND_RETRIES', '3'))
+    MAIL_RETRY_DELAY = float(os.getenv('MAIL_RETRY_DELAY', '1'))
+    # Bulk performance reports are queried, rendered and mailed this many students per task
+    REPORT_BLOCK_SIZE = int(os.getenv('REPORT_BLOCK_SIZE', '500'))
+
+    # Celery settings
+    broker_url = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+    result_backend = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+    
+    # Exam submission: 'sync' grades inline, 'async' stages the answers and lets Celery grade them
+    SUBMISSION_MODE = os.getenv('SUBMISSION_MODE', 'sync')
+    GRADING_BATCH_SIZE = int(os.getenv('GRADING_BATCH_SIZE', '500'))
+    # Finalized answers: 'packed' keeps one blob per attempt, 'rows' one SelectedAnswer row per answer
+    ANSWER_STORAGE = os.getenv('ANSWER_STORAGE', 'packed')
+
+    # Upper bound on points kept in each student's score-over-time series; older points are merged
+    STUDENT_SERIES_POINTS = int(os.getenv('STUDENT_SERIES_POINTS', '200'))
+
+    # Item analysis folds this many attempts at a time into its response matrix
+    ITEM_ANALYSIS_CHUNK_SIZE = int(os.getenv('ITEM_ANALYSIS_CHUNK_SIZE', '5000'))
+
+    # Per-exam leaderboards live in Redis sorted sets; 'memory' keeps them in-process (tests, single worker)
+    LEADERBOARD_BACKEND = os.getenv('LEADERBOARD_BACKEND', 'redis')
+    LEADERBOARD_MAX_LIMIT = int(os.getenv('LEADERBOARD_MAX_LIMIT', '100'))
+
+    # Completed attempts older than this many days move to the archive table, BATCH_SIZE per transaction
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '365'))
+    ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '1000'))
+
+    # Gzip CSV exports are written under EXPORT_DIR (default: <instance>/exports) and purged after EXPORT_TTL_HOURS
+    EXPORT_DIR = os.getenv('EXPORT_DIR')
+    EXPORT_TTL_HOURS = int(os.getenv('EXPORT_TTL_HOURS', '24'))
+
+    # Largest page a list endpoint returns when called with ?limit=
+    PAGE_MAX_LIMIT = int(os.getenv('PAGE_MAX_LIMIT', '500'))
+
+    # Autosaved answers are buffered in Redis and written behind to the database in batches
+    AUTOSAVE_FLUSH_BATCH_SIZE = int(os.getenv('AUTOSAVE_FLUSH_BATCH_SIZE', '200'))
+
+    # Scheduled exams are pre-warmed this many minutes before their StartTime
+    PREWARM_LEAD_MINUTES = int(os.getenv('PREWARM_LEAD_MINUTES', '10'))
+
+    # Admission control on exam start: token bucket refilled at RATE per second, holding up to BURST;
+    # callers finding it empty get 429 with a Retry-After
+    ADMISSION_RATE = float(os.getenv('ADMISSION_RATE', '50'))
+    ADMISSION_BURST = int(os.getenv('ADMISSION_BURST', '100'))
+
+    # Password hashing runs on a bounded worker pool; the bcrypt cost is picked so one hash takes
+    # about BCRYPT_TARGET_MS on this machine unless BCRYPT_LOG_ROUNDS pins it
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 2)))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', '5'))
+    # Hashes allowed to wait for a worker; callers beyond that are refused with 503 straight away
+    PASSWORD_HASH_QUEUE_SIZE = int(os.getenv('PASSWORD_HASH_QUEUE_SIZE', '32'))
+    BCRYPT_TARGET_MS = float(os.getenv('BCRYPT_TARGET_MS', '250'))
+    BCRYPT_MIN_ROUNDS = int(os.getenv('BCRYPT_MIN_ROUNDS', '10'))
+    BCRYPT_MAX_ROUNDS = int(os.getenv('BCRYPT_MAX_ROUNDS', '16'))
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', '0')) or None
+
+    # Authenticated principals are cached per token subject: in-process LRU, optionally shared via Redis
+    PRINCIPAL_CACHE_TTL = int(os.getenv('PRINCIPAL_CACHE_TTL', '30'))
+    PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', '10000'))
+    PRINCIPAL_CACHE_SHARED = os.getenv('PRINCIPAL_CACHE_SHARED', 'true').lower() in ['true', 'on', '1']
+
+    # Celery beat schedule
+    CELERY_BEAT_SCHEDULE = {
+        'send-daily-reminders': {
+            'task': 'app.celery_tasks.send_daily_reminders',
+            'schedule': timedelta(days=1),
+        },
+        'grade-pending-submissions': {
+            'task': 'app.celery_tasks.grade_pending_submissions',
+            'schedule': timedelta(seconds=5),
+        },
+        'flush-autosaved-answers': {
+            'task': 'app.celery_tasks.flush_autosaved_answers',
+            'schedule': timedelta(seconds=30),
+        },
+        'prewarm-scheduled-exams': {
+            'task': 'app.celery_tasks.prewarm_scheduled_exams',
+            'schedule': timedelta(minutes=1),
+        },
+        'rebuild-exam-leaderboards': {
+            'task': 'app.celery_tasks.rebuild_exam_leaderboards',
+            'schedule': timedelta(days=1),
+        },
+        'archive-old-attempts': {
+            'task': 'app.celery_tasks.archive_old_attempts',
+            'schedule': timedelta(days=1),
+        },
+        'purge-expired-exports': {
+            'task': 'app.celery_tasks.purge_expired_exports',
+            'schedule': timedelta(hours=1),
+        },
+    }
+
+    CACHE_TYPE = 'RedisCache'
+    CACHE_REDIS_URL = 'redis://localhost:6379/1' 
+    CACHE_DEFAULT_TIMEOUT = 300
+
+    # Raw Redis connection for application state (admission-control buckets, autosave buffers)
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/2')
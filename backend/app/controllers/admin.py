@@ -1,571 +1,772 @@
-from flask import Blueprint, jsonify, request, current_app
-from app.extension import db, cache
-from app.models import Admin, Attempt, Exam, Subject, Student, Chapter, Question
-from app.decorators import authentication
-from datetime import datetime
-from app.celery_tasks import send_daily_reminders, generate_monthly_report, send_new_exam_notification
-
-
-admin_bp = Blueprint('admin', __name__)
-
-@authentication('admin')
-@admin_bp.route('/dashboard', methods=['GET'])
-def dashboard():
-    try:
-        # Total attempts per subject
-        total_attempts = db.session.query(
-            db.func.count(Attempt.AttemptID).label('total_attempts'),
-            Subject.SubjectName.label('subject_name')
-        ).join(Attempt.exam) \
-         .join(Exam.chapter) \
-         .join(Chapter.subject) \
-         .group_by(Subject.SubjectName).all()
-
-        # Average score per subject
-        average_scores = db.session.query(
-            db.func.avg(Attempt.Marks).label('average_score'),
-            Subject.SubjectName.label('subject_name')
-        ).join(Attempt.exam) \
-         .join(Exam.chapter) \
-         .join(Chapter.subject) \
-         .group_by(Subject.SubjectName).all()
-
-        # Total exams created
-        total_exams = db.session.query(
-            db.func.count(Exam.ExamID)
-        ).scalar()
-
-        # Total students registered
-        total_students = db.session.query(
-            db.func.count(Student.StudentID)
-        ).scalar()
-
-        return jsonify({
-            'total_attempts': [{'subject': row.subject_name, 'count': row.total_attempts} for row in total_attempts],
-            'average_scores': [{'subject': row.subject_name, 'average_score': row.average_score} for row in average_scores],
-            'total_exams': total_exams or 0,
-            'total_students': total_students or 0
-        }), 200
-
-    except Exception as e:
-        return jsonify({'message': 'Error fetching dashboard data', 'error': str(e)}), 500
-
-# Student
-@authentication('admin')
-@admin_bp.route('/students', methods=['GET'])
-def get_students():
-    try:
-        student_id = request.args.get('student_id', type=int)
-        search = request.args.get('search', type=str)
-        if student_id:
-            # GET /admin/students?student_id={{id}}
-            student = Student.query.get(student_id)
-            if not student:
-                return jsonify({'message': 'Student not found'}), 404
-            return jsonify({
-                'StudentID': student.StudentID,
-                'Name': student.Name,
-                'Email': student.Email,
-                'DOB': student.DOB.strftime("%Y-%m-%d"),
-                'CollegeName': student.CollegeName,
-                'Degree': student.Degree
-            }), 200
-        else:
-            query = Student.query
-            if search:
-                query = query.filter(Student.Name.ilike(f'%{search}%'))
-            students = query.all()
-            return jsonify([{'StudentID': student.StudentID,
-                            'Name': student.Name,
-                            'Email': student.Email}
-                            for student in students]), 200
-    except Exception as e:
-        return jsonify({'message': 'Error fetching students', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/students', methods=['DELETE'])
-def delete_student():
-    try:
-        student_id = request.args.get('student_id', type=int)
-        if not student_id:
-            return jsonify({'message': 'student_id query parameter is required to delete a student'}), 400
-        # DELETE /admin/students?student_id={{id}}
-        student = Student.query.get(student_id)
-        if not student:
-            return jsonify({'message': 'Student not found'}), 404
-        db.session.delete(student)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Student deleted successfully'}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error deleting student', 'error': str(e)}), 500
-
-
-## Subject CRUD
-
-@authentication('admin')
-@admin_bp.route('/subjects', methods=['POST'])
-def create_subject():
-    data = request.get_json()
-    if not data:
-        return jsonify({'message': 'Invalid input'}), 400
-    try:
-        subject_name = data.get('SubjectName')
-        description = data.get('Description', '')
-        if Subject.query.filter_by(SubjectName=subject_name).first():
-            return jsonify({'message': 'A subject with this name already exists'}), 409
-        new_subject = Subject(SubjectName=subject_name, Description=description)
-        db.session.add(new_subject)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Subject created successfully', 'subject_id': new_subject.SubjectID}), 201
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error creating subject', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/subjects/<int:subject_id>', methods=['PUT'])
-def update_subject(subject_id):
-    data = request.get_json()
-    if not data:
-        return jsonify({'message': 'Invalid input'}), 400
-    try:
-        subject = Subject.query.get(subject_id)
-        if not subject:
-            return jsonify({'message': 'Subject not found'}), 404
-        subject.SubjectName = data.get('SubjectName', subject.SubjectName)
-        subject.Description = data.get('Description', subject.Description)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Subject updated successfully'}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error updating subject', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/subjects/<int:subject_id>', methods=['DELETE'])
-def delete_subject(subject_id):
-    try:
-        subject = Subject.query.get(subject_id)
-        if not subject:
-            return jsonify({'message': 'Subject not found'}), 404
-        db.session.delete(subject)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Subject deleted successfully'}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error deleting subject', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/subjects', methods=['GET'])
-@cache.cached(timeout=300)
-def get_subjects():
-    try:
-        search = request.args.get('search', type=str)
-        query = Subject.query
-        if search:
-            query = query.filter(Subject.SubjectName.ilike(f'%{search}%'))
-        subjects = query.all()
-        return jsonify([{'SubjectID': subject.SubjectID,
-                         'SubjectName': subject.SubjectName,
-                         'Description': subject.Description}
-                          for subject in subjects]), 200
-    except Exception as e:
-        return jsonify({'message': 'Error fetching subjects', 'error': str(e)}), 500
-
-#Chapter CRUD
-
-@authentication('admin')
-@admin_bp.route('/subjects/<int:subject_id>/chapters', methods=['POST'])
-def create_chapter(subject_id):
-    subject = Subject.query.get_or_404(subject_id)
-    if not subject:
-        return jsonify({'message': 'Subject not found'}), 404
-    data = request.get_json()
-    if not data:
-        return jsonify({'message': 'Invalid input'}), 400
-    try:
-        chapter_name = data.get('ChapterName')
-        description = data.get('Description', '')
-
-        if Chapter.query.filter_by(ChapterName=chapter_name, SubjectID=subject_id).first():
-            return jsonify({'message': 'A chapter with this name already exists for the subject'}), 409
-
-        new_chapter = Chapter(SubjectID=subject_id,
-                              ChapterName=chapter_name,
-                              Description=description)
-        db.session.add(new_chapter)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Chapter created successfully', 'chapter_id': new_chapter.ChapterID}), 201
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error creating chapter', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/subjects/<int:subject_id>/chapters', methods=['GET'])
-@cache.cached(timeout=300)
-def get_chapters(subject_id):
-    try:
-        search = request.args.get('search', type=str)
-        query = Chapter.query.filter_by(SubjectID=subject_id)
-        if search:
-            query = query.filter(Chapter.ChapterName.ilike(f'%{search}%'))
-        chapters = query.all()
-        return jsonify([{'ChapterID': chapter.ChapterID,
-                         'ChapterName': chapter.ChapterName,
-                         'Description': chapter.Description,
-                         'SubjectID': chapter.SubjectID}
-                          for chapter in chapters]), 200
-
-    except Exception as e:
-        return jsonify({'message': 'Error fetching chapters', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/chapters/<int:chapter_id>', methods=['PUT'])
-def update_chapter(chapter_id):
-    data = request.get_json()
-    if not data:
-        return jsonify({'message': 'Invalid input'}), 400
-    try:
-        chapter = Chapter.query.get(chapter_id)
-        if not chapter:
-            return jsonify({'message': 'Chapter not found'}), 404
-
-        chapter.ChapterName = data.get('ChapterName', chapter.ChapterName)
-        chapter.Description = data.get('Description', chapter.Description)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Chapter updated successfully'}), 200
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error updating chapter', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/chapters/<int:chapter_id>', methods=['DELETE'])
-def delete_chapter(chapter_id):
-    try:
-        chapter = Chapter.query.get(chapter_id)
-        if not chapter:
-            return jsonify({'message': 'Chapter not found'}), 404
-        db.session.delete(chapter)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Chapter deleted successfully'}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error deleting chapter', 'error': str(e)}), 500
-
-#exams CRUD
-@authentication('admin')
-@admin_bp.route('/exams/<int:exam_id>/publish', methods=['PUT'])
-def publish_exam(exam_id):
-    try:
-        exam = Exam.query.get(exam_id)
-        if not exam:
-            return jsonify({'message': 'Exam not found'}), 404
-        
-        exam.Published = not exam.Published
-        
-        # If the exam is being published, trigger the notification task
-        if exam.Published:
-            send_new_exam_notification.delay(exam.ExamID)
-            
-        db.session.commit()
-        cache.clear()
-        
-        return jsonify({
-            'message': f'Exam has been {"published" if exam.Published else "unpublished"}.',
-            'published_status': exam.Published
-        }), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error updating exam status', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/exams', methods=['GET'])
-@cache.cached(timeout=300)
-def get_exam():
-    try:
-        chapter_id = request.args.get('chapter_id', type=int)
-        subject_id = request.args.get('subject_id', type=int)
-        search = request.args.get('search', type=str)
-
-        query = db.session.query(
-            Exam,
-            Chapter.ChapterName,
-            Subject.SubjectName,
-            Chapter.SubjectID
-        ).join(Exam.chapter).join(Chapter.subject)
-
-        if subject_id:
-            query = query.filter(Chapter.SubjectID == subject_id)
-        if chapter_id:
-            query = query.filter(Exam.ChapterID == chapter_id)
-        if search:
-            query = query.filter(Exam.ExamName.ilike(f'%{search}%'))
-
-        all_exams = query.all()
-
-        result = []
-        for exam, chapter_name, subject_name, subject_id_val in all_exams:
-            result.append({
-                'ExamID': exam.ExamID,
-                'ExamName': exam.ExamName,
-                'TotalQuestions': exam.TotalQuestions,
-                'TotalDuration': exam.TotalDuration,
-                'ExamDate': exam.ExamDate.strftime("%Y-%m-%d"),
-                'ChapterID': exam.ChapterID,
-                'ChapterName': chapter_name,
-                'SubjectID': subject_id_val,
-                'SubjectName': subject_name,
-                'Published': exam.Published,
-                'ExamType': exam.ExamType,
-                'StartTime': exam.StartTime.strftime("%H:%M") if exam.StartTime else None
-            })
-        return jsonify(result), 200
-
-    except Exception as e:
-        current_app.logger.error(f"Error fetching exams: {e}", exc_info=True)
-        return jsonify({'message': 'Error fetching exams', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/exams', methods=['POST'])
-def create_exam():
-    chapter_id = request.args.get('chapter_id', type=int)
-    if not chapter_id:
-        return jsonify({'message': 'chapter_id query parameter is required to create an exam'}), 400
-
-    data = request.get_json()
-    if not Chapter.query.get(chapter_id):
-        return jsonify({'message': 'Chapter not found'}), 404
-
-    try:
-        start_time = None
-        exam_date = datetime.strptime(data.get('ExamDate'), "%Y-%m-%d")
-
-        if data.get('ExamType') == 'specific_time' and data.get('StartTime'):
-            start_time = datetime.strptime(f"{data.get('ExamDate')} {data.get('StartTime')}", "%Y-%m-%d %H:%M")
-
-        new_exam = Exam(
-            ChapterID=chapter_id,
-            ExamName=data.get('ExamName'),
-            TotalMarks=0,
-            TotalQuestions=0,
-            TotalDuration=int(data.get('TotalDuration', 0)),
-            ExamDate=exam_date,
-            Published=data.get('Published', False),
-            ExamType=data.get('ExamType', 'deadline'),
-            StartTime=start_time
-        )
-        db.session.add(new_exam)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Exam created successfully', 'exam_id': new_exam.ExamID}), 201
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error creating exam', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/exams/<int:exam_id>', methods=['PUT'])
-def update_exam(exam_id):
-    data = request.get_json()
-    if not data:
-        return jsonify({'message': 'Invalid input'}), 400
-    try:
-        exam = Exam.query.get(exam_id)
-        if not exam:
-            return jsonify({'message': 'Exam not found'}), 404
-
-        if exam.Published:
-            return jsonify({'message': 'Cannot update a published exam'}), 403
-
-        exam.ExamName = data.get('ExamName', exam.ExamName)
-        exam.TotalDuration = data.get('TotalDuration', exam.TotalDuration)
-        
-        if 'ExamDate' in data:
-            exam.ExamDate = datetime.strptime(data['ExamDate'], "%Y-%m-%d")
-
-        exam.Published = data.get('Published', exam.Published)
-        exam.ExamType = data.get('ExamType', exam.ExamType)
-
-        if exam.ExamType == 'specific_time':
-            if 'StartTime' in data and data['StartTime']:
-                exam_date_str = exam.ExamDate.strftime('%Y-%m-%d')
-                exam.StartTime = datetime.strptime(f"{exam_date_str} {data['StartTime']}", "%Y-%m-%d %H:%M")
-        else:
-            exam.StartTime = None
-
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Exam updated successfully'}), 200
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error updating exam', 'error': str(e)}), 500
-        
-@authentication('admin')
-@admin_bp.route('/exams/<int:exam_id>', methods=['DELETE'])
-def delete_exam(exam_id):
-    try:
-        exam = Exam.query.get(exam_id)
-        if not exam:
-            return jsonify({'message': 'Exam not found'}), 404
-        db.session.delete(exam)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Exam deleted successfully'}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error deleting exam', 'error': str(e)}), 500
-
-#questions CRUD
-
-@authentication('admin')
-@admin_bp.route('/exams/<int:exam_id>/questions', methods=['POST'])
-def create_question(exam_id):
-    exam = Exam.query.get_or_404(exam_id)
-    if exam.Published:
-        return jsonify({'message': 'Cannot add questions to a published exam'}), 403
-    data = request.get_json()
-    if not data:
-        return jsonify({'message': 'Invalid input'}), 400
-    try:
-        question_statement = data.get('QuestionStatement')
-        option1 = data.get('Option1')
-        option2 = data.get('Option2')
-        option3 = data.get('Option3', '')
-        option4 = data.get('Option4', '')
-        correct_option = data.get('CorrectOption')
-        marks = data.get('Marks', 0)
-        negative_marks = data.get('NegMarks', 0)
-
-        new_question = Question(ExamID=exam_id,
-                                QuestionStatement=question_statement,
-                                Option1=option1,
-                                Option2=option2,
-                                Option3=option3,
-                                Option4=option4,
-                                CorrectOption=correct_option,
-                                Marks=marks,
-                                NegMarks=negative_marks)
-        db.session.add(new_question)
-        exam.TotalQuestions += 1
-        exam.TotalMarks += marks
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Question created successfully', 'question_id': new_question.QuestionID}), 201
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error creating question', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/exams/<int:exam_id>/questions', methods=['GET'])
-@cache.cached(timeout=300)
-def get_questions(exam_id):
-    try:
-        questions = Question.query.filter_by(ExamID=exam_id).all()
-        return jsonify([{'QuestionID': question.QuestionID,
-                         'ExamID': question.ExamID,
-                         'QuestionStatement': question.QuestionStatement,
-                         'Option1': question.Option1,
-                         'Option2': question.Option2,
-                         'Option3': question.Option3,
-                         'Option4': question.Option4,
-                         'CorrectOption': question.CorrectOption,
-                         'Marks': question.Marks,
-                         'NegMarks': question.NegMarks}
-                          for question in questions]), 200
-    except Exception as e:
-        return jsonify({'message': 'Error fetching questions', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/questions/<int:question_id>', methods=['PUT'])
-def update_question(question_id):
-    data = request.get_json()
-    if not data:
-        return jsonify({'message': 'Invalid input'}), 400
-    try:
-        question = Question.query.get(question_id)
-        if not question:
-            return jsonify({'message': 'Question not found'}), 404
-        
-        exam = Exam.query.get(question.ExamID)
-        if exam.Published:
-            return jsonify({'message': 'Cannot update questions of a published exam'}), 403
-
-        question.QuestionStatement = data.get('QuestionStatement', question.QuestionStatement)
-        question.Option1 = data.get('Option1', question.Option1)
-        question.Option2 = data.get('Option2', question.Option2)
-        question.Option3 = data.get('Option3', question.Option3)
-        question.Option4 = data.get('Option4', question.Option4)
-        question.CorrectOption = data.get('CorrectOption', question.CorrectOption)
-        exam.TotalMarks = (exam.TotalMarks - question.Marks) + data.get('Marks', question.Marks)
-        question.Marks = data.get('Marks', question.Marks)
-        question.NegMarks = data.get('NegMarks', question.NegMarks)
-
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Question updated successfully'}), 200
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error updating question', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/questions/<int:question_id>', methods=['DELETE'])
-def delete_question(question_id):
-    try:
-        question = Question.query.get(question_id)
-        if not question:
-            return jsonify({'message': 'Question not found'}), 404
-            
-        exam = Exam.query.get(question.ExamID)
-        if exam.Published:
-            return jsonify({'message': 'Cannot delete questions of a published exam'}), 403
-
-        exam.TotalQuestions -= 1
-        exam.TotalMarks -= question.Marks
-        db.session.delete(question)
-        db.session.commit()
-        cache.clear()
-        return jsonify({'message': 'Question deleted successfully'}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error deleting question', 'error': str(e)}), 500
-    
-#celery tasks
-@authentication('admin')
-@admin_bp.route('/students/<int:student_id>/send-report', methods=['POST'])
-def send_exam_report(student_id):
-    try:
-        student = Student.query.get(student_id)
-        if not student:
-            return jsonify({'message': 'Student not found'}), 404
-
-        print(student)
-        from app.celery_tasks import generate_exam_report_for_student
-        generate_exam_report_for_student.delay(student_id)
-
-        return jsonify({'message': 'Exam report generation has been triggered.'}), 202
-    except Exception as e:
-        print(f"Error triggering report generation: {e}")
-        return jsonify({'message': 'Error triggering report generation', 'error': str(e)}), 500
-
-@authentication('admin')
-@admin_bp.route('/students/export', methods=['POST'])
-def export_students():
-    """
-    Triggers an asynchronous export of all students' data.
-    """
-    try:
-        from app.celery_tasks import export_all_student_reports
-        export_all_student_reports.delay()
-        return jsonify({'message': 'All students data is being exported and will be sent to your email.'}), 202
-    except Exception as e:
-        return jsonify({'message': 'Error triggering export', 'error': str(e)}), 500
\ No newline at end of file
+from flask import Blueprint, jsonify, request, current_app, g, Response, send_file, stream_with_context
+from app.extension import db
+from app.models import Admin, Attempt, Exam, Subject, Student, Chapter, Question, SubjectRollup, QuestionStat
+from app.database import read_replica
+from app.pagination import paginated
+from app.search import apply_search
+from app.decorators import authentication
+from app.paper_cache import warm_paper
+from app.cache_tags import cached_tagged, invalidate, cache_stats
+from app.principal_cache import invalidate_principal
+from app.rollups import rebuild_rollups, rebuild_student_rollups, rollup_scope, exams_attempted_by
+from app.leaderboard import exam_leaderboard, remove_from_leaderboards, drop_leaderboards
+from app.reports import start_progress, export_progress
+from app.exports import ATTEMPTS_HEADER, attempts_csv_rows, gzip_csv_stream, export_path, reserve_export, find_export
+from datetime import datetime
+import json
+import os
+import redis
+from uuid import uuid4
+from app.celery_tasks import send_daily_reminders, generate_monthly_report, send_new_exam_notification, rescore_exam_attempts, rebuild_exam_leaderboards, analyse_exam_items
+
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.route('/dashboard', methods=['GET'])
+@authentication('admin')
+@read_replica
+def dashboard():
+    try:
+        # Attempts and average score per subject, read from the maintained rollups
+        subject_rollups = db.session.query(
+            SubjectRollup.AttemptCount,
+            SubjectRollup.MarksSum,
+            Subject.SubjectName.label('subject_name')
+        ).join(Subject, Subject.SubjectID == SubjectRollup.SubjectID) \
+         .filter(SubjectRollup.AttemptCount > 0).all()
+
+        # Total exams created
+        total_exams = db.session.query(
+            db.func.count(Exam.ExamID)
+        ).scalar()
+
+        # Total students registered
+        total_students = db.session.query(
+            db.func.count(Student.StudentID)
+        ).scalar()
+
+        return jsonify({
+            'total_attempts': [{'subject': row.subject_name, 'count': row.AttemptCount} for row in subject_rollups],
+            'average_scores': [{'subject': row.subject_name, 'average_score': row.MarksSum / row.AttemptCount} for row in subject_rollups],
+            'total_exams': total_exams or 0,
+            'total_students': total_students or 0
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': 'Error fetching dashboard data', 'error': str(e)}), 500
+
+# Student
+@admin_bp.route('/students', methods=['GET'])
+@authentication('admin')
+@read_replica
+def get_students():
+    try:
+        student_id = request.args.get('student_id', type=int)
+        search = request.args.get('search', type=str)
+        if student_id:
+            # GET /admin/students?student_id={{id}}
+            student = Student.query.get(student_id)
+            if not student:
+                return jsonify({'message': 'Student not found'}), 404
+            return jsonify({
+                'StudentID': student.StudentID,
+                'Name': student.Name,
+                'Email': student.Email,
+                'DOB': student.DOB.strftime("%Y-%m-%d"),
+                'CollegeName': student.CollegeName,
+                'Degree': student.Degree
+            }), 200
+        else:
+            # Only the listed columns are loaded, not whole Student rows
+            query = db.session.query(Student.StudentID, Student.Name, Student.Email)
+            keys = [Student.StudentID]
+            if search:
+                # best matches first; the rank becomes part of the page cursor
+                query, rank = apply_search(query, 'student', search)
+                rank = rank.label('SearchRank')
+                query, keys = query.add_columns(rank), [rank] + keys
+            return paginated(query, keys, lambda student: {
+                'StudentID': student.StudentID,
+                'Name': student.Name,
+                'Email': student.Email
+            })
+    except Exception as e:
+        return jsonify({'message': 'Error fetching students', 'error': str(e)}), 500
+
+@admin_bp.route('/students', methods=['DELETE'])
+@authentication('admin')
+def delete_student():
+    try:
+        student_id = request.args.get('student_id', type=int)
+        if not student_id:
+            return jsonify({'message': 'student_id query parameter is required to delete a student'}), 400
+        # DELETE /admin/students?student_id={{id}}
+        student = Student.query.get(student_id)
+        if not student:
+            return jsonify({'message': 'Student not found'}), 404
+        attempted_exams = exams_attempted_by(student_id)
+        db.session.delete(student)
+        rebuild_rollups(attempted_exams)
+        db.session.commit()
+        invalidate_principal('student', student_id)
+        remove_from_leaderboards(student_id, attempted_exams)
+        return jsonify({'message': 'Student deleted successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error deleting student', 'error': str(e)}), 500
+
+
+def _delete_with_exams(entity, exam_ids):
+    # Deleting a subject, chapter or exam removes attempts, so the rollups that counted them are rebuilt
+    subject_ids, student_ids = rollup_scope(exam_ids)
+    db.session.delete(entity)
+    db.session.flush()
+    rebuild_rollups(exam_ids, subject_ids)
+    rebuild_student_rollups(student_ids)
+    db.session.commit()
+    drop_leaderboards(exam_ids)
+
+
+## Subject CRUD
+
+@admin_bp.route('/subjects', methods=['POST'])
+@authentication('admin')
+def create_subject():
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid input'}), 400
+    try:
+        subject_name = data.get('SubjectName')
+        description = data.get('Description', '')
+        if Subject.query.filter_by(SubjectName=subject_name).first():
+            return jsonify({'message': 'A subject with this name already exists'}), 409
+        new_subject = Subject(SubjectName=subject_name, Description=description)
+        db.session.add(new_subject)
+        db.session.commit()
+        invalidate('subjects')
+        return jsonify({'message': 'Subject created successfully', 'subject_id': new_subject.SubjectID}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error creating subject', 'error': str(e)}), 500
+
+@admin_bp.route('/subjects/<int:subject_id>', methods=['PUT'])
+@authentication('admin')
+def update_subject(subject_id):
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid input'}), 400
+    try:
+        subject = Subject.query.get(subject_id)
+        if not subject:
+            return jsonify({'message': 'Subject not found'}), 404
+        subject.SubjectName = data.get('SubjectName', subject.SubjectName)
+        subject.Description = data.get('Description', subject.Description)
+        db.session.commit()
+        invalidate('subjects', f'subject:{subject_id}', 'exams')
+        return jsonify({'message': 'Subject updated successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error updating subject', 'error': str(e)}), 500
+
+@admin_bp.route('/subjects/<int:subject_id>', methods=['DELETE'])
+@authentication('admin')
+def delete_subject(subject_id):
+    try:
+        subject = Subject.query.get(subject_id)
+        if not subject:
+            return jsonify({'message': 'Subject not found'}), 404
+        exam_ids = [exam_id for (exam_id,) in db.session.query(Exam.ExamID)
+                    .join(Exam.chapter).filter(Chapter.SubjectID == subject_id)]
+        _delete_with_exams(subject, exam_ids)
+        invalidate('subjects', f'subject:{subject_id}', 'exams', *[f'exam:{exam_id}' for exam_id in exam_ids])
+        return jsonify({'message': 'Subject deleted successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error deleting subject', 'error': str(e)}), 500
+
+@admin_bp.route('/subjects', methods=['GET'])
+@authentication('admin')
+@cached_tagged(lambda: ['subjects'], timeout=300)
+def get_subjects():
+    try:
+        search = request.args.get('search', type=str)
+        query = Subject.query
+        if search:
+            query, rank = apply_search(query, 'subject', search)
+            query = query.order_by(rank, Subject.SubjectID)
+        subjects = query.all()
+        return jsonify([{'SubjectID': subject.SubjectID,
+                         'SubjectName': subject.SubjectName,
+                         'Description': subject.Description}
+                          for subject in subjects]), 200
+    except Exception as e:
+        return jsonify({'message': 'Error fetching subjects', 'error': str(e)}), 500
+
+#Chapter CRUD
+
+@admin_bp.route('/subjects/<int:subject_id>/chapters', methods=['POST'])
+@authentication('admin')
+def create_chapter(subject_id):
+    subject = Subject.query.get_or_404(subject_id)
+    if not subject:
+        return jsonify({'message': 'Subject not found'}), 404
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid input'}), 400
+    try:
+        chapter_name = data.get('ChapterName')
+        description = data.get('Description', '')
+
+        if Chapter.query.filter_by(ChapterName=chapter_name, SubjectID=subject_id).first():
+            return jsonify({'message': 'A chapter with this name already exists for the subject'}), 409
+
+        new_chapter = Chapter(SubjectID=subject_id,
+                              ChapterName=chapter_name,
+                              Description=description)
+        db.session.add(new_chapter)
+        db.session.commit()
+        invalidate(f'subject:{subject_id}')
+        return jsonify({'message': 'Chapter created successfully', 'chapter_id': new_chapter.ChapterID}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error creating chapter', 'error': str(e)}), 500
+
+@admin_bp.route('/subjects/<int:subject_id>/chapters', methods=['GET'])
+@authentication('admin')
+@cached_tagged(lambda subject_id: [f'subject:{subject_id}'], timeout=300)
+def get_chapters(subject_id):
+    try:
+        search = request.args.get('search', type=str)
+        query = Chapter.query.filter_by(SubjectID=subject_id)
+        if search:
+            query, rank = apply_search(query, 'chapter', search)
+            query = query.order_by(rank, Chapter.ChapterID)
+        chapters = query.all()
+        return jsonify([{'ChapterID': chapter.ChapterID,
+                         'ChapterName': chapter.ChapterName,
+                         'Description': chapter.Description,
+                         'SubjectID': chapter.SubjectID}
+                          for chapter in chapters]), 200
+
+    except Exception as e:
+        return jsonify({'message': 'Error fetching chapters', 'error': str(e)}), 500
+
+@admin_bp.route('/chapters/<int:chapter_id>', methods=['PUT'])
+@authentication('admin')
+def update_chapter(chapter_id):
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid input'}), 400
+    try:
+        chapter = Chapter.query.get(chapter_id)
+        if not chapter:
+            return jsonify({'message': 'Chapter not found'}), 404
+
+        chapter.ChapterName = data.get('ChapterName', chapter.ChapterName)
+        chapter.Description = data.get('Description', chapter.Description)
+        db.session.commit()
+        invalidate(f'subject:{chapter.SubjectID}', 'exams')
+        return jsonify({'message': 'Chapter updated successfully'}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error updating chapter', 'error': str(e)}), 500
+
+@admin_bp.route('/chapters/<int:chapter_id>', methods=['DELETE'])
+@authentication('admin')
+def delete_chapter(chapter_id):
+    try:
+        chapter = Chapter.query.get(chapter_id)
+        if not chapter:
+            return jsonify({'message': 'Chapter not found'}), 404
+        exam_ids = [exam_id for (exam_id,) in db.session.query(Exam.ExamID).filter_by(ChapterID=chapter_id)]
+        _delete_with_exams(chapter, exam_ids)
+        invalidate(f'subject:{chapter.SubjectID}', 'exams', *[f'exam:{exam_id}' for exam_id in exam_ids])
+        return jsonify({'message': 'Chapter deleted successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error deleting chapter', 'error': str(e)}), 500
+
+#exams CRUD
+@admin_bp.route('/exams/<int:exam_id>/publish', methods=['PUT'])
+@authentication('admin')
+def publish_exam(exam_id):
+    try:
+        exam = Exam.query.get(exam_id)
+        if not exam:
+            return jsonify({'message': 'Exam not found'}), 404
+        
+        exam.Published = not exam.Published
+        exam.Version += 1
+        
+        # If the exam is being published, trigger the notification task
+        if exam.Published:
+            send_new_exam_notification.delay(exam.ExamID)
+            
+        db.session.commit()
+        invalidate('exams')
+
+        # Serialize the student paper once, up front, for the now-immutable exam
+        if exam.Published:
+            warm_paper(exam)
+        
+        return jsonify({
+            'message': f'Exam has been {"published" if exam.Published else "unpublished"}.',
+            'published_status': exam.Published
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error updating exam status', 'error': str(e)}), 500
+
+@admin_bp.route('/exams', methods=['GET'])
+@authentication('admin')
+@cached_tagged(lambda: ['exams'], timeout=300)
+def get_exam():
+    try:
+        chapter_id = request.args.get('chapter_id', type=int)
+        subject_id = request.args.get('subject_id', type=int)
+        search = request.args.get('search', type=str)
+
+        query = db.session.query(
+            Exam,
+            Chapter.ChapterName,
+            Subject.SubjectName,
+            Chapter.SubjectID
+        ).join(Exam.chapter).join(Chapter.subject)
+
+        if subject_id:
+            query = query.filter(Chapter.SubjectID == subject_id)
+        if chapter_id:
+            query = query.filter(Exam.ChapterID == chapter_id)
+        keys, cursor_of = [Exam.ExamID], lambda row: [row.Exam.ExamID]
+        if search:
+            query, rank = apply_search(query, 'exam', search)
+            rank = rank.label('SearchRank')
+            query, keys = query.add_columns(rank), [rank] + keys
+            cursor_of = lambda row: [row.SearchRank, row.Exam.ExamID]
+
+        def serialize(row):
+            exam, chapter_name, subject_name, subject_id_val = row[:4]
+            return {
+                'ExamID': exam.ExamID,
+                'ExamName': exam.ExamName,
+                'TotalQuestions': exam.TotalQuestions,
+                'TotalDuration': exam.TotalDuration,
+                'ExamDate': exam.ExamDate.strftime("%Y-%m-%d"),
+                'ChapterID': exam.ChapterID,
+                'ChapterName': chapter_name,
+                'SubjectID': subject_id_val,
+                'SubjectName': subject_name,
+                'Published': exam.Published,
+                'ExamType': exam.ExamType,
+                'StartTime': exam.StartTime.strftime("%H:%M") if exam.StartTime else None
+            }
+        return paginated(query, keys, serialize, cursor_of=cursor_of)
+
+    except Exception as e:
+        current_app.logger.error(f"Error fetching exams: {e}", exc_info=True)
+        return jsonify({'message': 'Error fetching exams', 'error': str(e)}), 500
+
+@admin_bp.route('/exams', methods=['POST'])
+@authentication('admin')
+def create_exam():
+    chapter_id = request.args.get('chapter_id', type=int)
+    if not chapter_id:
+        return jsonify({'message': 'chapter_id query parameter is required to create an exam'}), 400
+
+    data = request.get_json()
+    if not Chapter.query.get(chapter_id):
+        return jsonify({'message': 'Chapter not found'}), 404
+
+    try:
+        start_time = None
+        exam_date = datetime.strptime(data.get('ExamDate'), "%Y-%m-%d")
+
+        if data.get('ExamType') == 'specific_time' and data.get('StartTime'):
+            start_time = datetime.strptime(f"{data.get('ExamDate')} {data.get('StartTime')}", "%Y-%m-%d %H:%M")
+
+        new_exam = Exam(
+            ChapterID=chapter_id,
+            ExamName=data.get('ExamName'),
+            TotalMarks=0,
+            TotalQuestions=0,
+            TotalDuration=int(data.get('TotalDuration', 0)),
+            ExamDate=exam_date,
+            Published=data.get('Published', False),
+            ExamType=data.get('ExamType', 'deadline'),
+            StartTime=start_time
+        )
+        db.session.add(new_exam)
+        db.session.commit()
+        invalidate('exams')
+        return jsonify({'message': 'Exam created successfully', 'exam_id': new_exam.ExamID}), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error creating exam', 'error': str(e)}), 500
+
+@admin_bp.route('/exams/<int:exam_id>', methods=['PUT'])
+@authentication('admin')
+def update_exam(exam_id):
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid input'}), 400
+    try:
+        exam = Exam.query.get(exam_id)
+        if not exam:
+            return jsonify({'message': 'Exam not found'}), 404
+
+        if exam.Published:
+            return jsonify({'message': 'Cannot update a published exam'}), 403
+
+        exam.ExamName = data.get('ExamName', exam.ExamName)
+        exam.TotalDuration = data.get('TotalDuration', exam.TotalDuration)
+        
+        if 'ExamDate' in data:
+            exam.ExamDate = datetime.strptime(data['ExamDate'], "%Y-%m-%d")
+
+        exam.Published = data.get('Published', exam.Published)
+        exam.ExamType = data.get('ExamType', exam.ExamType)
+
+        if exam.ExamType == 'specific_time':
+            if 'StartTime' in data and data['StartTime']:
+                exam_date_str = exam.ExamDate.strftime('%Y-%m-%d')
+                exam.StartTime = datetime.strptime(f"{exam_date_str} {data['StartTime']}", "%Y-%m-%d %H:%M")
+        else:
+            exam.StartTime = None
+
+        exam.Version += 1
+        db.session.commit()
+        invalidate('exams')
+        return jsonify({'message': 'Exam updated successfully'}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error updating exam', 'error': str(e)}), 500
+        
+@admin_bp.route('/exams/<int:exam_id>', methods=['DELETE'])
+@authentication('admin')
+def delete_exam(exam_id):
+    try:
+        exam = Exam.query.get(exam_id)
+        if not exam:
+            return jsonify({'message': 'Exam not found'}), 404
+        _delete_with_exams(exam, [exam_id])
+        invalidate('exams', f'exam:{exam_id}')
+        return jsonify({'message': 'Exam deleted successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error deleting exam', 'error': str(e)}), 500
+
+@admin_bp.route('/exams/<int:exam_id>/rescore', methods=['POST'])
+@authentication('admin')
+def rescore_exam(exam_id):
+    try:
+        exam = Exam.query.get(exam_id)
+        if not exam:
+            return jsonify({'message': 'Exam not found'}), 404
+        rescore_exam_attempts.delay(exam.ExamID)
+        return jsonify({'message': 'Re-scoring of all attempts has been triggered.'}), 202
+    except Exception as e:
+        return jsonify({'message': 'Error triggering re-scoring', 'error': str(e)}), 500
+
+@admin_bp.route('/exams/<int:exam_id>/leaderboard', methods=['GET'])
+@authentication('admin')
+@read_replica
+def get_exam_leaderboard(exam_id):
+    try:
+        exam = Exam.query.get(exam_id)
+        if not exam:
+            return jsonify({'message': 'Exam not found'}), 404
+        limit = request.args.get('limit', 10, type=int)
+        student_id = request.args.get('student_id', type=int)
+        return jsonify(exam_leaderboard(exam_id, limit, student_id)), 200
+    except redis.RedisError as e:
+        return jsonify({'message': 'Leaderboard is temporarily unavailable', 'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'message': 'Error fetching leaderboard', 'error': str(e)}), 500
+
+@admin_bp.route('/exams/<int:exam_id>/item-analysis', methods=['POST'])
+@authentication('admin')
+def trigger_item_analysis(exam_id):
+    try:
+        exam = Exam.query.get(exam_id)
+        if not exam:
+            return jsonify({'message': 'Exam not found'}), 404
+        analyse_exam_items.delay(exam.ExamID)
+        return jsonify({'message': 'Item analysis has been triggered.'}), 202
+    except Exception as e:
+        return jsonify({'message': 'Error triggering item analysis', 'error': str(e)}), 500
+
+@admin_bp.route('/exams/<int:exam_id>/item-analysis', methods=['GET'])
+@authentication('admin')
+@read_replica
+def get_item_analysis(exam_id):
+    try:
+        exam = Exam.query.get(exam_id)
+        if not exam:
+            return jsonify({'message': 'Exam not found'}), 404
+        rows = db.session.query(QuestionStat, Question).join(QuestionStat.question) \
+            .filter(QuestionStat.ExamID == exam_id).order_by(Question.QuestionID).all()
+        items = []
+        for stat, question in rows:
+            counts = json.loads(stat.OptionCounts)
+            items.append({
+                'QuestionID': question.QuestionID,
+                'QuestionStatement': question.QuestionStatement,
+                'CorrectOption': question.CorrectOption,
+                'Responses': stat.Responses,
+                'PValue': stat.PValue,
+                'PointBiserial': stat.PointBiserial,
+                'Unanswered': counts[0],
+                # share of attempts picking each option; the wrong ones are the distractors
+                'OptionFrequencies': {
+                    str(option): count / stat.Responses if stat.Responses else None
+                    for option, count in enumerate(counts[1:], start=1)
+                }
+            })
+        return jsonify({
+            'exam_id': exam_id,
+            # stale once questions are edited after the analysis ran
+            'stale': any(stat.ExamVersion != exam.Version for stat, _ in rows),
+            'computed_at': rows[0][0].ComputedAt.strftime("%Y-%m-%d %H:%M:%S") if rows else None,
+            'items': items
+        }), 200
+    except Exception as e:
+        return jsonify({'message': 'Error fetching item analysis', 'error': str(e)}), 500
+
+@admin_bp.route('/leaderboards/rebuild', methods=['POST'])
+@authentication('admin')
+def rebuild_leaderboards():
+    try:
+        exam_id = request.args.get('exam_id', type=int)
+        rebuild_exam_leaderboards.delay(exam_id)
+        return jsonify({'message': 'Leaderboard rebuild has been triggered.'}), 202
+    except Exception as e:
+        return jsonify({'message': 'Error triggering leaderboard rebuild', 'error': str(e)}), 500
+
+#questions CRUD
+
+@admin_bp.route('/exams/<int:exam_id>/questions', methods=['POST'])
+@authentication('admin')
+def create_question(exam_id):
+    exam = Exam.query.get_or_404(exam_id)
+    if exam.Published:
+        return jsonify({'message': 'Cannot add questions to a published exam'}), 403
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid input'}), 400
+    try:
+        question_statement = data.get('QuestionStatement')
+        option1 = data.get('Option1')
+        option2 = data.get('Option2')
+        option3 = data.get('Option3', '')
+        option4 = data.get('Option4', '')
+        correct_option = data.get('CorrectOption')
+        marks = data.get('Marks', 0)
+        negative_marks = data.get('NegMarks', 0)
+
+        new_question = Question(ExamID=exam_id,
+                                QuestionStatement=question_statement,
+                                Option1=option1,
+                                Option2=option2,
+                                Option3=option3,
+                                Option4=option4,
+                                CorrectOption=correct_option,
+                                Marks=marks,
+                                NegMarks=negative_marks)
+        db.session.add(new_question)
+        exam.TotalQuestions += 1
+        exam.TotalMarks += marks
+        exam.Version += 1
+        db.session.commit()
+        invalidate('exams', f'exam:{exam_id}')
+        return jsonify({'message': 'Question created successfully', 'question_id': new_question.QuestionID}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error creating question', 'error': str(e)}), 500
+
+@admin_bp.route('/exams/<int:exam_id>/questions', methods=['GET'])
+@authentication('admin')
+@cached_tagged(lambda exam_id: [f'exam:{exam_id}'], timeout=300)
+def get_questions(exam_id):
+    try:
+        questions = Question.query.filter_by(ExamID=exam_id)
+        return paginated(questions, [Question.QuestionID], lambda question: {
+            'QuestionID': question.QuestionID,
+            'ExamID': question.ExamID,
+            'QuestionStatement': question.QuestionStatement,
+            'Option1': question.Option1,
+            'Option2': question.Option2,
+            'Option3': question.Option3,
+            'Option4': question.Option4,
+            'CorrectOption': question.CorrectOption,
+            'Marks': question.Marks,
+            'NegMarks': question.NegMarks
+        })
+    except Exception as e:
+        return jsonify({'message': 'Error fetching questions', 'error': str(e)}), 500
+
+@admin_bp.route('/questions/<int:question_id>', methods=['PUT'])
+@authentication('admin')
+def update_question(question_id):
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': 'Invalid input'}), 400
+    try:
+        question = Question.query.get(question_id)
+        if not question:
+            return jsonify({'message': 'Question not found'}), 404
+        
+        exam = Exam.query.get(question.ExamID)
+        if exam.Published:
+            return jsonify({'message': 'Cannot update questions of a published exam'}), 403
+
+        question.QuestionStatement = data.get('QuestionStatement', question.QuestionStatement)
+        question.Option1 = data.get('Option1', question.Option1)
+        question.Option2 = data.get('Option2', question.Option2)
+        question.Option3 = data.get('Option3', question.Option3)
+        question.Option4 = data.get('Option4', question.Option4)
+        question.CorrectOption = data.get('CorrectOption', question.CorrectOption)
+        exam.TotalMarks = (exam.TotalMarks - question.Marks) + data.get('Marks', question.Marks)
+        question.Marks = data.get('Marks', question.Marks)
+        question.NegMarks = data.get('NegMarks', question.NegMarks)
+        exam.Version += 1
+
+        db.session.commit()
+        invalidate('exams', f'exam:{exam.ExamID}')
+        return jsonify({'message': 'Question updated successfully'}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error updating question', 'error': str(e)}), 500
+
+@admin_bp.route('/questions/<int:question_id>', methods=['DELETE'])
+@authentication('admin')
+def delete_question(question_id):
+    try:
+        question = Question.query.get(question_id)
+        if not question:
+            return jsonify({'message': 'Question not found'}), 404
+            
+        exam = Exam.query.get(question.ExamID)
+        if exam.Published:
+            return jsonify({'message': 'Cannot delete questions of a published exam'}), 403
+
+        exam.TotalQuestions -= 1
+        exam.TotalMarks -= question.Marks
+        exam.Version += 1
+        db.session.delete(question)
+        db.session.commit()
+        invalidate('exams', f'exam:{exam.ExamID}')
+        return jsonify({'message': 'Question deleted successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error deleting question', 'error': str(e)}), 500
+    
+@admin_bp.route('/cache/stats', methods=['GET'])
+@authentication('admin')
+def get_cache_stats():
+    try:
+        return jsonify(cache_stats([
+            get_subjects.__name__,
+            get_chapters.__name__,
+            get_exam.__name__,
+            get_questions.__name__
+        ])), 200
+    except Exception as e:
+        return jsonify({'message': 'Error fetching cache statistics', 'error': str(e)}), 500
+
+#celery tasks
+@admin_bp.route('/students/<int:student_id>/send-report', methods=['POST'])
+@authentication('admin')
+def send_exam_report(student_id):
+    try:
+        student = Student.query.get(student_id)
+        if not student:
+            return jsonify({'message': 'Student not found'}), 404
+
+        print(student)
+        from app.celery_tasks import generate_exam_report_for_student
+        generate_exam_report_for_student.delay(student_id)
+
+        return jsonify({'message': 'Exam report generation has been triggered.'}), 202
+    except Exception as e:
+        print(f"Error triggering report generation: {e}")
+        return jsonify({'message': 'Error triggering report generation', 'error': str(e)}), 500
+
+@admin_bp.route('/students/export', methods=['POST'])
+@authentication('admin')
+def export_students():
+    """
+    Triggers an asynchronous export of all students' data. The returned export_id
+    can be polled for progress.
+    """
+    try:
+        from app.celery_tasks import export_all_student_reports
+        admin_id = g.current_user.AdminID
+        export_id = uuid4().hex
+        start_progress(export_id, admin_id)
+        export_all_student_reports.delay(export_id, admin_id)
+        return jsonify({
+            'message': 'All students data is being exported and will be sent to your email.',
+            'export_id': export_id
+        }), 202
+    except Exception as e:
+        return jsonify({'message': 'Error triggering export', 'error': str(e)}), 500
+
+@admin_bp.route('/students/export/<export_id>', methods=['GET'])
+@authentication('admin')
+def export_students_progress(export_id):
+    try:
+        progress = export_progress(export_id)
+        # Only the admin who triggered an export sees its progress
+        if not progress or progress['admin_id'] != g.current_user.AdminID:
+            return jsonify({'message': 'Export not found'}), 404
+        return jsonify(progress), 200
+    except redis.RedisError as e:
+        return jsonify({'message': 'Export progress is temporarily unavailable', 'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'message': 'Error fetching export progress', 'error': str(e)}), 500
+
+@admin_bp.route('/attempts/export', methods=['POST'])
+@authentication('admin')
+def export_attempts():
+    """Triggers a gzip CSV export of every completed attempt, downloadable by export_id."""
+    try:
+        from app.celery_tasks import export_all_attempts_to_csv
+        export_id = uuid4().hex
+        reserve_export(export_path('attempts', 'all', export_id))
+        export_all_attempts_to_csv.delay(export_id)
+        return jsonify({'message': 'Attempts are being exported.', 'export_id': export_id}), 202
+    except Exception as e:
+        return jsonify({'message': 'Error triggering export', 'error': str(e)}), 500
+
+@admin_bp.route('/attempts/export', methods=['GET'])
+@authentication('admin')
+def stream_attempts():
+    """Streams every completed attempt as gzip CSV, straight from the database."""
+    try:
+        return Response(
+            stream_with_context(gzip_csv_stream(ATTEMPTS_HEADER, attempts_csv_rows())),
+            mimetype='application/gzip',
+            headers={'Content-Disposition': 'attachment; filename=attempts.csv.gz'}
+        )
+    except Exception as e:
+        return jsonify({'message': 'Error exporting attempts', 'error': str(e)}), 500
+
+@admin_bp.route('/exports/<export_id>', methods=['GET'])
+@authentication('admin')
+def download_export(export_id):
+    """Serves any finished export by id; Range requests are answered with 206."""
+    try:
+        state, path = find_export(export_id)
+        if state == 'pending':
+            return jsonify({'message': 'The export is still being prepared.'}), 202
+        if not state:
+            return jsonify({'message': 'Export not found'}), 404
+        return send_file(path, mimetype='application/gzip', as_attachment=True,
+                         download_name=os.path.basename(path), conditional=True)
+    except Exception as e:
+        return jsonify({'message': 'Error downloading export', 'error': str(e)}), 500
\ No newline at end of file
@@ -1,60 +1,81 @@
-from flask import request, jsonify, Blueprint, current_app
-from app.extension import bcrypt
-from app.models import Admin, Student
-import jwt
-import datetime
-
-
-auth_bp = Blueprint('auth', __name__)
-
-@auth_bp.route('/login', methods=['POST'])
-def login():
-    data = request.get_json()
-    #print(data)
-    login_type = data.get('type')
-    email = data.get('email')
-    password = data.get('password')
-    #print(f"Login type: {login_type}, Email: {email}, Password: {password}")
-    if not email or not password:
-        return jsonify({'message': 'Email and password are required'}), 400
-    
-    if login_type == 'admin':
-        admin = Admin.query.filter_by(Email=email).first()
-        #print(admin)
-        if not admin:
-            return jsonify({'message': 'Admin not found'}), 404
-        #print(admin.PasswordHash, password)
-        if admin and bcrypt.check_password_hash(admin.PasswordHash, password):
-            print("Admin authenticated")
-            #key = current_app.config['SECRET_KEY']
-            #print(f"\n>>> ENCODING KEY: '{key}' | TYPE: {type(key)} | LENGTH: {len(key)}\n")
-            token = jwt.encode({
-                'sub': admin.AdminID,
-                'type': 'admin',
-                'exp': datetime.datetime.now() + datetime.timedelta(hours=1)
-            }, current_app.config['SECRET_KEY'], algorithm='HS256')
-            #print(f"Generated token: {token}")
-            return jsonify({'token': token, "message": "Admin authenticated"}), 200
-        
-    else:
-        student = Student.query.filter_by(Email=email).first()
-        if not student:
-            return jsonify({'message': 'Invalid credentials'}), 401
-        if student and bcrypt.check_password_hash(student.PasswordHash, password):
-            token = jwt.encode({
-                'sub': student.StudentID,
-                'type': 'student',
-                'exp': datetime.datetime.now() + datetime.timedelta(hours=1)
-            }, current_app.config['SECRET_KEY'], algorithm='HS256')
-            return jsonify({
-                'token': token, 
-                "message": "Student authenticated",
-                "student_id": student.StudentID
-            }), 200
-        
-    return jsonify({'message': 'Invalid credentials'}), 401
-
-@auth_bp.route("/wake", methods=["GET"])
-def wake():
-    return jsonify({"status": "ok", "message": "API is awake"}), 200
-
+from flask import request, jsonify, Blueprint, current_app
+from app.extension import db
+from app import passwords
+from app.models import Admin, Student
+from app.principal_cache import invalidate_principal
+import jwt
+import datetime
+
+
+auth_bp = Blueprint('auth', __name__)
+
+def verify_and_upgrade(user, password):
+    if not user.check_password(password):
+        return False
+    # Transparently move hashes made at an outdated bcrypt cost to the current one
+    if passwords.needs_rehash(user.PasswordHash):
+        user.set_password(password)
+        db.session.commit()
+        if isinstance(user, Admin):
+            invalidate_principal('admin', user.AdminID)
+        else:
+            invalidate_principal('student', user.StudentID)
+    return True
+
+@auth_bp.errorhandler(passwords.PasswordServiceBusy)
+def password_service_busy(e):
+    response = jsonify({'message': 'Too many logins in progress, please retry shortly.'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@auth_bp.route('/login', methods=['POST'])
+def login():
+    data = request.get_json()
+    #print(data)
+    login_type = data.get('type')
+    email = data.get('email')
+    password = data.get('password')
+    #print(f"Login type: {login_type}, Email: {email}, Password: {password}")
+    if not email or not password:
+        return jsonify({'message': 'Email and password are required'}), 400
+    
+    if login_type == 'admin':
+        admin = Admin.query.filter_by(Email=email).first()
+        #print(admin)
+        if not admin:
+            return jsonify({'message': 'Admin not found'}), 404
+        #print(admin.PasswordHash, password)
+        if admin and verify_and_upgrade(admin, password):
+            print("Admin authenticated")
+            #key = current_app.config['SECRET_KEY']
+            #print(f"\n>>> ENCODING KEY: '{key}' | TYPE: {type(key)} | LENGTH: {len(key)}\n")
+            token = jwt.encode({
+                'sub': str(admin.AdminID),
+                'type': 'admin',
+                'exp': datetime.datetime.now() + datetime.timedelta(hours=1)
+            }, current_app.config['SECRET_KEY'], algorithm='HS256')
+            #print(f"Generated token: {token}")
+            return jsonify({'token': token, "message": "Admin authenticated"}), 200
+        
+    else:
+        student = Student.query.filter_by(Email=email).first()
+        if not student:
+            return jsonify({'message': 'Invalid credentials'}), 401
+        if student and verify_and_upgrade(student, password):
+            token = jwt.encode({
+                'sub': str(student.StudentID),
+                'type': 'student',
+                'exp': datetime.datetime.now() + datetime.timedelta(hours=1)
+            }, current_app.config['SECRET_KEY'], algorithm='HS256')
+            return jsonify({
+                'token': token, 
+                "message": "Student authenticated",
+                "student_id": student.StudentID
+            }), 200
+        
+    return jsonify({'message': 'Invalid credentials'}), 401
+
+@auth_bp.route("/wake", methods=["GET"])
+def wake():
+    return jsonify({"status": "ok", "message": "API is awake"}), 200
+
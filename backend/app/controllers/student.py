@@ -1,401 +1,514 @@
-from flask import Blueprint, jsonify, request
-from app.extension import db
-from app.models import Attempt, Exam, Subject, Student, Chapter, SelectedAnswer
-from app.decorators import authentication
-from datetime import datetime
-from sqlalchemy.orm import joinedload
-from sqlalchemy import desc
-
-student_bp = Blueprint('student', __name__)
-
-
-@authentication('student')
-@student_bp.route('/<int:student_id>/dashboard', methods=['GET'])
-def dashboard(student_id):
-    try:
-        # Total attempts and average scores per subject
-        total_attempts = db.session.query(
-            db.func.count(Attempt.AttemptID).label('total_attempts'),
-            Subject.SubjectName.label('subject_name')
-        ).join(Attempt.exam).join(Exam.chapter).join(Chapter.subject).filter(Attempt.StudentID == student_id).group_by(Subject.SubjectName).all()
-
-        # Average Scores per Subject
-        average_scores = db.session.query(
-            db.func.avg(Attempt.Marks).label('average_score'),
-            Subject.SubjectName.label('subject_name')
-        ).join(Attempt.exam).join(Exam.chapter).join(Chapter.subject).filter(Attempt.StudentID == student_id).group_by(Subject.SubjectName).all()
-
-        # Total Exams Attempted
-        total_exams = db.session.query(
-            db.func.count(Attempt.AttemptID)
-        ).filter(Attempt.StudentID == student_id).scalar()
-
-        # Average Score across all attempts
-        average_score = db.session.query(
-            db.func.avg(Attempt.Marks).label('average_score')
-        ).filter(Attempt.StudentID == student_id).scalar()
-        if average_score is None:
-            average_score = 0
-
-        # Fetch attempts over time
-        attempts_over_time = db.session.query(
-            Attempt.Marks,
-            Attempt.TotalMarks
-        ).filter(Attempt.StudentID == student_id).order_by(Attempt.AttemptDate).all()
-
-        # Highest Score
-        highest_score_attempt = db.session.query(Attempt).filter(
-            Attempt.StudentID == student_id
-        ).order_by(db.desc(Attempt.Marks)).first()
-        highest_score = highest_score_attempt.Marks if highest_score_attempt else 0
-
-        return jsonify({
-            'total_attempts': [{'subject': row.subject_name, 'count': row.total_attempts} for row in total_attempts],
-            'average_scores': [{'subject': row.subject_name, 'average_score': row.average_score} for row in average_scores],
-            'average_score': average_score,
-            'total_exams': total_exams or 0,
-            'attempts_over_time': [{'score': row.Marks, 'total_marks': row.TotalMarks} for row in attempts_over_time],
-            'highest_score': highest_score
-        }), 200
-
-    except Exception as e:
-        return jsonify({'message': 'Error fetching dashboard data', 'error': str(e)}), 500
-    
-#@authentication('student')
-@student_bp.route('/register', methods=['POST'])
-def register():
-    data = request.get_json()
-    if Student.query.filter_by(Email=data.get('email')).first():
-        return jsonify({'message': 'An account with this email already exists'}), 409
-    try:
-        student = Student(
-            Name=data.get('name'),
-            Email=data.get('email').lower(),
-            #PasswordHash=data.get('password'),
-            DOB=datetime.strptime(data.get('dob'), '%Y-%m-%d'),
-            CollegeName=data.get('college_name'),
-            Degree=data.get('degree'),
-        )
-        password = data.get('password')
-        student.set_password(password)
-        db.session.add(student)
-        db.session.commit()
-        return jsonify({'message': 'Student registered successfully'}), 201
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error registering student', 'error': str(e)}), 500
-
-@authentication('student')
-@student_bp.route('/<int:student_id>', methods=['GET'])
-def get_student(student_id):
-    try:
-        student = Student.query.get(student_id)
-        if not student:
-            return jsonify({'message': 'Student not found'}), 404
-        return jsonify({
-            'student_id': student.StudentID,
-            'name': student.Name,
-            'email': student.Email,
-            'dob': student.DOB.strftime('%Y-%m-%d'),
-            'college_name': student.CollegeName,
-            'degree': student.Degree
-        }), 200
-    except Exception as e:
-        return jsonify({'message': 'Error fetching student ID', 'error': str(e)}), 500
-
-@authentication('student')
-@student_bp.route('/<int:student_id>', methods=['PUT'])
-def update_student(student_id):
-    data = request.get_json()
-    try:
-        student = Student.query.get(student_id)
-        if not student:
-            return jsonify({'message': 'Student not found'}), 404
-        student.Name = data.get('name', student.Name)
-        student.Email = data.get('email', student.Email)
-        student.DOB = datetime.strptime(data.get('dob', student.DOB.strftime('%Y-%m-%d')), '%Y-%m-%d')
-        student.CollegeName = data.get('college_name', student.CollegeName)
-        student.Degree = data.get('degree', student.Degree)
-        db.session.commit()
-        return jsonify({'message': 'Student updated successfully'}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error updating student', 'error': str(e)}), 500
-
-@authentication('student')
-@student_bp.route('/<int:student_id>', methods=['DELETE'])
-def delete_student(student_id):
-    try:
-        student = Student.query.get(student_id)
-        if not student:
-            return jsonify({'message': 'Student not found'}), 404
-        db.session.delete(student)
-        db.session.commit()
-        return jsonify({'message': 'Student deleted successfully'}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error deleting student', 'error': str(e)}), 500
-
-@authentication('student')
-@student_bp.route('/subjects', methods=['GET'])
-def get_subjects():
-    try:
-        subjects = Subject.query.all()
-        return jsonify([{
-            'subject_id': subject.SubjectID,
-            'subject_name': subject.SubjectName,
-        } for subject in subjects]), 200
-    except Exception as e:
-        return jsonify({'message': 'Error fetching subjects', 'error': str(e)}), 500
-
-@authentication('student')
-@student_bp.route('/chapters', methods=['GET'])
-def get_chapters():
-    try:
-        subject_id = request.args.get('subject_id', type=int)
-        if subject_id:
-            chapters = Chapter.query.filter_by(SubjectID=subject_id).all()
-            if not chapters:
-                return jsonify({'message': 'No chapters found for this subject'}), 404
-            return jsonify([{
-                'chapter_id': chapter.ChapterID,
-                'chapter_name': chapter.ChapterName,
-                'subject_id': chapter.SubjectID
-            } for chapter in chapters]), 200
-        else:
-            chapters = Chapter.query.all()
-            return jsonify([{
-                'chapter_id': chapter.ChapterID,
-                'chapter_name': chapter.ChapterName,
-                'subject_id': chapter.SubjectID
-            } for chapter in chapters]), 200
-    except Exception as e:
-        return jsonify({'message': 'Error fetching chapters', 'error': str(e)}), 500
-
-@authentication('student')
-@student_bp.route('/exams', methods=['GET'])
-def get_exams():
-    try:
-        chapter_id = request.args.get('chapter_id', type=int)
-        subject_id = request.args.get('subject_id', type=int)
-
-        query = Exam.query.filter_by(Published=True)
-
-        if subject_id:
-            exams = query.join(Chapter).filter(Chapter.SubjectID == subject_id).all()
-        elif chapter_id:
-            exams = query.filter_by(ChapterID=chapter_id).all()
-        else:
-            exams = query.all()
-
-        if not exams:
-            return jsonify([]), 200
-            
-        return jsonify([{
-            'exam_id': exam.ExamID,
-            'exam_name': exam.ExamName,
-            'total_marks': exam.TotalMarks,
-            'total_questions': exam.TotalQuestions,
-            'total_duration': exam.TotalDuration,
-            'exam_date': exam.ExamDate.strftime('%Y-%m-%d %H:%M:%S'),
-            'chapter_id': exam.ChapterID,
-            'exam_type': exam.ExamType,
-            'start_time': exam.StartTime.strftime('%Y-%m-%d %H:%M:%S') if exam.StartTime else None
-        } for exam in exams]), 200
-    except Exception as e:
-        return jsonify({'message': 'Error fetching exams', 'error': str(e)}), 500
-
-#== Exam Attempts ==
-@authentication('student')
-@student_bp.route('/<int:student_id>/exam/<int:exam_id>/start', methods=['POST'])
-def start_exam(student_id, exam_id):
-    try:
-        exam = Exam.query.options(joinedload(Exam.questions)).get(exam_id)
-
-        if not exam:
-            return jsonify({'message': 'Exam not found'}), 404
-        
-        new_attempt = Attempt(
-            StudentID=student_id,
-            ExamID=exam_id,
-            AttemptDate=datetime.utcnow(),
-            Marks=0,
-            TotalMarks=exam.TotalMarks
-        )
-        db.session.add(new_attempt)
-        db.session.commit()
-
-        questions_data = [{
-            'QuestionID': q.QuestionID,
-            'QuestionStatement': q.QuestionStatement,
-            'Option1': q.Option1,
-            'Option2': q.Option2,
-            'Option3': q.Option3,
-            'Option4': q.Option4,
-            'Marks': q.Marks,
-            'NegMarks': q.NegMarks
-        } for q in exam.questions]
-
-        return jsonify({
-            'message': 'Exam started successfully',
-            'attempt_id': new_attempt.AttemptID,
-            'exam_details': {
-                'exam_name': exam.ExamName,
-                'total_duration': exam.TotalDuration,
-                'total_questions': exam.TotalQuestions,
-            },
-            'questions': questions_data
-        }), 201
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error starting exam', 'error': str(e)}), 500
-
-@student_bp.route('/<int:student_id>/attempt/<int:attempt_id>/submit', methods=['POST'])
-def submit_exam(student_id, attempt_id):
-    try:
-        data = request.get_json()
-        answers = data.get('answers')
-        #print("\n--- SUBMIT EXAM INITIATED ---")
-        #print(f"Attempt ID: {attempt_id}, Student ID: {student_id}")
-        #print(f"Received answers payload: {answers}")
-
-        attempt = Attempt.query.filter_by(AttemptID=attempt_id, StudentID=student_id).first()
-        if not attempt:
-            return jsonify({'message': 'Attempt not found or unauthorized'}), 404
-
-        exam = Exam.query.options(joinedload(Exam.questions)).get(attempt.ExamID)
-
-        total_score = 0
-        question_map = {q.QuestionID: q for q in exam.questions}
-        #print(f"Processing {len(answers)} answers for attempt ID: {attempt_id}")
-
-        for question_id_str, selected_option_str in answers.items():
-            question_id = int(question_id_str)
-            
-            if selected_option_str is None:
-                #print(f"\n  Skipping Question ID: {question_id} (not answered)")
-                continue
-                
-            selected_option = int(selected_option_str)
-            question = question_map.get(question_id)
-
-            #print(f"\n  Processing Question ID: {question_id}")
-            #print(f"  Student's Answer: {selected_option}, Correct Answer: {question.CorrectOption}")
-
-            if question:
-                correct = (question.CorrectOption == selected_option)
-                negative_marks = question.NegMarks or 0
-
-                if correct:
-                    total_score += question.Marks
-                    #print(f"  Result: CORRECT. Awarding {question.Marks} marks.")
-                else:
-                    total_score -= abs(negative_marks)
-                    #print(f"  Result: INCORRECT. Deducting {abs(negative_marks)} marks.")
-
-                #print(f"  Current Running Score: {total_score}")
-                # Store the student's answer
-                selected_answer = SelectedAnswer(
-                    AttemptID=attempt_id,
-                    QuestionID=question_id,
-                    SelectedOption=selected_option
-                )
-                db.session.add(selected_answer)
-
-        attempt.Marks = total_score
-        #print(f"\nFinal Calculated Score: {total_score}")
-        #print("Updating attempt record in the database...")
-        db.session.commit()
-        #print("--- SUBMIT EXAM COMPLETED ---\n")
-
-        return jsonify({
-            'message': 'Exam submitted successfully!',
-            'attempt_id': attempt_id,
-            'score': total_score,
-            'total_marks': exam.TotalMarks
-        }), 200
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': 'Error submitting exam', 'error': str(e)}), 500
-
-@authentication('student')
-@student_bp.route('/<int:student_id>/attempt/<int:attempt_id>/results', methods=['GET'])
-def get_exam_results(student_id, attempt_id):
-    try:
-        attempt = db.session.query(Attempt).filter(Attempt.AttemptID == attempt_id, Attempt.StudentID == student_id).options(
-            joinedload(Attempt.exam).joinedload(Exam.questions),
-            joinedload(Attempt.SelectedAnswers)
-        ).first()
-
-        if not attempt:
-            return jsonify({'message': 'Attempt not found or unauthorized'}), 404
-
-        answers_map = {sa.QuestionID: sa.SelectedOption for sa in attempt.SelectedAnswers}
-
-        results_data = []
-        for question in attempt.exam.questions:
-            results_data.append({
-                'QuestionStatement': question.QuestionStatement,
-                'Option1': question.Option1,
-                'Option2': question.Option2,
-                'Option3': question.Option3,
-                'Option4': question.Option4,
-                'CorrectOption': question.CorrectOption,
-                'YourAnswer': answers_map.get(question.QuestionID, -1),
-                'Marks': question.Marks,
-                'NegMarks': question.NegMarks
-            })
-
-        return jsonify({
-            'attempt_id': attempt.AttemptID,
-            'exam_name': attempt.exam.ExamName,
-            'score': attempt.Marks,
-            'total_marks': attempt.TotalMarks,
-            'results': results_data
-        }), 200
-
-    except Exception as e:
-        return jsonify({'message': 'Error fetching results', 'error': str(e)}), 500
-
-@authentication('student')
-@student_bp.route('/<int:student_id>/history', methods=['GET'])
-def get_history(student_id):
-    try:
-        attempts = Attempt.query.options(joinedload(Attempt.exam))\
-                                .filter_by(StudentID=student_id)\
-                                .order_by(desc(Attempt.AttemptDate)).all()
-        history_data = []
-        for attempt in attempts:
-            history_data.append({
-                'attempt_id': attempt.AttemptID,
-                'exam_id': attempt.ExamID,
-                'exam_name': attempt.exam.ExamName,
-                'marks_obtained': attempt.Marks,
-                'total_marks': attempt.TotalMarks,
-                'attempt_date': attempt.AttemptDate.strftime('%Y-%m-%d %H:%M:%S')
-            })
-
-        return jsonify(history_data), 200
-
-    except Exception as e:
-        return jsonify({'message': 'Error fetching attempt history', 'error': str(e)}), 500
-    
-@authentication('student')
-@student_bp.route('/<int:student_id>/history/export', methods=['POST'])
-def export_history(student_id):
-    try:
-        
-        student = Student.query.get(student_id)
-        if not student:
-            return jsonify({'message': 'Student not found'}), 404
-        
-        from app.celery_tasks import export_student_history_to_csv    
-        export_student_history_to_csv.delay(student.StudentID)
-
-        return jsonify({'message': 'Your quiz history is being exported and will be sent to your email.'}), 202
-    
-    except Exception as e:
-        return jsonify({'message': 'Error triggering export', 'error': str(e)}), 500
-
+from flask import Blueprint, jsonify, request, current_app, Response, g, send_file, stream_with_context
+from app.extension import db
+from app.models import Attempt, Exam, Subject, Student, Chapter, PendingSubmission, StudentRollup, StudentSubjectRollup
+from app.database import read_replica
+from app.pagination import paginated
+from app.decorators import authentication, current_student
+from app.principal_cache import invalidate_principal
+from app.passwords import PasswordServiceBusy
+from app.admission import admission_control
+from app.grading import record_submission, get_answer_key, InvalidAnswers
+from app.packed_answers import answers_of
+from app.archive import history_rows, find_archived_attempt
+from app.exports import HISTORY_HEADER, history_csv_rows, gzip_csv_stream, export_path, reserve_export, find_export
+from app.paper_cache import get_paper
+from app.rollups import record_scores, record_student_score, rebuild_rollups, exams_attempted_by
+from app.leaderboard import exam_leaderboard, publish_scores, remove_from_leaderboards
+from app import autosave
+from datetime import datetime
+from sqlalchemy.orm import joinedload
+import json
+import redis
+from uuid import uuid4
+
+student_bp = Blueprint('student', __name__)
+
+
+@student_bp.route('/<int:student_id>/dashboard', methods=['GET'])
+@authentication('student')
+@read_replica
+def dashboard(student_id):
+    try:
+        # Everything comes from the rollups maintained on submit: one row by primary key
+        # plus one per subject the student has attempted
+        rollup = db.session.get(StudentRollup, student_id)
+        subjects = db.session.query(
+            StudentSubjectRollup.AttemptCount,
+            StudentSubjectRollup.MarksSum,
+            Subject.SubjectName
+        ).join(StudentSubjectRollup.subject).filter(StudentSubjectRollup.StudentID == student_id).all()
+
+        total_exams = rollup.AttemptCount if rollup else 0
+        average_score = rollup.MarksSum / rollup.AttemptCount if total_exams else 0
+        # Each point averages the attempts merged into it once the series was downsampled
+        series = json.loads(rollup.Series) if rollup else []
+
+        return jsonify({
+            'total_attempts': [{'subject': row.SubjectName, 'count': row.AttemptCount} for row in subjects],
+            'average_scores': [{'subject': row.SubjectName, 'average_score': row.MarksSum / row.AttemptCount} for row in subjects],
+            'average_score': average_score,
+            'total_exams': total_exams,
+            'attempts_over_time': [{'score': marks / n, 'total_marks': total / n} for marks, total, n in series],
+            'highest_score': rollup.BestMarks if rollup and rollup.BestMarks is not None else 0
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': 'Error fetching dashboard data', 'error': str(e)}), 500
+    
+#@authentication('student')
+@student_bp.route('/register', methods=['POST'])
+def register():
+    data = request.get_json()
+    if Student.query.filter_by(Email=data.get('email')).first():
+        return jsonify({'message': 'An account with this email already exists'}), 409
+    try:
+        student = Student(
+            Name=data.get('name'),
+            Email=data.get('email').lower(),
+            #PasswordHash=data.get('password'),
+            DOB=datetime.strptime(data.get('dob'), '%Y-%m-%d'),
+            CollegeName=data.get('college_name'),
+            Degree=data.get('degree'),
+        )
+        password = data.get('password')
+        student.set_password(password)
+        db.session.add(student)
+        db.session.commit()
+        return jsonify({'message': 'Student registered successfully'}), 201
+    except PasswordServiceBusy:
+        db.session.rollback()
+        return jsonify({'message': 'Registration is busy, please retry shortly.'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error registering student', 'error': str(e)}), 500
+
+@student_bp.route('/<int:student_id>', methods=['GET'])
+@authentication('student')
+def get_student(student_id):
+    try:
+        student = current_student(student_id)
+        if not student:
+            return jsonify({'message': 'Student not found'}), 404
+        return jsonify({
+            'student_id': student.StudentID,
+            'name': student.Name,
+            'email': student.Email,
+            'dob': student.DOB.strftime('%Y-%m-%d'),
+            'college_name': student.CollegeName,
+            'degree': student.Degree
+        }), 200
+    except Exception as e:
+        return jsonify({'message': 'Error fetching student ID', 'error': str(e)}), 500
+
+@student_bp.route('/<int:student_id>', methods=['PUT'])
+@authentication('student')
+def update_student(student_id):
+    data = request.get_json()
+    try:
+        student = current_student(student_id)
+        if not student:
+            return jsonify({'message': 'Student not found'}), 404
+        student.Name = data.get('name', student.Name)
+        student.Email = data.get('email', student.Email)
+        student.DOB = datetime.strptime(data.get('dob', student.DOB.strftime('%Y-%m-%d')), '%Y-%m-%d')
+        student.CollegeName = data.get('college_name', student.CollegeName)
+        student.Degree = data.get('degree', student.Degree)
+        db.session.commit()
+        invalidate_principal('student', student_id)
+        return jsonify({'message': 'Student updated successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error updating student', 'error': str(e)}), 500
+
+@student_bp.route('/<int:student_id>', methods=['DELETE'])
+@authentication('student')
+def delete_student(student_id):
+    try:
+        student = current_student(student_id)
+        if not student:
+            return jsonify({'message': 'Student not found'}), 404
+        attempted_exams = exams_attempted_by(student_id)
+        db.session.delete(student)
+        rebuild_rollups(attempted_exams)
+        db.session.commit()
+        invalidate_principal('student', student_id)
+        remove_from_leaderboards(student_id, attempted_exams)
+        return jsonify({'message': 'Student deleted successfully'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error deleting student', 'error': str(e)}), 500
+
+@student_bp.route('/subjects', methods=['GET'])
+@authentication('student')
+@read_replica
+def get_subjects():
+    try:
+        subjects = Subject.query.all()
+        return jsonify([{
+            'subject_id': subject.SubjectID,
+            'subject_name': subject.SubjectName,
+        } for subject in subjects]), 200
+    except Exception as e:
+        return jsonify({'message': 'Error fetching subjects', 'error': str(e)}), 500
+
+@student_bp.route('/chapters', methods=['GET'])
+@authentication('student')
+@read_replica
+def get_chapters():
+    try:
+        subject_id = request.args.get('subject_id', type=int)
+        query = Chapter.query
+        if subject_id:
+            query = query.filter_by(SubjectID=subject_id)
+            if not query.first():
+                return jsonify({'message': 'No chapters found for this subject'}), 404
+        return paginated(query, [Chapter.ChapterID], lambda chapter: {
+            'chapter_id': chapter.ChapterID,
+            'chapter_name': chapter.ChapterName,
+            'subject_id': chapter.SubjectID
+        })
+    except Exception as e:
+        return jsonify({'message': 'Error fetching chapters', 'error': str(e)}), 500
+
+@student_bp.route('/exams', methods=['GET'])
+@authentication('student')
+@read_replica
+def get_exams():
+    try:
+        chapter_id = request.args.get('chapter_id', type=int)
+        subject_id = request.args.get('subject_id', type=int)
+
+        query = Exam.query.filter_by(Published=True)
+
+        if subject_id:
+            query = query.join(Chapter).filter(Chapter.SubjectID == subject_id)
+        elif chapter_id:
+            query = query.filter_by(ChapterID=chapter_id)
+
+        return paginated(query, [Exam.ExamID], lambda exam: {
+            'exam_id': exam.ExamID,
+            'exam_name': exam.ExamName,
+            'total_marks': exam.TotalMarks,
+            'total_questions': exam.TotalQuestions,
+            'total_duration': exam.TotalDuration,
+            'exam_date': exam.ExamDate.strftime('%Y-%m-%d %H:%M:%S'),
+            'chapter_id': exam.ChapterID,
+            'exam_type': exam.ExamType,
+            'start_time': exam.StartTime.strftime('%Y-%m-%d %H:%M:%S') if exam.StartTime else None
+        })
+    except Exception as e:
+        return jsonify({'message': 'Error fetching exams', 'error': str(e)}), 500
+
+#== Exam Attempts ==
+@student_bp.route('/<int:student_id>/exam/<int:exam_id>/start', methods=['POST'])
+@authentication('student')
+@admission_control('exam_start')
+def start_exam(student_id, exam_id):
+    try:
+        if g.current_user.StudentID != student_id:
+            return jsonify({'message': 'Unauthorized'}), 403
+        exam = Exam.query.get(exam_id)
+
+        if not exam:
+            return jsonify({'message': 'Exam not found'}), 404
+        
+        new_attempt = Attempt(
+            StudentID=student_id,
+            ExamID=exam_id,
+            AttemptDate=datetime.utcnow(),
+            Marks=0,
+            TotalMarks=exam.TotalMarks,
+            Status='in_progress'
+        )
+        db.session.add(new_attempt)
+        db.session.commit()
+
+        try:
+            autosave.register_attempt(new_attempt.AttemptID, student_id, exam_id)
+        except redis.RedisError as e:
+            current_app.logger.warning(f"Autosave unavailable for attempt {new_attempt.AttemptID}: {e}")
+
+        # The paper is pre-encoded JSON ({"exam_details":..., "questions":[...]}); splice the attempt in front of it
+        paper = get_paper(exam)
+        head = json.dumps({
+            'message': 'Exam started successfully',
+            'attempt_id': new_attempt.AttemptID
+        }, separators=(',', ':')).encode('utf-8')
+        return Response(head[:-1] + b',' + paper[1:], status=201, mimetype='application/json')
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error starting exam', 'error': str(e)}), 500
+
+@student_bp.route('/<int:student_id>/attempt/<int:attempt_id>/answers', methods=['PATCH'])
+@authentication('student')
+def autosave_answers(student_id, attempt_id):
+    if g.current_user.StudentID != student_id:
+        return jsonify({'message': 'Unauthorized'}), 403
+    data = request.get_json()
+    if not data or not isinstance(data.get('answers'), dict):
+        return jsonify({'message': 'Invalid input'}), 400
+    try:
+        owner = autosave.owner_of(attempt_id)
+        if owner is None:
+            # Not registered at start (or expired): confirm ownership from the database once
+            attempt = Attempt.query.filter_by(AttemptID=attempt_id, StudentID=student_id).first()
+            if not attempt or attempt.Status != 'in_progress':
+                return jsonify({'message': 'Attempt not found or unauthorized'}), 404
+            autosave.register_attempt(attempt_id, student_id, attempt.ExamID)
+            exam_id = attempt.ExamID
+        elif owner[0] != student_id:
+            return jsonify({'message': 'Attempt not found or unauthorized'}), 404
+        else:
+            exam_id = owner[1]
+
+        # Checked against the cached answer key now, so nothing stored can fail the submit later
+        get_answer_key(Exam.query.get(exam_id)).check(data['answers'])
+        autosave.record_answers(attempt_id, data['answers'])
+        return jsonify({'message': 'Answers saved', 'saved': len(data['answers'])}), 200
+    except redis.RedisError as e:
+        return jsonify({'message': 'Autosave is temporarily unavailable', 'error': str(e)}), 503
+    except (TypeError, ValueError) as e:
+        return jsonify({'message': 'Invalid answers payload', 'error': str(e)}), 400
+
+@student_bp.route('/<int:student_id>/attempt/<int:attempt_id>/submit', methods=['POST'])
+@authentication('student')
+def submit_exam(student_id, attempt_id):
+    try:
+        if g.current_user.StudentID != student_id:
+            return jsonify({'message': 'Unauthorized'}), 403
+        data = request.get_json(silent=True) or {}
+        #print("\n--- SUBMIT EXAM INITIATED ---")
+        #print(f"Attempt ID: {attempt_id}, Student ID: {student_id}")
+        #print(f"Received answers payload: {answers}")
+
+        # Locked so the autosave write-behind cannot write answers of this attempt while it is finalized
+        attempt = Attempt.query.filter_by(AttemptID=attempt_id, StudentID=student_id).with_for_update().first()
+        if not attempt:
+            return jsonify({'message': 'Attempt not found or unauthorized'}), 404
+
+        if attempt.Status != 'in_progress':
+            return jsonify({'message': 'This attempt has already been submitted'}), 409
+
+        posted = data.get('answers') or {}
+        if not isinstance(posted, dict):
+            return jsonify({'message': 'Invalid answers payload'}), 400
+        try:
+            posted = {int(q): option for q, option in posted.items()}
+        except (TypeError, ValueError) as e:
+            return jsonify({'message': 'Invalid answers payload', 'error': str(e)}), 400
+        exam = Exam.query.get(attempt.ExamID)
+        # Rejected here rather than by grading, while the student can still fix it
+        get_answer_key(exam).check(posted)
+
+        # Finalize from the autosaved state; anything sent with the submit is the newest change.
+        # With `complete` the client sent its whole answer set and the saved state is not needed.
+        answers = {} if data.get('complete') else autosave.saved_answers(attempt_id)
+        if answers is None:
+            # Nothing to finalize from: the attempt stays open for the client to resend everything
+            return jsonify({
+                'message': 'Your saved answers are temporarily unavailable. Please submit all answers again.',
+                'resend': 'complete'
+            }), 503
+        answers.update(posted)
+
+        if current_app.config['SUBMISSION_MODE'] == 'async':
+            # Stage the raw answers and let the grading worker pick them up in batches
+            db.session.add(PendingSubmission(
+                AttemptID=attempt_id,
+                Answers=json.dumps(answers),
+                SubmittedAt=datetime.utcnow()
+            ))
+            attempt.Status = 'grading'
+            db.session.commit()
+            _discard_autosave(attempt_id)
+            return jsonify({
+                'message': 'Exam submitted successfully! Your answers are being graded.',
+                'attempt_id': attempt_id,
+                'status': attempt.Status
+            }), 202
+
+        # Answer key is compiled once per exam version and scores the whole submission vectorized
+        # Saved answers were checked when autosaved; one made invalid by an exam edit since is dropped
+        total_score = record_submission(attempt, exam, answers, strict=False)
+        attempt.Status = 'completed'
+        record_scores(exam, [total_score])
+        record_student_score(student_id, exam.chapter.SubjectID, total_score, attempt.TotalMarks)
+        #print(f"\nFinal Calculated Score: {total_score}")
+        #print("Updating attempt record in the database...")
+        db.session.commit()
+        _discard_autosave(attempt_id)
+        publish_scores(exam.ExamID, {student_id: total_score})
+        #print("--- SUBMIT EXAM COMPLETED ---\n")
+
+        return jsonify({
+            'message': 'Exam submitted successfully!',
+            'attempt_id': attempt_id,
+            'status': attempt.Status,
+            'score': total_score,
+            'total_marks': exam.TotalMarks
+        }), 200
+
+    except InvalidAnswers as e:
+        db.session.rollback()
+        return jsonify({'message': 'Invalid answers payload', 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': 'Error submitting exam', 'error': str(e)}), 500
+
+def _discard_autosave(attempt_id):
+    try:
+        autosave.discard(attempt_id)
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Could not discard autosave buffer for attempt {attempt_id}: {e}")
+
+@student_bp.route('/<int:student_id>/attempt/<int:attempt_id>/results', methods=['GET'])
+@authentication('student')
+@read_replica
+def get_exam_results(student_id, attempt_id):
+    try:
+        query = db.session.query(Attempt).filter(Attempt.AttemptID == attempt_id, Attempt.StudentID == student_id).options(
+            joinedload(Attempt.exam).joinedload(Exam.questions),
+            joinedload(Attempt.SelectedAnswers)
+        )
+        attempt = query.first()
+        if not attempt or attempt.Status != 'completed':
+            # Results are read right after submitting, possibly before the replica caught up
+            g.read_replica = False
+            attempt = query.populate_existing().first()
+        if not attempt:
+            attempt = find_archived_attempt(student_id, attempt_id)
+
+        if not attempt:
+            return jsonify({'message': 'Attempt not found or unauthorized'}), 404
+
+        if attempt.Status == 'grading':
+            return jsonify({
+                'attempt_id': attempt.AttemptID,
+                'status': attempt.Status,
+                'message': 'Your submission is still being graded.'
+            }), 202
+        if attempt.Status != 'completed':
+            # An open attempt has no results yet; its correct options must not be revealed
+            return jsonify({'message': 'This attempt has not been submitted yet'}), 409
+
+        answers_map = answers_of(attempt, get_answer_key(attempt.exam))
+
+        results_data = []
+        for question in attempt.exam.questions:
+            results_data.append({
+                'QuestionStatement': question.QuestionStatement,
+                'Option1': question.Option1,
+                'Option2': question.Option2,
+                'Option3': question.Option3,
+                'Option4': question.Option4,
+                'CorrectOption': question.CorrectOption,
+                'YourAnswer': answers_map.get(question.QuestionID, -1),
+                'Marks': question.Marks,
+                'NegMarks': question.NegMarks
+            })
+
+        return jsonify({
+            'attempt_id': attempt.AttemptID,
+            'exam_name': attempt.exam.ExamName,
+            'status': attempt.Status,
+            'score': attempt.Marks,
+            'total_marks': attempt.TotalMarks,
+            'results': results_data
+        }), 200
+
+    except Exception as e:
+        return jsonify({'message': 'Error fetching results', 'error': str(e)}), 500
+
+
+@student_bp.route('/<int:student_id>/exam/<int:exam_id>/leaderboard', methods=['GET'])
+@authentication('student')
+@read_replica
+def get_exam_leaderboard(student_id, exam_id):
+    try:
+        exam = Exam.query.get(exam_id)
+        if not exam or not exam.Published:
+            return jsonify({'message': 'Exam not found'}), 404
+        limit = request.args.get('limit', 10, type=int)
+        return jsonify(exam_leaderboard(exam_id, limit, student_id)), 200
+    except redis.RedisError as e:
+        return jsonify({'message': 'Leaderboard is temporarily unavailable', 'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'message': 'Error fetching leaderboard', 'error': str(e)}), 500
+
+@student_bp.route('/<int:student_id>/history', methods=['GET'])
+@authentication('student')
+@read_replica
+def get_history(student_id):
+    try:
+        # Archived attempts are only read when asked for, keeping the default view on the hot table
+        include_archived = request.args.get('archived', 'false').lower() in ['true', '1']
+        attempts, keys = history_rows(student_id, include_archived)
+        # Newest first; AttemptID breaks ties between attempts with the same timestamp
+        return paginated(attempts, keys, lambda attempt: {
+            'attempt_id': attempt.AttemptID,
+            'exam_id': attempt.ExamID,
+            'exam_name': attempt.ExamName,
+            'marks_obtained': attempt.Marks,
+            'total_marks': attempt.TotalMarks,
+            'attempt_date': attempt.AttemptDate.strftime('%Y-%m-%d %H:%M:%S')
+        }, descending=True)
+
+    except Exception as e:
+        return jsonify({'message': 'Error fetching attempt history', 'error': str(e)}), 500
+    
+@student_bp.route('/<int:student_id>/history/export', methods=['POST'])
+@authentication('student')
+def export_history(student_id):
+    try:
+        if g.current_user.StudentID != student_id:
+            return jsonify({'message': 'Unauthorized'}), 403
+        student = current_student(student_id)
+        if not student:
+            return jsonify({'message': 'Student not found'}), 404
+        
+        from app.celery_tasks import export_student_history_to_csv    
+        export_id = uuid4().hex
+        reserve_export(export_path('history', student.StudentID, export_id))
+        export_student_history_to_csv.delay(student.StudentID, export_id)
+
+        return jsonify({
+            'message': 'Your quiz history is being exported; you will get an email when it is ready.',
+            'export_id': export_id
+        }), 202
+    
+    except Exception as e:
+        return jsonify({'message': 'Error triggering export', 'error': str(e)}), 500
+
+@student_bp.route('/<int:student_id>/history/export', methods=['GET'])
+@authentication('student')
+def stream_history(student_id):
+    """Streams the student's full history as gzip CSV, straight from the database."""
+    try:
+        if g.current_user.StudentID != student_id:
+            return jsonify({'message': 'Unauthorized'}), 403
+        return Response(
+            stream_with_context(gzip_csv_stream(HISTORY_HEADER, history_csv_rows(student_id))),
+            mimetype='application/gzip',
+            headers={'Content-Disposition': 'attachment; filename=quiz_history.csv.gz'}
+        )
+    except Exception as e:
+        return jsonify({'message': 'Error exporting history', 'error': str(e)}), 500
+
+@student_bp.route('/<int:student_id>/history/export/<export_id>', methods=['GET'])
+@authentication('student')
+def download_history_export(student_id, export_id):
+    """Serves a finished history export; Range requests are answered with 206."""
+    try:
+        if g.current_user.StudentID != student_id:
+            return jsonify({'message': 'Unauthorized'}), 403
+        state, path = find_export(export_id, 'history', student_id)
+        if state == 'pending':
+            return jsonify({'message': 'Your export is still being prepared.'}), 202
+        if not state:
+            return jsonify({'message': 'Export not found'}), 404
+        return send_file(path, mimetype='application/gzip', as_attachment=True,
+                         download_name='quiz_history.csv.gz', conditional=True)
+    except Exception as e:
+        return jsonify({'message': 'Error downloading export', 'error': str(e)}), 500
+
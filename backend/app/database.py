@@ -0,0 +1,102 @@
+from functools import wraps
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = 'replica'
+
+# Applied to every new SQLite connection. WAL lets readers (gunicorn workers, the Celery
+# worker) proceed while one writer commits, and busy_timeout makes a blocked writer wait
+# for the lock instead of failing with "database is locked".
+
+
+def sqlite_pragmas(config):
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}",
+        "PRAGMA foreign_keys=ON",
+    ]
+
+
+def apply_sqlite_profile(engine, config):
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def normalize_url(url):
+    # Some providers hand out postgres:// URLs, which SQLAlchemy no longer accepts
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url, config):
+    """Pool and connection settings for a database URL; SQLite keeps SQLAlchemy's defaults."""
+    if make_url(url).get_backend_name() != 'postgresql':
+        return {}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+        'connect_args': {'options': f"-c statement_timeout={int(config['DB_STATEMENT_TIMEOUT_MS'])}"},
+    }
+
+
+def configure_database(app):
+    """
+    Resolves the primary and optional replica URLs into Flask-SQLAlchemy settings.
+    Must run before db.init_app.
+    """
+    config = app.config
+    primary = normalize_url(config['SQLALCHEMY_DATABASE_URI'])
+    config['SQLALCHEMY_DATABASE_URI'] = primary
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {**engine_options(primary, config), **config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    replica = normalize_url(config.get('DATABASE_REPLICA_URL'))
+    if replica:
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds[REPLICA_BIND] = {'url': replica, **engine_options(replica, config)}
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+class RoutingSession(Session):
+    """
+    Sends SELECTs to the replica bind while a view marked with @read_replica runs;
+    flushes, DML and raw SQL always go to the primary. Without a replica configured
+    it behaves exactly like the stock session.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and getattr(clause, 'is_select', False)
+                and has_app_context() and g.get('read_replica')):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(f):
+    """Lets a read-only view's queries be served by the replica, when one is configured."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.read_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.read_replica = False
+    return decorated_function
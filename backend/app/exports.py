@@ -0,0 +1,127 @@
+import csv
+import glob
+import gzip
+import io
+import os
+import re
+import time
+from flask import current_app
+from app.extension import db
+from app.models import Student, Exam
+from app.archive import history_rows
+from app.rollups import scored_attempts
+
+# CSV exports are written row by row from a streamed (yield_per) query into gzip, either
+# to a file under EXPORT_DIR or straight into an HTTP response, so no export is ever
+# held in memory whole. A file is written as `<name>.part` and renamed when complete;
+# its name carries the export kind, owner and id:
+#   history-<StudentID>-<export_id>.csv.gz   one student's attempt history
+#   attempts-all-<export_id>.csv.gz          every completed attempt, for admins
+
+STREAM_BATCH_SIZE = 1000
+EXPORT_ID = re.compile(r'^[0-9a-f]{32}$')
+
+HISTORY_HEADER = ['Attempt ID', 'Exam Name', 'Marks Obtained', 'Total Marks', 'Attempt Date']
+ATTEMPTS_HEADER = ['Attempt ID', 'Student ID', 'Student Name', 'Student Email', 'Exam ID', 'Exam Name',
+                   'Marks Obtained', 'Total Marks', 'Attempt Date']
+
+
+def history_csv_rows(student_id):
+    """A student's attempts, archived ones included, newest first."""
+    query, keys = history_rows(student_id, include_archived=True)
+    for row in query.order_by(*[key.desc() for key in keys]).yield_per(STREAM_BATCH_SIZE):
+        yield [row.AttemptID, row.ExamName, row.Marks, row.TotalMarks, row.AttemptDate.strftime('%Y-%m-%d %H:%M:%S')]
+
+
+def attempts_csv_rows():
+    """Every completed attempt, archived ones included, by AttemptID."""
+    scored = scored_attempts()
+    rows = db.session.query(
+        scored.c.AttemptID, Student.StudentID, Student.Name, Student.Email, Exam.ExamID, Exam.ExamName,
+        scored.c.Marks, scored.c.TotalMarks, scored.c.AttemptDate
+    ).join(Student, Student.StudentID == scored.c.StudentID) \
+     .join(Exam, Exam.ExamID == scored.c.ExamID) \
+     .order_by(scored.c.AttemptID)
+    for row in rows.yield_per(STREAM_BATCH_SIZE):
+        yield [*row[:-1], row.AttemptDate.strftime('%Y-%m-%d %H:%M:%S')]
+
+
+def gzip_csv_stream(header, rows):
+    """Yields the gzip-compressed CSV of `rows` in pieces, for a streamed response."""
+    line = io.StringIO()
+    writer = csv.writer(line)
+    compressed = io.BytesIO()
+    with gzip.GzipFile(fileobj=compressed, mode='wb') as archive:
+        writer.writerow(header)
+        for i, row in enumerate(rows, 1):
+            writer.writerow(row)
+            if i % STREAM_BATCH_SIZE == 0:
+                archive.write(line.getvalue().encode('utf-8'))
+                line.seek(0)
+                line.truncate()
+                archive.flush()
+                yield compressed.getvalue()
+                compressed.seek(0)
+                compressed.truncate()
+        archive.write(line.getvalue().encode('utf-8'))
+    yield compressed.getvalue()
+
+
+def export_dir():
+    directory = current_app.config['EXPORT_DIR'] or os.path.join(current_app.instance_path, 'exports')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def export_path(kind, owner, export_id):
+    return os.path.join(export_dir(), f"{kind}-{owner}-{export_id}.csv.gz")
+
+
+def reserve_export(path):
+    # An empty .part file marks the export as pending until the worker starts writing it
+    open(f"{path}.part", 'ab').close()
+
+
+def write_export(path, header, rows):
+    """Writes `rows` as gzip CSV to `path`, which only appears once complete. Returns the row count."""
+    partial = f"{path}.part"
+    count = 0
+    try:
+        with gzip.open(partial, 'wt', encoding='utf-8', newline='') as archive:
+            writer = csv.writer(archive)
+            writer.writerow(header)
+            for count, row in enumerate(rows, 1):
+                writer.writerow(row)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return count
+
+
+def find_export(export_id, kind='*', owner='*'):
+    """
+    ('ready', path), ('pending', None) while it is being written, or (None, None).
+    Ids that are not plain hex never match, so they cannot reach outside EXPORT_DIR.
+    """
+    if not EXPORT_ID.match(export_id):
+        return None, None
+    pattern = os.path.join(export_dir(), f"{kind}-{owner}-{export_id}.csv.gz")
+    ready = glob.glob(pattern)
+    if ready:
+        return 'ready', ready[0]
+    if glob.glob(f"{pattern}.part"):
+        return 'pending', None
+    return None, None
+
+
+def purge_exports(max_age):
+    """Deletes export files older than `max_age` (a timedelta). Returns how many were removed."""
+    cutoff = time.time() - max_age.total_seconds()
+    removed = 0
+    for path in glob.glob(os.path.join(export_dir(), '*.csv.gz*')):
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed += 1
+    return removed
@@ -1,13 +1,32 @@
-from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
-from flask_migrate import Migrate
-from flask_mail import Mail
-from celery import Celery
-from flask_caching import Cache
-
-migrate = Migrate()
-db = SQLAlchemy()
-bcrypt = Bcrypt()
-mail = Mail()
-celery = Celery()
-cache = Cache()
\ No newline at end of file
+from flask_sqlalchemy import SQLAlchemy
+from flask_bcrypt import Bcrypt
+from flask_migrate import Migrate
+from flask_mail import Mail
+from celery import Celery
+from flask_caching import Cache
+import redis
+from .database import RoutingSession
+
+
+class RedisClient:
+    # Thin app-bound wrapper so the raw Redis connection is initialised like the other extensions
+    def __init__(self):
+        self._client = None
+
+    def init_app(self, app):
+        self._client = redis.Redis.from_url(
+            app.config['REDIS_URL'],
+            socket_connect_timeout=app.config.get('REDIS_CONNECT_TIMEOUT', 1)
+        )
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+bcrypt = Bcrypt()
+mail = Mail()
+celery = Celery()
+cache = Cache()
+redis_client = RedisClient()
\ No newline at end of file
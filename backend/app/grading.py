@@ -0,0 +1,262 @@
+from collections import OrderedDict
+from threading import Lock
+from flask import current_app
+import numpy as np
+import redis
+from sqlalchemy import insert, update
+from app.extension import db, cache
+from app.models import Attempt, ArchivedAttempt, Question, SelectedAnswer
+from app.rollups import rebuild_rollups, rebuild_student_rollups, rollup_scope
+
+UNANSWERED = -1
+ANSWER_KEY_CACHE_SIZE = 256
+ANSWER_KEY_TIMEOUT = 24 * 60 * 60
+
+_answer_keys = OrderedDict()
+_answer_keys_lock = Lock()
+
+
+class InvalidAnswers(ValueError):
+    """Raised for a submission naming an option its question does not have."""
+
+
+class AnswerKey:
+    """
+    Compiled answer key for one version of an exam.
+
+    Questions are laid out in QuestionID order; a submission is a vector of
+    selected options aligned to that order, with UNANSWERED for skipped questions.
+    """
+
+    def __init__(self, exam_id, version, question_ids, correct, marks, neg_marks, options):
+        self.exam_id = exam_id
+        self.version = version
+        self.question_ids = np.asarray(question_ids, dtype=np.int64)
+        self.correct = np.asarray(correct, dtype=np.int8)
+        self.marks = np.asarray(marks, dtype=np.int32)
+        self.neg_marks = np.abs(np.asarray(neg_marks, dtype=np.int32))
+        self.options = np.asarray(options, dtype=np.int8)
+        self.index = {qid: i for i, qid in enumerate(question_ids)}
+        for arr in (self.question_ids, self.correct, self.marks, self.neg_marks, self.options):
+            arr.setflags(write=False)
+
+    def __len__(self):
+        return len(self.index)
+
+    def selection(self, answers, strict=True):
+        """
+        {question_id: option} as posted by the client -> aligned option vector. An option
+        the question does not have raises InvalidAnswers, or is dropped if not `strict`.
+        """
+        selected = np.full(len(self), UNANSWERED, dtype=np.int8)
+        for question_id, option in answers.items():
+            if option is None:
+                continue
+            try:
+                pos = self.index.get(int(question_id))
+                option = int(option)
+            except (TypeError, ValueError):
+                raise InvalidAnswers(f"Invalid answer {option!r} for question {question_id!r}")
+            if pos is None or option == UNANSWERED:
+                continue
+            if not 1 <= option <= self.options[pos]:
+                if strict:
+                    raise InvalidAnswers(f"Question {question_id} has no option {option}")
+                continue
+            selected[pos] = option
+        return selected
+
+    def check(self, answers):
+        """
+        Raises InvalidAnswers unless every answer names a question of this exam and an
+        option that question has. Used where answers are stored before being graded.
+        """
+        self.selection(answers)
+        for question_id in answers:
+            try:
+                known = int(question_id) in self.index
+            except (TypeError, ValueError):
+                known = False
+            if not known:
+                raise InvalidAnswers(f"The exam has no question {question_id!r}")
+
+    def score(self, selected):
+        return int(self.score_batch(selected[np.newaxis, :])[0])
+
+    def score_batch(self, selected):
+        # selected: (submissions, questions) matrix of options
+        answered = selected != UNANSWERED
+        right = selected == self.correct
+        gains = np.where(right, self.marks, np.where(answered, -self.neg_marks, 0))
+        return gains.sum(axis=1, dtype=np.int64)
+
+    def answer_rows(self, attempt_id, selected):
+        positions = np.flatnonzero(selected != UNANSWERED)
+        return [{
+            'AttemptID': attempt_id,
+            'QuestionID': int(self.question_ids[pos]),
+            'SelectedOption': int(selected[pos])
+        } for pos in positions]
+
+
+def _answer_key_fields(exam_id, version):
+    # The AnswerKey constructor arguments, as plain lists so the shared cache can hold them
+    rows = db.session.query(
+        Question.QuestionID,
+        Question.CorrectOption,
+        Question.Marks,
+        Question.NegMarks,
+        Question.Option3,
+        Question.Option4
+    ).filter(Question.ExamID == exam_id).order_by(Question.QuestionID).all()
+    return (
+        exam_id,
+        version,
+        [row.QuestionID for row in rows],
+        [row.CorrectOption for row in rows],
+        [row.Marks for row in rows],
+        [row.NegMarks or 0 for row in rows],
+        # Option1 and Option2 are required; a question has up to its last filled-in option
+        [4 if row.Option4 else 3 if row.Option3 else 2 for row in rows]
+    )
+
+
+def answer_key_cache_key(exam):
+    return f"answer_key:{exam.ExamID}:{exam.Version}"
+
+
+def _remember(cache_key, key):
+    with _answer_keys_lock:
+        _answer_keys[cache_key] = key
+        _answer_keys.move_to_end(cache_key)
+        while len(_answer_keys) > ANSWER_KEY_CACHE_SIZE:
+            _answer_keys.popitem(last=False)
+
+
+def _share(exam, fields):
+    try:
+        cache.set(answer_key_cache_key(exam), fields, timeout=ANSWER_KEY_TIMEOUT)
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Could not share the answer key of exam {exam.ExamID}: {e}")
+
+
+def get_answer_key(exam):
+    # Process-local LRU first, then the shared cache (filled by any process, or pre-warmed),
+    # then the database
+    cache_key = (exam.ExamID, exam.Version)
+    with _answer_keys_lock:
+        key = _answer_keys.get(cache_key)
+        if key is not None:
+            _answer_keys.move_to_end(cache_key)
+            return key
+
+    try:
+        fields = cache.get(answer_key_cache_key(exam))
+    except redis.RedisError as e:
+        # Grading must not depend on the cache being up
+        current_app.logger.warning(f"Shared answer key cache unavailable: {e}")
+        fields = None
+    if fields is None:
+        fields = _answer_key_fields(exam.ExamID, exam.Version)
+        _share(exam, fields)
+    key = AnswerKey(*fields)
+    _remember(cache_key, key)
+    return key
+
+
+def warm_answer_key(exam):
+    fields = _answer_key_fields(exam.ExamID, exam.Version)
+    _share(exam, fields)
+    key = AnswerKey(*fields)
+    _remember((exam.ExamID, exam.Version), key)
+    return key
+
+
+def record_submission(attempt, exam, answers, strict=True):
+    """
+    Grades a submission and stages its answers (packed or as SelectedAnswer rows,
+    per ANSWER_STORAGE) and marks on the session. The caller owns the commit.
+    Raises InvalidAnswers if `strict` and an answer names a missing option.
+    """
+    from app.packed_answers import packed_storage, store_packed
+    key = get_answer_key(exam)
+    selected = key.selection(answers, strict)
+    score = key.score(selected)
+
+    # Replace anything the autosave write-behind already persisted for this attempt
+    SelectedAnswer.query.filter_by(AttemptID=attempt.AttemptID).delete(synchronize_session=False)
+    if packed_storage():
+        store_packed(attempt, key, selected)
+    else:
+        rows = key.answer_rows(attempt.AttemptID, selected)
+        if rows:
+            db.session.execute(insert(SelectedAnswer), rows)
+    attempt.Marks = score
+    return score
+
+
+def fill_selection(selected, key, attempt_ids, answers):
+    """
+    Writes (AttemptID, QuestionID, SelectedOption) rows into the `selected` matrix,
+    whose rows follow the sorted `attempt_ids` and columns the answer key order.
+    Rows for other attempts or questions no longer in the key are ignored.
+    """
+    if not answers:
+        return
+    chunk = np.array([
+        (row.AttemptID, row.QuestionID, UNANSWERED if row.SelectedOption is None else row.SelectedOption)
+        for row in answers
+    ], dtype=np.int64)
+    rows = np.minimum(np.searchsorted(attempt_ids, chunk[:, 0]), len(attempt_ids) - 1)
+    cols = np.array([key.index.get(qid, -1) for qid in chunk[:, 1].tolist()], dtype=np.int64)
+    known = (attempt_ids[rows] == chunk[:, 0]) & (cols >= 0) & (chunk[:, 2] != UNANSWERED)
+    selected[rows[known], cols[known]] = chunk[known, 2]
+
+
+def rescore_exam(exam):
+    """
+    Re-grades every completed attempt of an exam, archived ones included, against its
+    current answer key in one vectorized pass per table and writes the new marks back in
+    bulk UPDATEs.
+    """
+    from app.packed_answers import fill_packed, packed_rows
+    key = get_answer_key(exam)
+    rescored = 0
+    for model in (Attempt, ArchivedAttempt):
+        # Attempts still in progress or waiting to be graded have no marks to correct
+        query = db.select(model.AttemptID).filter(model.ExamID == exam.ExamID)
+        if model is Attempt:
+            query = query.filter(Attempt.Status == 'completed')
+        attempt_ids = np.array(db.session.scalars(query.order_by(model.AttemptID)).all(), dtype=np.int64)
+        if not len(attempt_ids):
+            continue
+
+        selected = np.full((len(attempt_ids), len(key)), UNANSWERED, dtype=np.int8)
+        if model is Attempt:
+            answers = db.session.execute(
+                db.select(
+                    SelectedAnswer.AttemptID,
+                    SelectedAnswer.QuestionID,
+                    SelectedAnswer.SelectedOption
+                ).join(Attempt, Attempt.AttemptID == SelectedAnswer.AttemptID)
+                 .filter(Attempt.ExamID == exam.ExamID, Attempt.Status == 'completed')
+                 .execution_options(yield_per=10000)
+            )
+            for chunk in answers.partitions():
+                fill_selection(selected, key, attempt_ids, chunk)
+        for chunk in packed_rows(exam.ExamID, model=model).partitions():
+            fill_packed(selected, key, attempt_ids, chunk)
+
+        scores = key.score_batch(selected)
+        db.session.execute(update(model), [
+            {'AttemptID': int(attempt_id), 'Marks': int(score)}
+            for attempt_id, score in zip(attempt_ids, scores)
+        ])
+        rescored += len(attempt_ids)
+    if not rescored:
+        return 0
+
+    rebuild_rollups([exam.ExamID])
+    rebuild_student_rollups(rollup_scope([exam.ExamID])[1])
+    db.session.commit()
+    return rescored
@@ -0,0 +1,92 @@
+import re
+from datetime import datetime
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, desc, inspect
+from sqlalchemy.schema import CreateIndex
+from app.extension import db
+from app.schema import execute_ddl
+from app.models import (
+    Attempt, ArchivedAttempt, Exam, Chapter, Question, SelectedAnswer, PendingSubmission,
+    StudentSubjectRollup, QuestionStat
+)
+
+# Tables are created without their indexes (see app/schema.py), so every declared index
+# missing from the database, on new and existing tables alike, is added here: on startup
+# right after the tables and columns, and via `flask ensure-indexes`.
+
+
+def _has_index(table_name, index_name):
+    return any(index['name'] == index_name for index in inspect(db.engine).get_indexes(table_name))
+
+
+def ensure_indexes():
+    """Creates every declared index that is missing from the database. Returns their names."""
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing and execute_ddl(CreateIndex(index, if_not_exists=True),
+                                                          lambda: _has_index(table.name, index.name)):
+                created.append(index.name)
+    return created
+
+
+# Representative statement for each hot lookup, with placeholder ids
+HOT_QUERIES = {
+    'student history': lambda: select(Attempt).filter(Attempt.StudentID == 1).order_by(desc(Attempt.AttemptDate)),
+    'student archived history': lambda: select(ArchivedAttempt).filter(ArchivedAttempt.StudentID == 1),
+    'exam attempts': lambda: select(Attempt.StudentID, Attempt.Marks).filter(Attempt.ExamID == 1, Attempt.Status == 'completed'),
+    'attempt answers': lambda: select(SelectedAnswer).filter(SelectedAnswer.AttemptID == 1),
+    'exam answers block': lambda: select(SelectedAnswer.AttemptID, SelectedAnswer.QuestionID, SelectedAnswer.SelectedOption)
+        .join(Attempt, Attempt.AttemptID == SelectedAnswer.AttemptID)
+        .filter(Attempt.ExamID == 1, SelectedAnswer.AttemptID.between(1, 5000)),
+    'exam questions': lambda: select(Question).filter(Question.ExamID == 1).order_by(Question.QuestionID),
+    'published exams in chapter': lambda: select(Exam).filter(Exam.Published == True, Exam.ChapterID == 1).order_by(Exam.ExamDate),
+    'published exams in subject': lambda: select(Exam).join(Chapter)
+        .filter(Exam.Published == True, Chapter.SubjectID == 1),
+    'published exams due in range': lambda: select(Exam.ExamID)
+        .filter(Exam.Published == True, Exam.ExamDate >= datetime(2000, 1, 1), Exam.ExamDate < datetime(2000, 1, 2)),
+    'chapters of subject': lambda: select(Chapter).filter(Chapter.SubjectID == 1),
+    'pending submission of attempt': lambda: select(PendingSubmission).filter(PendingSubmission.AttemptID == 1),
+    'student subject rollups': lambda: select(StudentSubjectRollup).filter(StudentSubjectRollup.StudentID == 1),
+    'exam question stats': lambda: select(QuestionStat).filter(QuestionStat.ExamID == 1),
+}
+
+# "SCAN attempt" is a full table scan; "SCAN attempt USING [COVERING] INDEX ..." is not
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?! USING)(?:\s|$)')
+
+
+def full_scans(statement):
+    """Tables read with a full scan in SQLite's plan for `statement`."""
+    sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    plan = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return [match.group(1) for match in (FULL_SCAN.match(row[-1]) for row in plan) if match]
+
+
+@click.command('ensure-indexes')
+@with_appcontext
+def ensure_indexes_command():
+    """Add declared indexes missing from an existing database."""
+    created = ensure_indexes()
+    click.echo(f"Created {len(created)} indexes" + (f": {', '.join(created)}" if created else "."))
+
+
+@click.command('check-query-plans')
+@with_appcontext
+def check_query_plans_command():
+    """Fail if any hot lookup is planned as a full table scan (SQLite only)."""
+    if db.engine.dialect.name != 'sqlite':
+        click.echo("Query plan checks only run against SQLite.")
+        return
+    regressions = 0
+    for name, statement in HOT_QUERIES.items():
+        scans = full_scans(statement())
+        if scans:
+            regressions += 1
+            click.echo(f"FULL SCAN  {name}: {', '.join(scans)}")
+        else:
+            click.echo(f"ok         {name}")
+    if regressions:
+        raise SystemExit(1)
@@ -0,0 +1,117 @@
+from datetime import datetime
+import json
+import numpy as np
+from flask import current_app
+from app.extension import db
+from app.models import Attempt, ArchivedAttempt, SelectedAnswer, QuestionStat
+from app.grading import UNANSWERED, get_answer_key, fill_selection
+from app.packed_answers import fill_packed, packed_rows
+
+OPTIONS = 4
+
+
+class ItemStatistics:
+    """
+    Running sums for classical item analysis. Blocks of the (attempts, questions)
+    response matrix are folded in one at a time, so memory is bounded by the block
+    size rather than by the number of attempts.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.attempts = 0
+        self.score_sum = 0.0
+        self.score_square_sum = 0.0
+        self.correct = np.zeros(len(key), dtype=np.int64)
+        self.correct_score_sum = np.zeros(len(key), dtype=np.float64)
+        # row 0 counts unanswered, rows 1..OPTIONS each option
+        self.option_counts = np.zeros((OPTIONS + 1, len(key)), dtype=np.int64)
+
+    def add(self, selected):
+        scores = self.key.score_batch(selected).astype(np.float64)
+        right = selected == self.key.correct
+        self.attempts += len(selected)
+        self.score_sum += scores.sum()
+        self.score_square_sum += np.square(scores).sum()
+        self.correct += right.sum(axis=0)
+        self.correct_score_sum += scores @ right
+        options = np.where(selected == UNANSWERED, 0, selected)
+        for option in range(OPTIONS + 1):
+            self.option_counts[option] += (options == option).sum(axis=0)
+
+    def results(self):
+        n = self.attempts
+        if not n:
+            p_values = point_biserial = np.full(len(self.key), np.nan)
+        else:
+            p_values = self.correct / n
+            mean = self.score_sum / n
+            std = np.sqrt(max(self.score_square_sum / n - mean * mean, 0.0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # r_pb = (M1 - M) / s * sqrt(p / (1 - p)); undefined when everyone or no one is right
+                correct_mean = self.correct_score_sum / self.correct
+                point_biserial = (correct_mean - mean) / std * np.sqrt(p_values / (1 - p_values))
+        return p_values, point_biserial
+
+
+def _finite(value):
+    return float(value) if np.isfinite(value) else None
+
+
+def analyse_exam(exam):
+    """
+    Computes difficulty (p-value), point-biserial discrimination and option
+    frequencies for every question of an exam over its completed attempts (archived
+    ones included), replacing the exam's QuestionStat rows. Returns the number of
+    attempts analysed.
+    """
+    key = get_answer_key(exam)
+    chunk_size = current_app.config['ITEM_ANALYSIS_CHUNK_SIZE']
+    stats = ItemStatistics(key)
+
+    selected = np.empty((chunk_size, len(key)), dtype=np.int8)
+    for model in (Attempt, ArchivedAttempt):
+        query = db.select(model.AttemptID).filter(model.ExamID == exam.ExamID)
+        if model is Attempt:
+            query = query.filter(Attempt.Status == 'completed')
+        attempt_ids = np.array(db.session.scalars(query.order_by(model.AttemptID)).all(), dtype=np.int64)
+        for start in range(0, len(attempt_ids), chunk_size):
+            block_ids = attempt_ids[start:start + chunk_size]
+            first_id, last_id = int(block_ids[0]), int(block_ids[-1])
+            block = selected[:len(block_ids)]
+            block.fill(UNANSWERED)
+            if model is Attempt:
+                answers = db.session.execute(
+                    db.select(
+                        SelectedAnswer.AttemptID,
+                        SelectedAnswer.QuestionID,
+                        SelectedAnswer.SelectedOption
+                    ).join(Attempt, Attempt.AttemptID == SelectedAnswer.AttemptID)
+                     .filter(
+                        Attempt.ExamID == exam.ExamID,
+                        SelectedAnswer.AttemptID.between(first_id, last_id)
+                     )
+                     .execution_options(yield_per=10000)
+                )
+                for partition in answers.partitions():
+                    fill_selection(block, key, block_ids, partition)
+            for partition in packed_rows(exam.ExamID, first_id, last_id, model).partitions():
+                fill_packed(block, key, block_ids, partition)
+            stats.add(block)
+
+    p_values, point_biserial = stats.results()
+    computed_at = datetime.utcnow()
+    QuestionStat.query.filter_by(ExamID=exam.ExamID).delete(synchronize_session=False)
+    if len(key):
+        db.session.execute(QuestionStat.__table__.insert(), [{
+            'QuestionID': int(question_id),
+            'ExamID': exam.ExamID,
+            'ExamVersion': exam.Version,
+            'Responses': stats.attempts,
+            'PValue': _finite(p_values[i]),
+            'PointBiserial': _finite(point_biserial[i]),
+            'OptionCounts': json.dumps(stats.option_counts[:, i].tolist()),
+            'ComputedAt': computed_at
+        } for i, question_id in enumerate(key.question_ids)])
+    db.session.commit()
+    return stats.attempts
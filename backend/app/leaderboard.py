@@ -0,0 +1,236 @@
+from bisect import bisect_left, insort
+from itertools import groupby
+from threading import Lock
+from flask import current_app
+import redis
+from sqlalchemy import func
+from app.extension import db, redis_client
+from app.models import Student
+from app.rollups import scored_attempts
+
+# One leaderboard per exam holding each student's best completed Marks. Redis keeps it
+# in a sorted set; the in-memory backend (LEADERBOARD_BACKEND='memory', for tests and
+# single-process runs) keeps the same order in a bisect-maintained list.
+# Ties share a rank: rank = 1 + number of students with strictly higher marks.
+
+REBUILD_CHUNK_SIZE = 5000
+
+
+def _key(exam_id):
+    return f"leaderboard:{exam_id}"
+
+
+def _percentile(below, equal, total):
+    # Percentile rank: share of students scoring below, counting ties as half
+    return round(100 * (below + equal / 2) / total, 2) if total else 0
+
+
+def _ranked(entries):
+    # entries: [(student_id, marks)] in descending marks order
+    ranked, rank, previous = [], 0, None
+    for position, (student_id, marks) in enumerate(entries, start=1):
+        if marks != previous:
+            rank, previous = position, marks
+        ranked.append({'rank': rank, 'student_id': student_id, 'marks': marks})
+    return ranked
+
+
+class RedisLeaderboard:
+    def record(self, exam_id, scores):
+        # GT keeps a student's best attempt: the score only moves up
+        redis_client.zadd(_key(exam_id), {str(s): m for s, m in scores.items()}, gt=True)
+
+    def top(self, exam_id, limit):
+        entries = redis_client.zrevrange(_key(exam_id), 0, limit - 1, withscores=True)
+        return _ranked([(int(member), int(score)) for member, score in entries])
+
+    def standing(self, exam_id, student_id):
+        key = _key(exam_id)
+        marks = redis_client.zscore(key, str(student_id))
+        if marks is None:
+            return None
+        pipe = redis_client.pipeline()
+        pipe.zcard(key)
+        pipe.zcount(key, f"({marks}", '+inf')
+        pipe.zcount(key, marks, marks)
+        total, above, equal = pipe.execute()
+        return {
+            'marks': int(marks),
+            'rank': above + 1,
+            'percentile': _percentile(total - above - equal, equal, total),
+            'total': total
+        }
+
+    def count(self, exam_id):
+        return redis_client.zcard(_key(exam_id))
+
+    def remove(self, exam_id, student_id):
+        redis_client.zrem(_key(exam_id), str(student_id))
+
+    def drop(self, exam_id):
+        redis_client.delete(_key(exam_id))
+
+    def replace(self, exam_id, rows):
+        # Built under a scratch key and swapped in, so readers never see a partial board
+        key, scratch = _key(exam_id), f"{_key(exam_id)}:rebuild"
+        redis_client.delete(scratch)
+        for start in range(0, len(rows), REBUILD_CHUNK_SIZE):
+            chunk = rows[start:start + REBUILD_CHUNK_SIZE]
+            redis_client.zadd(scratch, {str(s): m for s, m in chunk})
+        if rows:
+            redis_client.rename(scratch, key)
+        else:
+            redis_client.delete(key)
+
+
+class MemoryLeaderboard:
+    def __init__(self):
+        self._boards = {}
+        self._lock = Lock()
+
+    def _board(self, exam_id):
+        # (best marks per student, sorted [(-marks, student_id)])
+        return self._boards.setdefault(exam_id, ({}, []))
+
+    def _place(self, board, student_id, marks):
+        best, order = board
+        previous = best.get(student_id)
+        if previous is not None:
+            if previous >= marks:
+                return
+            del order[bisect_left(order, (-previous, student_id))]
+        best[student_id] = marks
+        insort(order, (-marks, student_id))
+
+    def record(self, exam_id, scores):
+        with self._lock:
+            board = self._board(exam_id)
+            for student_id, marks in scores.items():
+                self._place(board, student_id, marks)
+
+    def top(self, exam_id, limit):
+        with self._lock:
+            order = self._board(exam_id)[1]
+            return _ranked([(student_id, -negated) for negated, student_id in order[:limit]])
+
+    def standing(self, exam_id, student_id):
+        with self._lock:
+            best, order = self._board(exam_id)
+            marks = best.get(student_id)
+            if marks is None:
+                return None
+            above = bisect_left(order, (-marks,))
+            equal = bisect_left(order, (-marks + 1,)) - above
+            total = len(order)
+        return {
+            'marks': marks,
+            'rank': above + 1,
+            'percentile': _percentile(total - above - equal, equal, total),
+            'total': total
+        }
+
+    def count(self, exam_id):
+        with self._lock:
+            return len(self._board(exam_id)[1])
+
+    def remove(self, exam_id, student_id):
+        with self._lock:
+            best, order = self._board(exam_id)
+            marks = best.pop(student_id, None)
+            if marks is not None:
+                del order[bisect_left(order, (-marks, student_id))]
+
+    def drop(self, exam_id):
+        with self._lock:
+            self._boards.pop(exam_id, None)
+
+    def replace(self, exam_id, rows):
+        board = ({}, [])
+        for student_id, marks in rows:
+            self._place(board, student_id, marks)
+        with self._lock:
+            self._boards[exam_id] = board
+
+
+_backends = {'redis': RedisLeaderboard(), 'memory': MemoryLeaderboard()}
+
+
+def leaderboard():
+    return _backends[current_app.config['LEADERBOARD_BACKEND']]
+
+
+def exam_leaderboard(exam_id, limit, student_id=None):
+    """
+    Top `limit` entries with student names, plus the given student's standing.
+    """
+    board = leaderboard()
+    limit = max(1, min(limit, current_app.config['LEADERBOARD_MAX_LIMIT']))
+    top = board.top(exam_id, limit)
+    names = dict(db.session.query(Student.StudentID, Student.Name).filter(
+        Student.StudentID.in_([entry['student_id'] for entry in top])
+    ).all()) if top else {}
+    for entry in top:
+        entry['name'] = names.get(entry['student_id'])
+    return {
+        'exam_id': exam_id,
+        'total': board.count(exam_id),
+        'top': top,
+        'standing': board.standing(exam_id, student_id) if student_id else None
+    }
+
+
+def publish_scores(exam_id, scores):
+    """
+    Records {student_id: marks} of freshly finalized attempts. Called after the commit;
+    a Redis outage only costs freshness, which the periodic rebuild restores.
+    """
+    if not scores:
+        return
+    try:
+        leaderboard().record(exam_id, scores)
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Could not update leaderboard for exam {exam_id}: {e}")
+
+
+def remove_from_leaderboards(student_id, exam_ids):
+    try:
+        board = leaderboard()
+        for exam_id in exam_ids:
+            board.remove(exam_id, student_id)
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Could not remove student {student_id} from leaderboards: {e}")
+
+
+def drop_leaderboards(exam_ids):
+    try:
+        board = leaderboard()
+        for exam_id in exam_ids:
+            board.drop(exam_id)
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Could not drop leaderboards of deleted exams: {e}")
+
+
+def rebuild_leaderboards(exam_ids=None):
+    """
+    Repopulates leaderboards from each student's best completed attempt, streaming
+    (ExamID, StudentID) groups so only one exam's board is held at a time.
+    Returns the number of exams rebuilt.
+    """
+    scored = scored_attempts()
+    best = db.session.query(
+        scored.c.ExamID, scored.c.StudentID, func.max(scored.c.Marks).label('Marks')
+    ).group_by(scored.c.ExamID, scored.c.StudentID) \
+     .order_by(scored.c.ExamID)
+    if exam_ids is not None:
+        exam_ids = list(exam_ids)
+        best = best.filter(scored.c.ExamID.in_(exam_ids))
+
+    board = leaderboard()
+    rebuilt = set()
+    for exam_id, rows in groupby(best.yield_per(REBUILD_CHUNK_SIZE), key=lambda row: row.ExamID):
+        board.replace(exam_id, [(row.StudentID, row.Marks) for row in rows])
+        rebuilt.add(exam_id)
+    # Exams asked for by id but without completed attempts end up empty
+    for exam_id in set(exam_ids or ()) - rebuilt:
+        board.drop(exam_id)
+    return len(rebuilt)
@@ -0,0 +1,72 @@
+from itertools import islice
+import smtplib
+import time
+from flask import current_app
+from app.extension import mail
+
+# Bulk email goes out in fixed-size batches, each sent by one task over one SMTP
+# connection. A failed message is retried on a fresh connection with backoff; a
+# recipient that still fails is reported back instead of aborting the batch.
+
+
+def chunked(iterable, size):
+    """Splits an iterable into lists of at most `size` items, lazily."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _Connection:
+    # A Flask-Mail connection that can be dropped and reopened between messages
+
+    def __init__(self):
+        self.conn = None
+
+    def send(self, message):
+        if self.conn is None:
+            self.conn = mail.connect().__enter__()
+        self.conn.send(message)
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.__exit__(None, None, None)
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.conn = None
+
+
+def send_messages(messages):
+    """
+    Sends Flask-Mail messages over a single SMTP connection, retrying each one up
+    to MAIL_SEND_RETRIES times. Returns (number sent, recipients that failed).
+    """
+    retries = current_app.config['MAIL_SEND_RETRIES']
+    delay = current_app.config['MAIL_RETRY_DELAY']
+    connection = _Connection()
+    sent, failed = 0, []
+    try:
+        for message in messages:
+            for attempt in range(retries + 1):
+                try:
+                    connection.send(message)
+                    sent += 1
+                    break
+                except smtplib.SMTPRecipientsRefused as e:
+                    # the server rejected the address itself; retrying will not help
+                    current_app.logger.warning(f"Recipient refused {message.recipients}: {e}")
+                    failed.extend(message.recipients)
+                    break
+                except (smtplib.SMTPException, OSError) as e:
+                    connection.close()
+                    if attempt == retries:
+                        current_app.logger.warning(f"Could not send email to {message.recipients}: {e}")
+                        failed.extend(message.recipients)
+                    else:
+                        time.sleep(delay * 2 ** attempt)
+    finally:
+        connection.close()
+    return sent, failed
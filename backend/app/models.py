@@ -1,85 +1,191 @@
-from flask_sqlalchemy import SQLAlchemy
-from .extension import bcrypt,db
-class Question(db.Model):
-    QuestionID = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    ExamID = db.Column(db.Integer, db.ForeignKey('exam.ExamID', ondelete="CASCADE"), nullable=False)
-    QuestionStatement = db.Column(db.String(255), nullable=False)
-    Option1 = db.Column(db.String(255), nullable=False)
-    Option2 = db.Column(db.String(255), nullable=False)
-    Option3 = db.Column(db.String(255), nullable=True)
-    Option4 = db.Column(db.String(255), nullable=True)
-    CorrectOption = db.Column(db.Integer, nullable=False)
-    Marks = db.Column(db.Integer, nullable=False)
-    NegMarks = db.Column(db.Integer, nullable=True, default=0) 
-
-class Exam(db.Model):
-    ExamID = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    ExamName = db.Column(db.String(100), nullable=False)
-    TotalMarks = db.Column(db.Integer, nullable=False)
-    TotalQuestions = db.Column(db.Integer, nullable=False)
-    TotalDuration = db.Column(db.Integer, nullable=False)
-    ExamDate = db.Column(db.DateTime, nullable=False)
-    ChapterID = db.Column(db.Integer, db.ForeignKey('chapter.ChapterID', ondelete="CASCADE"), nullable=False)
-    Published = db.Column(db.Boolean, default=False, nullable=False)
-    ExamType = db.Column(db.String(20), nullable=False, default='deadline') # 'deadline' or 'specific_time'
-    StartTime = db.Column(db.DateTime, nullable=True)
-
-    questions = db.relationship('Question', backref='exam', lazy=True, cascade="all, delete-orphan")
-    attempts = db.relationship('Attempt', backref='exam', lazy=True, cascade="all, delete-orphan")
-    chapter = db.relationship('Chapter',
-                              backref=db.backref('exams', lazy=True, cascade="all, delete-orphan"),
-                              lazy=True)
-
-
-class Attempt(db.Model):
-    AttemptID = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    StudentID = db.Column(db.Integer, db.ForeignKey('student.StudentID', ondelete="CASCADE"), nullable=False)
-    ExamID = db.Column(db.Integer, db.ForeignKey('exam.ExamID', ondelete="CASCADE"), nullable=False)
-    AttemptDate = db.Column(db.DateTime, nullable=False)
-    Marks = db.Column(db.Integer, nullable=False)
-    TotalMarks = db.Column(db.Integer, nullable=False)
-    SelectedAnswers = db.relationship('SelectedAnswer', backref='attempt', lazy=True, cascade="all, delete-orphan")
-
-class SelectedAnswer(db.Model):
-    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    AttemptID = db.Column(db.Integer, db.ForeignKey('attempt.AttemptID', ondelete="CASCADE"), nullable=False)
-    QuestionID = db.Column(db.Integer, db.ForeignKey('question.QuestionID', ondelete="CASCADE"), nullable=False)
-    SelectedOption = db.Column(db.Integer, nullable=True, default=-1) 
-
-class Student(db.Model):
-    StudentID = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    Name = db.Column(db.String(100), nullable=False)
-    DOB = db.Column(db.DateTime, nullable=False)
-    Email = db.Column(db.String(100), unique=True, nullable=False)
-    PasswordHash = db.Column(db.String(128), nullable=False)
-    CollegeName = db.Column(db.String(255), nullable=True)
-    Degree = db.Column(db.String(10), nullable=False)
-    attempts = db.relationship('Attempt', backref='student', lazy=True, cascade="all, delete-orphan")
-    def set_password(self, password):
-        self.PasswordHash = bcrypt.generate_password_hash(password)
-    def check_password(self, password):
-        return bcrypt.check_password_hash(self.PasswordHash, password)
-
-class Admin(db.Model):
-    AdminID = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    Name = db.Column(db.String(100), nullable=False)
-    Email = db.Column(db.String(100), unique=True, nullable=False)
-    PasswordHash = db.Column(db.String(128), nullable=False)
-    def set_password(self, password):
-        self.PasswordHash = bcrypt.generate_password_hash(password).decode('utf-8')
-
-    def check_password(self, password):
-        return bcrypt.check_password_hash(self.PasswordHash, password)
-
-class Subject(db.Model):
-    SubjectID = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    SubjectName = db.Column(db.String(100), nullable=False)
-    Description = db.Column(db.String(255), nullable=True, default="Null")
-    chapters = db.relationship('Chapter', backref='subject', lazy=True, cascade="all, delete-orphan")
-
-class Chapter(db.Model):
-    ChapterID = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    SubjectID = db.Column(db.Integer, db.ForeignKey('subject.SubjectID', ondelete="CASCADE"), nullable=False)
-    ChapterName = db.Column(db.String(100), nullable=False)
-    Description = db.Column(db.String(255), nullable=True, default="Null")
-
+from flask_sqlalchemy import SQLAlchemy
+from .extension import db
+from . import passwords
+class Question(db.Model):
+    __table_args__ = (
+        db.Index('ix_question_exam', 'ExamID'),
+    )
+    QuestionID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    ExamID = db.Column(db.Integer, db.ForeignKey('exam.ExamID', ondelete="CASCADE"), nullable=False)
+    QuestionStatement = db.Column(db.String(255), nullable=False)
+    Option1 = db.Column(db.String(255), nullable=False)
+    Option2 = db.Column(db.String(255), nullable=False)
+    Option3 = db.Column(db.String(255), nullable=True)
+    Option4 = db.Column(db.String(255), nullable=True)
+    CorrectOption = db.Column(db.Integer, nullable=False)
+    Marks = db.Column(db.Integer, nullable=False)
+    NegMarks = db.Column(db.Integer, nullable=True, default=0) 
+
+class Exam(db.Model):
+    __table_args__ = (
+        # published listings, filtered by chapter and ordered by date
+        db.Index('ix_exam_published_chapter_date', 'Published', 'ChapterID', 'ExamDate'),
+        db.Index('ix_exam_chapter', 'ChapterID'),
+        # published exams due within a date range (daily reminders)
+        db.Index('ix_exam_published_date', 'Published', 'ExamDate'),
+    )
+    ExamID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    ExamName = db.Column(db.String(100), nullable=False)
+    TotalMarks = db.Column(db.Integer, nullable=False)
+    TotalQuestions = db.Column(db.Integer, nullable=False)
+    TotalDuration = db.Column(db.Integer, nullable=False)
+    ExamDate = db.Column(db.DateTime, nullable=False)
+    ChapterID = db.Column(db.Integer, db.ForeignKey('chapter.ChapterID', ondelete="CASCADE"), nullable=False)
+    Published = db.Column(db.Boolean, default=False, nullable=False)
+    ExamType = db.Column(db.String(20), nullable=False, default='deadline') # 'deadline' or 'specific_time'
+    StartTime = db.Column(db.DateTime, nullable=True)
+    Version = db.Column(db.Integer, nullable=False, default=1, server_default='1') # bumped whenever questions change
+
+    # passive_deletes: the ON DELETE CASCADE foreign keys remove children without loading them
+    questions = db.relationship('Question', backref='exam', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    attempts = db.relationship('Attempt', backref='exam', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    chapter = db.relationship('Chapter',
+                              backref=db.backref('exams', lazy=True, cascade="all, delete-orphan"),
+                              lazy=True)
+
+
+class Attempt(db.Model):
+    __table_args__ = (
+        # a student's history in date order; an exam's attempts grouped by student
+        db.Index('ix_attempt_student_date', 'StudentID', 'AttemptDate'),
+        db.Index('ix_attempt_exam_student', 'ExamID', 'StudentID'),
+        # ids are never reused on SQLite either, as archived attempts keep theirs
+        {'sqlite_autoincrement': True},
+    )
+    AttemptID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    StudentID = db.Column(db.Integer, db.ForeignKey('student.StudentID', ondelete="CASCADE"), nullable=False)
+    ExamID = db.Column(db.Integer, db.ForeignKey('exam.ExamID', ondelete="CASCADE"), nullable=False)
+    AttemptDate = db.Column(db.DateTime, nullable=False)
+    Marks = db.Column(db.Integer, nullable=False)
+    TotalMarks = db.Column(db.Integer, nullable=False)
+    Status = db.Column(db.String(20), nullable=False, default='completed', server_default='completed') # 'in_progress', 'grading' or 'completed'
+    PackedAnswers = db.Column(db.LargeBinary, nullable=True) # one signed byte per question in AnswerLayout order, -1 = unanswered
+    PackedVersion = db.Column(db.Integer, nullable=True) # exam version whose AnswerLayout PackedAnswers follows
+    SelectedAnswers = db.relationship('SelectedAnswer', backref='attempt', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+
+class PendingSubmission(db.Model):
+    # Append-only staging table for submissions waiting to be graded by the worker
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    AttemptID = db.Column(db.Integer, db.ForeignKey('attempt.AttemptID', ondelete="CASCADE"), nullable=False, index=True)
+    Answers = db.Column(db.Text, nullable=False) # raw answers payload as JSON
+    SubmittedAt = db.Column(db.DateTime, nullable=False)
+
+class SelectedAnswer(db.Model):
+    __table_args__ = (
+        db.Index('ix_selected_answer_attempt_question', 'AttemptID', 'QuestionID'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    AttemptID = db.Column(db.Integer, db.ForeignKey('attempt.AttemptID', ondelete="CASCADE"), nullable=False)
+    QuestionID = db.Column(db.Integer, db.ForeignKey('question.QuestionID', ondelete="CASCADE"), nullable=False)
+    SelectedOption = db.Column(db.Integer, nullable=True, default=-1) 
+
+class Student(db.Model):
+    StudentID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    Name = db.Column(db.String(100), nullable=False)
+    DOB = db.Column(db.DateTime, nullable=False)
+    Email = db.Column(db.String(100), unique=True, nullable=False)
+    PasswordHash = db.Column(db.String(128), nullable=False)
+    CollegeName = db.Column(db.String(255), nullable=True)
+    Degree = db.Column(db.String(10), nullable=False)
+    attempts = db.relationship('Attempt', backref='student', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    def set_password(self, password):
+        self.PasswordHash = passwords.hash_password(password)
+    def check_password(self, password):
+        return passwords.check_password(self.PasswordHash, password)
+
+class Admin(db.Model):
+    AdminID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    Name = db.Column(db.String(100), nullable=False)
+    Email = db.Column(db.String(100), unique=True, nullable=False)
+    PasswordHash = db.Column(db.String(128), nullable=False)
+    def set_password(self, password):
+        self.PasswordHash = passwords.hash_password(password)
+
+    def check_password(self, password):
+        return passwords.check_password(self.PasswordHash, password)
+
+class Subject(db.Model):
+    SubjectID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    SubjectName = db.Column(db.String(100), nullable=False)
+    Description = db.Column(db.String(255), nullable=True, default="Null")
+    chapters = db.relationship('Chapter', backref='subject', lazy=True, cascade="all, delete-orphan")
+
+class Chapter(db.Model):
+    ChapterID = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    SubjectID = db.Column(db.Integer, db.ForeignKey('subject.SubjectID', ondelete="CASCADE"), nullable=False, index=True)
+    ChapterName = db.Column(db.String(100), nullable=False)
+    Description = db.Column(db.String(255), nullable=True, default="Null")
+
+class ExamRollup(db.Model):
+    # Running aggregates of completed attempts, maintained on submit
+    ExamID = db.Column(db.Integer, db.ForeignKey('exam.ExamID', ondelete="CASCADE"), primary_key=True)
+    AttemptCount = db.Column(db.Integer, nullable=False, default=0)
+    MarksSum = db.Column(db.Integer, nullable=False, default=0)
+    MarksSquareSum = db.Column(db.Integer, nullable=False, default=0)
+    MaxMarks = db.Column(db.Integer, nullable=True)
+    MinMarks = db.Column(db.Integer, nullable=True)
+    exam = db.relationship('Exam', backref=db.backref('rollup', uselist=False, lazy=True, cascade="all, delete-orphan"))
+
+class SubjectRollup(db.Model):
+    SubjectID = db.Column(db.Integer, db.ForeignKey('subject.SubjectID', ondelete="CASCADE"), primary_key=True)
+    AttemptCount = db.Column(db.Integer, nullable=False, default=0)
+    MarksSum = db.Column(db.Integer, nullable=False, default=0)
+    MarksSquareSum = db.Column(db.Integer, nullable=False, default=0)
+    MaxMarks = db.Column(db.Integer, nullable=True)
+    MinMarks = db.Column(db.Integer, nullable=True)
+    subject = db.relationship('Subject', backref=db.backref('rollup', uselist=False, lazy=True, cascade="all, delete-orphan"))
+
+class StudentRollup(db.Model):
+    # Per-student totals plus a downsampled score series, maintained on submit
+    StudentID = db.Column(db.Integer, db.ForeignKey('student.StudentID', ondelete="CASCADE"), primary_key=True)
+    AttemptCount = db.Column(db.Integer, nullable=False, default=0)
+    MarksSum = db.Column(db.Integer, nullable=False, default=0)
+    BestMarks = db.Column(db.Integer, nullable=True)
+    Series = db.Column(db.Text, nullable=False, default='[]') # JSON [[marks_sum, total_marks_sum, attempts], ...] in attempt order
+    SeriesBucket = db.Column(db.Integer, nullable=False, default=1) # attempts folded into each series point
+    student = db.relationship('Student', backref=db.backref('rollup', uselist=False, lazy=True, cascade="all, delete-orphan"))
+
+class StudentSubjectRollup(db.Model):
+    StudentID = db.Column(db.Integer, db.ForeignKey('student.StudentID', ondelete="CASCADE"), primary_key=True)
+    SubjectID = db.Column(db.Integer, db.ForeignKey('subject.SubjectID', ondelete="CASCADE"), primary_key=True)
+    AttemptCount = db.Column(db.Integer, nullable=False, default=0)
+    MarksSum = db.Column(db.Integer, nullable=False, default=0)
+    student = db.relationship('Student', backref=db.backref('subject_rollups', lazy=True, cascade="all, delete-orphan"))
+    subject = db.relationship('Subject', backref=db.backref('student_rollups', lazy=True, cascade="all, delete-orphan"))
+
+class QuestionStat(db.Model):
+    # Item analysis of one question over completed attempts, refreshed by the item-analysis task
+    QuestionID = db.Column(db.Integer, db.ForeignKey('question.QuestionID', ondelete="CASCADE"), primary_key=True)
+    ExamID = db.Column(db.Integer, db.ForeignKey('exam.ExamID', ondelete="CASCADE"), nullable=False, index=True)
+    ExamVersion = db.Column(db.Integer, nullable=False) # answer key version the statistics were computed against
+    Responses = db.Column(db.Integer, nullable=False, default=0) # attempts analysed
+    PValue = db.Column(db.Float, nullable=True) # share of attempts answering correctly (difficulty)
+    PointBiserial = db.Column(db.Float, nullable=True) # correlation of correctness with total score (discrimination)
+    OptionCounts = db.Column(db.Text, nullable=False, default='[]') # JSON [unanswered, option1, ..., option4]
+    ComputedAt = db.Column(db.DateTime, nullable=False)
+    question = db.relationship('Question', backref=db.backref('stat', uselist=False, lazy=True, cascade="all, delete-orphan"))
+
+class AnswerLayout(db.Model):
+    # Question order of one exam version; packed answers of attempts on that version follow it
+    ExamID = db.Column(db.Integer, db.ForeignKey('exam.ExamID', ondelete="CASCADE"), primary_key=True)
+    Version = db.Column(db.Integer, primary_key=True)
+    QuestionIDs = db.Column(db.Text, nullable=False) # JSON list
+
+class ArchivedAttempt(db.Model):
+    # Completed attempts moved out of Attempt once older than ARCHIVE_AFTER_DAYS; answers are always packed
+    __table_args__ = (
+        db.Index('ix_archived_attempt_student_date', 'StudentID', 'AttemptDate'),
+        db.Index('ix_archived_attempt_exam', 'ExamID'),
+    )
+    AttemptID = db.Column(db.Integer, primary_key=True, autoincrement=False) # kept from Attempt
+    StudentID = db.Column(db.Integer, db.ForeignKey('student.StudentID', ondelete="CASCADE"), nullable=False)
+    ExamID = db.Column(db.Integer, db.ForeignKey('exam.ExamID', ondelete="CASCADE"), nullable=False)
+    AttemptDate = db.Column(db.DateTime, nullable=False)
+    Marks = db.Column(db.Integer, nullable=False)
+    TotalMarks = db.Column(db.Integer, nullable=False)
+    PackedAnswers = db.Column(db.LargeBinary, nullable=False)
+    PackedVersion = db.Column(db.Integer, nullable=False)
+    ArchivedAt = db.Column(db.DateTime, nullable=False)
+    exam = db.relationship('Exam', lazy=True)
+
+    Status = 'completed' # only completed attempts are archived; read like Attempt.Status
@@ -0,0 +1,196 @@
+from collections import OrderedDict
+from threading import Lock
+import json
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.extension import db
+from app.models import Attempt, AnswerLayout, Exam, SelectedAnswer
+from app.grading import UNANSWERED, get_answer_key, fill_selection
+
+# Packed storage keeps a finalized attempt's answers in Attempt.PackedAnswers: one int8
+# per question, in the QuestionID order of the exam version it was graded against, with
+# UNANSWERED for skipped questions. A 100-question attempt is 100 bytes on its own row
+# instead of up to 100 SelectedAnswer rows. Since questions can change between versions,
+# each version's order is recorded once in AnswerLayout and blobs from older versions
+# are realigned to the current answer key when read.
+
+LAYOUT_CACHE_SIZE = 1024
+
+_layouts = OrderedDict()
+_layouts_lock = Lock()
+
+
+def packed_storage():
+    return current_app.config['ANSWER_STORAGE'] == 'packed'
+
+
+def _cache_layout(layout_key, question_ids):
+    with _layouts_lock:
+        _layouts[layout_key] = question_ids
+        _layouts.move_to_end(layout_key)
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.popitem(last=False)
+
+
+def ensure_layout(key):
+    """
+    Records the question order of an answer key's exam version, once. The caller owns
+    the commit; the layout is only cached in-process after the commit succeeds.
+    """
+    layout_key = (key.exam_id, key.version)
+    with _layouts_lock:
+        if layout_key in _layouts:
+            return
+    pending = db.session.info.setdefault('pending_layouts', {})
+    if layout_key in pending:
+        return
+    question_ids = key.question_ids.tolist()
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    db.session.execute(insert(AnswerLayout).values(
+        ExamID=key.exam_id,
+        Version=key.version,
+        QuestionIDs=json.dumps(question_ids)
+    ).on_conflict_do_nothing(index_elements=['ExamID', 'Version']))
+    pending[layout_key] = np.asarray(question_ids, dtype=np.int64)
+
+
+@event.listens_for(Session, 'after_commit')
+def _cache_committed_layouts(session):
+    for layout_key, question_ids in session.info.pop('pending_layouts', {}).items():
+        _cache_layout(layout_key, question_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_rolled_back_layouts(session):
+    # The rows were never written; a cached layout would make unpack() drop the answers
+    session.info.pop('pending_layouts', None)
+
+
+def layout(exam_id, version):
+    layout_key = (exam_id, version)
+    with _layouts_lock:
+        question_ids = _layouts.get(layout_key)
+        if question_ids is not None:
+            _layouts.move_to_end(layout_key)
+            return question_ids
+    row = db.session.get(AnswerLayout, layout_key)
+    if row is None:
+        return None
+    question_ids = np.asarray(json.loads(row.QuestionIDs), dtype=np.int64)
+    _cache_layout(layout_key, question_ids)
+    return question_ids
+
+
+def pack(selected):
+    return np.asarray(selected, dtype=np.int8).tobytes()
+
+
+def store_packed(attempt, key, selected):
+    """Stages the packed answers on the attempt; the caller owns the commit."""
+    ensure_layout(key)
+    attempt.PackedAnswers = pack(selected)
+    attempt.PackedVersion = key.version
+
+
+def unpack(packed, version, key):
+    """Packed answers as an option vector aligned to the current answer `key`."""
+    stored = np.frombuffer(packed, dtype=np.int8)
+    if version == key.version and len(stored) == len(key):
+        return stored.copy()
+    question_ids = layout(key.exam_id, version)
+    selected = np.full(len(key), UNANSWERED, dtype=np.int8)
+    if question_ids is None or len(question_ids) != len(stored):
+        return selected
+    for question_id, option in zip(question_ids.tolist(), stored.tolist()):
+        pos = key.index.get(question_id)
+        if pos is not None:
+            selected[pos] = option
+    return selected
+
+
+def answers_of(attempt, key):
+    """{QuestionID: option} of a finalized attempt, from whichever storage it uses."""
+    if attempt.PackedAnswers is not None:
+        selected = unpack(attempt.PackedAnswers, attempt.PackedVersion, key)
+        return {int(key.question_ids[pos]): int(selected[pos]) for pos in np.flatnonzero(selected != UNANSWERED)}
+    return {sa.QuestionID: sa.SelectedOption for sa in attempt.SelectedAnswers}
+
+
+def fill_packed(selected, key, attempt_ids, rows):
+    """Like grading.fill_selection, for (AttemptID, PackedAnswers, PackedVersion) rows."""
+    for row in rows:
+        pos = np.searchsorted(attempt_ids, row.AttemptID)
+        if pos < len(attempt_ids) and attempt_ids[pos] == row.AttemptID:
+            selected[pos] = unpack(row.PackedAnswers, row.PackedVersion, key)
+
+
+def packed_rows(exam_id, first_id=None, last_id=None, model=Attempt):
+    # `model` is Attempt or ArchivedAttempt, which share these columns
+    query = db.select(model.AttemptID, model.PackedAnswers, model.PackedVersion).filter(
+        model.ExamID == exam_id,
+        model.PackedAnswers.isnot(None)
+    )
+    if first_id is not None:
+        query = query.filter(model.AttemptID.between(first_id, last_id))
+    return db.session.execute(query.execution_options(yield_per=10000))
+
+
+def selection_from_rows(key, attempt_ids):
+    """(attempts, questions) option matrix of the sorted `attempt_ids`, read from SelectedAnswer rows."""
+    selected = np.full((len(attempt_ids), len(key)), UNANSWERED, dtype=np.int8)
+    answers = db.session.execute(
+        db.select(SelectedAnswer.AttemptID, SelectedAnswer.QuestionID, SelectedAnswer.SelectedOption)
+        .filter(SelectedAnswer.AttemptID.in_(attempt_ids.tolist()))
+        .execution_options(yield_per=10000)
+    )
+    for partition in answers.partitions():
+        fill_selection(selected, key, attempt_ids, partition)
+    return selected
+
+
+def pack_exam_answers(exam, batch_size):
+    """
+    Converts the SelectedAnswer rows of an exam's finalized attempts into packed
+    answers, one committed batch at a time. Returns the number of attempts converted.
+    """
+    key = get_answer_key(exam)
+    ensure_layout(key)
+    converted = 0
+    while True:
+        attempt_ids = np.array(db.session.scalars(
+            db.select(Attempt.AttemptID).filter(
+                Attempt.ExamID == exam.ExamID,
+                Attempt.Status == 'completed',
+                Attempt.PackedAnswers.is_(None)
+            ).order_by(Attempt.AttemptID).limit(batch_size)
+        ).all(), dtype=np.int64)
+        if not len(attempt_ids):
+            return converted
+
+        selected = selection_from_rows(key, attempt_ids)
+        db.session.execute(update(Attempt), [
+            {'AttemptID': int(attempt_id), 'PackedAnswers': pack(row), 'PackedVersion': key.version}
+            for attempt_id, row in zip(attempt_ids, selected)
+        ])
+        SelectedAnswer.query.filter(
+            SelectedAnswer.AttemptID.in_(attempt_ids.tolist())
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        converted += len(attempt_ids)
+
+
+@click.command('pack-answers')
+@click.option('--batch-size', default=1000, show_default=True, help='Attempts converted per transaction.')
+@with_appcontext
+def pack_answers_command(batch_size):
+    """Convert stored SelectedAnswer rows of finalized attempts into packed answers."""
+    total = 0
+    for exam in Exam.query.order_by(Exam.ExamID).all():
+        total += pack_exam_answers(exam, batch_size)
+    click.echo(f"Packed answers of {total} attempts.")
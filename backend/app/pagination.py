@@ -0,0 +1,87 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime
+import binascii
+import json
+from flask import request, jsonify, current_app, g, Response, stream_with_context
+from sqlalchemy import DateTime, tuple_
+
+# List views answer three ways:
+#   no `limit`          -> the plain JSON array, as the SPA has always received it
+#   `limit` [+ cursor]  -> {"items": [...], "next_cursor": ..., ["total": n]} using keyset
+#                          pagination on a unique sort key, so page N costs the same as page 1
+#   `stream=true`       -> the full array streamed row by row (yield_per) for export-style callers
+
+STREAM_BATCH_SIZE = 1000
+
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token, keys):
+    try:
+        values = json.loads(urlsafe_b64decode(token.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError('cursor does not match the sort key')
+        return [
+            datetime.fromisoformat(value) if isinstance(key.type, DateTime) else value
+            for key, value in zip(keys, values)
+        ]
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+
+def _flag(value):
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _stream(query, serialize, replica):
+    # Runs after the view has returned and @read_replica has cleared its flag, so the
+    # flag is set again for the queries issued while streaming
+    g.read_replica = replica
+    try:
+        yield '['
+        for i, row in enumerate(query.yield_per(STREAM_BATCH_SIZE)):
+            yield (',' if i else '') + json.dumps(serialize(row))
+        yield ']'
+    finally:
+        g.read_replica = False
+
+
+def paginated(query, keys, serialize, descending=False, cursor_of=None):
+    """
+    Builds the response of a list view from an unordered `query`. `keys` are the
+    columns of a unique sort key (e.g. [Attempt.AttemptDate, Attempt.AttemptID]);
+    `cursor_of(row)` returns their values for a row, by default read as attributes.
+    """
+    cursor_of = cursor_of or (lambda row: [getattr(row, key.key) for key in keys])
+    ordered = query.order_by(*[key.desc() if descending else key.asc() for key in keys])
+
+    if request.args.get('stream', '', type=_flag):
+        return Response(stream_with_context(_stream(ordered, serialize, g.get('read_replica', False))), mimetype='application/json')
+
+    limit = request.args.get('limit', type=int)
+    if limit is None:
+        return jsonify([serialize(row) for row in ordered]), 200
+    limit = max(1, min(limit, current_app.config['PAGE_MAX_LIMIT']))
+
+    page = ordered
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after = decode_cursor(cursor, keys)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        position = tuple_(*keys)
+        page = page.filter(position < tuple_(*after) if descending else position > tuple_(*after))
+
+    # One extra row tells whether another page follows
+    rows = page.limit(limit + 1).all()
+    body = {
+        'items': [serialize(row) for row in rows[:limit]],
+        'next_cursor': encode_cursor(cursor_of(rows[limit - 1])) if len(rows) > limit else None
+    }
+    if request.args.get('count', '', type=_flag):
+        body['total'] = query.order_by(None).count()
+    return jsonify(body), 200
@@ -0,0 +1,84 @@
+from collections import OrderedDict
+from threading import Lock
+import json
+from app.extension import db, cache
+from app.models import Question
+
+PAPER_LRU_SIZE = 128
+PAPER_TIMEOUT = 24 * 60 * 60
+
+_papers = OrderedDict()
+_papers_lock = Lock()
+
+
+def paper_cache_key(exam):
+    return f"exam_paper:{exam.ExamID}:{exam.Version}"
+
+
+def build_paper(exam):
+    """
+    Serializes the student-facing paper of an exam (no correct options) into
+    a JSON object of the form {"exam_details": ..., "questions": [...]}.
+    """
+    questions = db.session.query(
+        Question.QuestionID,
+        Question.QuestionStatement,
+        Question.Option1,
+        Question.Option2,
+        Question.Option3,
+        Question.Option4,
+        Question.Marks,
+        Question.NegMarks
+    ).filter(Question.ExamID == exam.ExamID).order_by(Question.QuestionID).all()
+
+    paper = {
+        'exam_details': {
+            'exam_name': exam.ExamName,
+            'total_duration': exam.TotalDuration,
+            'total_questions': exam.TotalQuestions,
+        },
+        'questions': [{
+            'QuestionID': q.QuestionID,
+            'QuestionStatement': q.QuestionStatement,
+            'Option1': q.Option1,
+            'Option2': q.Option2,
+            'Option3': q.Option3,
+            'Option4': q.Option4,
+            'Marks': q.Marks,
+            'NegMarks': q.NegMarks
+        } for q in questions]
+    }
+    return json.dumps(paper, separators=(',', ':')).encode('utf-8')
+
+
+def _remember(key, paper):
+    with _papers_lock:
+        _papers[key] = paper
+        _papers.move_to_end(key)
+        while len(_papers) > PAPER_LRU_SIZE:
+            _papers.popitem(last=False)
+
+
+def get_paper(exam):
+    # Process-local LRU first, then the shared Redis cache, then the database
+    key = paper_cache_key(exam)
+    with _papers_lock:
+        paper = _papers.get(key)
+        if paper is not None:
+            _papers.move_to_end(key)
+            return paper
+
+    paper = cache.get(key)
+    if paper is None:
+        paper = build_paper(exam)
+        cache.set(key, paper, timeout=PAPER_TIMEOUT)
+    _remember(key, paper)
+    return paper
+
+
+def warm_paper(exam):
+    paper = build_paper(exam)
+    key = paper_cache_key(exam)
+    cache.set(key, paper, timeout=PAPER_TIMEOUT)
+    _remember(key, paper)
+    return paper
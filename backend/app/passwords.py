@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from threading import BoundedSemaphore, Lock
+import math
+import time
+from flask import current_app
+from app.extension import bcrypt
+
+_executor = None
+_slots = None
+_rounds = None
+_lock = Lock()
+
+
+class PasswordServiceBusy(Exception):
+    """Raised when the hashing queue is full, or no worker frees up within PASSWORD_HASH_TIMEOUT."""
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            config = current_app.config
+            _executor = ThreadPoolExecutor(
+                max_workers=config['PASSWORD_HASH_WORKERS'],
+                thread_name_prefix='password-hash'
+            )
+            # One slot per hash running or waiting for a worker
+            _slots = BoundedSemaphore(config['PASSWORD_HASH_WORKERS'] + config['PASSWORD_HASH_QUEUE_SIZE'])
+        return _executor, _slots
+
+
+def _run(fn, *args):
+    # bcrypt releases the GIL, so the bounded pool caps CPU-bound hashing concurrency
+    # and lets callers give up quickly instead of queueing behind a login wave
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        raise PasswordServiceBusy()
+    try:
+        future = executor.submit(fn, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+    except TimeoutError:
+        # Still queued: withdraw it so no worker hashes for a caller that has left
+        future.cancel()
+        raise PasswordServiceBusy()
+
+
+def calibrate_rounds():
+    """
+    Picks the bcrypt cost whose hash time is closest to BCRYPT_TARGET_MS on this
+    machine, clamped to [BCRYPT_MIN_ROUNDS, BCRYPT_MAX_ROUNDS].
+    """
+    config = current_app.config
+    sample_rounds = 8
+    start = time.perf_counter()
+    bcrypt.generate_password_hash('calibration', sample_rounds)
+    elapsed_ms = max((time.perf_counter() - start) * 1000, 0.1)
+    # each extra round doubles the work
+    rounds = sample_rounds + round(math.log2(config['BCRYPT_TARGET_MS'] / elapsed_ms))
+    return min(max(rounds, config['BCRYPT_MIN_ROUNDS']), config['BCRYPT_MAX_ROUNDS'])
+
+
+def current_rounds():
+    global _rounds
+    if _rounds is None:
+        configured = current_app.config.get('BCRYPT_LOG_ROUNDS')
+        rounds = configured if configured else calibrate_rounds()
+        with _lock:
+            if _rounds is None:
+                _rounds = rounds
+                current_app.logger.info(f"Using bcrypt cost {_rounds} for password hashes")
+    return _rounds
+
+
+def hash_rounds(pw_hash):
+    # Modular crypt format: $2b$<cost>$<salt+hash>
+    if isinstance(pw_hash, bytes):
+        pw_hash = pw_hash.decode('utf-8')
+    try:
+        return int(pw_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def hash_password(password):
+    return _run(bcrypt.generate_password_hash, password, current_rounds()).decode('utf-8')
+
+
+def check_password(pw_hash, password):
+    return _run(bcrypt.check_password_hash, pw_hash, password)
+
+
+def needs_rehash(pw_hash):
+    rounds = hash_rounds(pw_hash)
+    return rounds is None or rounds < current_rounds()
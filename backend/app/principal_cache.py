@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from threading import Lock
+import time
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from app.extension import db, cache
+from app.models import Admin, Student
+
+PRINCIPAL_MODELS = {'admin': Admin, 'student': Student}
+# Never copied into the cache; loaded on demand if a handler actually needs it
+UNCACHED_COLUMNS = {'PasswordHash'}
+
+_principals = OrderedDict()
+_principals_lock = Lock()
+
+
+def _cache_key(user_type, user_id):
+    return f"principal:{user_type}:{user_id}"
+
+
+def _snapshot(principal):
+    return {
+        attr.key: getattr(principal, attr.key)
+        for attr in inspect(principal).mapper.column_attrs
+        if attr.key not in UNCACHED_COLUMNS
+    }
+
+
+def _local_get(key):
+    with _principals_lock:
+        entry = _principals.get(key)
+        if entry is None:
+            return None
+        expires_at, values = entry
+        if expires_at < time.monotonic():
+            del _principals[key]
+            return None
+        _principals.move_to_end(key)
+        return values
+
+
+def _local_set(key, values):
+    config = current_app.config
+    with _principals_lock:
+        _principals[key] = (time.monotonic() + config['PRINCIPAL_CACHE_TTL'], values)
+        _principals.move_to_end(key)
+        while len(_principals) > config['PRINCIPAL_CACHE_SIZE']:
+            _principals.popitem(last=False)
+
+
+def load_principal(user_type, user_id):
+    """
+    Returns the Admin/Student for a token subject, attached to the current session,
+    without a query when a fresh snapshot is cached in-process or in Redis.
+    """
+    model = PRINCIPAL_MODELS[user_type]
+    key = _cache_key(user_type, user_id)
+    config = current_app.config
+
+    values = _local_get(key)
+    if values is None and config['PRINCIPAL_CACHE_SHARED']:
+        values = cache.get(key)
+        if values is not None:
+            _local_set(key, values)
+
+    if values is None:
+        principal = db.session.get(model, user_id)
+        if principal is None:
+            return None
+        values = _snapshot(principal)
+        _local_set(key, values)
+        if config['PRINCIPAL_CACHE_SHARED']:
+            cache.set(key, values, timeout=config['PRINCIPAL_CACHE_TTL'])
+        return principal
+
+    principal = model(**values)
+    make_transient_to_detached(principal)
+    return db.session.merge(principal, load=False)
+
+
+def invalidate_principal(user_type, user_id):
+    key = _cache_key(user_type, user_id)
+    with _principals_lock:
+        _principals.pop(key, None)
+    if current_app.config['PRINCIPAL_CACHE_SHARED']:
+        cache.delete(key)
@@ -0,0 +1,200 @@
+from datetime import datetime, timedelta
+from itertools import groupby
+import csv
+import io
+from flask import current_app
+from flask_mail import Message
+import redis
+from sqlalchemy import select, and_
+from app.extension import db, redis_client
+from app.models import Student, Exam, Attempt
+
+# Performance reports cover the last REPORT_DAYS days of attempts. Bulk exports run in
+# blocks of consecutive StudentIDs: one query per block returns every student of the
+# block with their attempts, ordered by StudentID, and is grouped in a single streaming
+# pass. Progress of an export is kept in a Redis hash the triggering admin can poll.
+
+REPORT_DAYS = 30
+PROGRESS_TTL = 24 * 60 * 60
+
+
+def render_report(name, attempts):
+    """
+    HTML body and CSV attachment (None without attempts) of a student's report.
+    `attempts` are (AttemptDate, ExamName, TotalMarks, Marks) rows, newest first.
+    """
+    if not attempts:
+        report_body = f"""
+        <p>Hi {name},</p>
+        <p>You have not attempted any quizzes in the last 30 days.</p>
+        <p>Thanks,<br>The QuizMaster Team</p>
+        """
+        return report_body, None
+
+    table_rows = ""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Attempt Date', 'Exam Name', 'Total Marks', 'Marks Obtained'])
+    for attempt in attempts:
+        table_rows += f"""
+            <tr>
+                <td>{attempt.AttemptDate.strftime('%Y-%m-%d %H:%M')}</td>
+                <td>{attempt.ExamName}</td>
+                <td>{attempt.TotalMarks}</td>
+                <td>{attempt.Marks}</td>
+            </tr>
+            """
+        writer.writerow([
+            attempt.AttemptDate.strftime('%Y-%m-%d %H:%M'),
+            attempt.ExamName,
+            attempt.TotalMarks,
+            attempt.Marks
+        ])
+    report_body = f"""
+        <html>
+            <head>
+                <style>
+                    body {{ font-family: sans-serif; }}
+                    table {{ border-collapse: collapse; width: 100%; }}
+                    th, td {{ border: 1px solid #dddddd; text-align: left; padding: 8px; }}
+                    th {{ background-color: #f2f2f2; }}
+                </style>
+            </head>
+            <body>
+                <h2>Hi {name},</h2>
+                <p>Here is your performance report for the last 30 days:</p>
+                <table>
+                    <thead>
+                        <tr>
+                            <th>Attempt Date</th>
+                            <th>Exam Name</th>
+                            <th>Total Marks</th>
+                            <th>Marks Obtained</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        {table_rows}
+                    </tbody>
+                </table>
+                <p>Keep up the great work!</p>
+                <p>Thanks,<br>The QuizMaster Team</p>
+            </body>
+        </html>
+        """
+    return report_body, output.getvalue()
+
+
+def report_message(email, name, attempts):
+    report_body, csv_data = render_report(name, attempts)
+    msg = Message(
+        "Your Monthly Performance Report",
+        recipients=[email],
+        html=report_body
+    )
+    if csv_data:
+        msg.attach(
+            "performance_report.csv",
+            "text/csv",
+            csv_data
+        )
+    return msg
+
+
+def report_query(since):
+    """Students joined to their attempts since `since` (students without any included), by StudentID."""
+    return select(
+        Student.StudentID, Student.Name, Student.Email,
+        Attempt.AttemptDate, Exam.ExamName, Attempt.TotalMarks, Attempt.Marks
+    ).select_from(Student) \
+     .outerjoin(Attempt, and_(Attempt.StudentID == Student.StudentID, Attempt.AttemptDate >= since)) \
+     .outerjoin(Exam, Exam.ExamID == Attempt.ExamID) \
+     .order_by(Student.StudentID, Attempt.AttemptDate.desc(), Attempt.AttemptID.desc())
+
+
+def block_reports(first_id, last_id):
+    """
+    Report messages for the students with first_id <= StudentID <= last_id, built
+    from one streamed query and yielded one student at a time.
+    """
+    since = datetime.utcnow() - timedelta(days=REPORT_DAYS)
+    rows = db.session.execute(
+        report_query(since).filter(Student.StudentID.between(first_id, last_id))
+        .execution_options(yield_per=1000)
+    )
+    for (student_id, name, email), group in groupby(rows, key=lambda row: (row.StudentID, row.Name, row.Email)):
+        attempts = [row for row in group if row.AttemptDate is not None]
+        yield report_message(email, name, attempts)
+
+
+def _progress_key(export_id):
+    return f"report_export:{export_id}"
+
+
+def _write_progress(export_id, write):
+    # Progress is informational: a Redis outage must not stop the export itself
+    try:
+        write(_progress_key(export_id))
+    except redis.RedisError as e:
+        current_app.logger.warning(f"Could not record progress of report export {export_id}: {e}")
+
+
+def start_progress(export_id, admin_id):
+    def write(key):
+        pipe = redis_client.pipeline()
+        pipe.hset(key, mapping={
+            'admin_id': admin_id if admin_id is not None else '',
+            'status': 'queued',
+            'total': 0,
+            'done': 0,
+            'sent': 0,
+            'failed': 0,
+            'started_at': datetime.utcnow().isoformat()
+        })
+        pipe.expire(key, PROGRESS_TTL)
+        pipe.execute()
+    _write_progress(export_id, write)
+
+
+def set_total(export_id, total):
+    # Set before any block is dispatched, so no block can see a total of zero
+    def write(key):
+        if total:
+            redis_client.hset(key, mapping={'total': total, 'status': 'running'})
+        else:
+            redis_client.hset(key, mapping={'status': 'completed', 'finished_at': datetime.utcnow().isoformat()})
+    _write_progress(export_id, write)
+
+
+def record_block(export_id, sent, failed):
+    """Counts a finished block towards its export; the last one marks it completed."""
+    def write(key):
+        pipe = redis_client.pipeline()
+        pipe.hincrby(key, 'done', sent + failed)
+        pipe.hincrby(key, 'sent', sent)
+        pipe.hincrby(key, 'failed', failed)
+        pipe.hget(key, 'total')
+        done, _, _, total = pipe.execute()
+        if total is not None and done >= int(total):
+            redis_client.hset(key, mapping={'status': 'completed', 'finished_at': datetime.utcnow().isoformat()})
+    _write_progress(export_id, write)
+
+
+def export_progress(export_id):
+    raw = redis_client.hgetall(_progress_key(export_id))
+    if not raw:
+        return None
+    progress = {
+        (field.decode() if isinstance(field, bytes) else field): (value.decode() if isinstance(value, bytes) else value)
+        for field, value in raw.items()
+    }
+    counts = {field: int(progress[field]) for field in ('total', 'done', 'sent', 'failed')}
+    return {
+        'export_id': export_id,
+        'admin_id': int(progress['admin_id']) if progress['admin_id'] else None,
+        'status': progress['status'],
+        **counts,
+        'percent': round(100.0 * min(counts['done'], counts['total']) / counts['total'], 1) if counts['total']
+                   else (100.0 if progress['status'] == 'completed' else 0.0),
+        'started_at': progress['started_at'],
+        'finished_at': progress.get('finished_at')
+    }
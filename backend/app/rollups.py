@@ -0,0 +1,246 @@
+from itertools import groupby, zip_longest
+import json
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from app.extension import db
+from app.models import (
+    Attempt, ArchivedAttempt, Exam, Chapter, ExamRollup, SubjectRollup, StudentRollup, StudentSubjectRollup
+)
+
+# Per-exam and per-subject aggregates of completed attempts: count, sum and sum of
+# squares of marks (for mean and variance), plus max and min. They are bumped in the
+# same transaction that finalizes attempts, so the admin dashboard reads O(#subjects)
+# rows no matter how many attempts exist. Student rollups do the same for the student
+# dashboard: one row per student and one per (student, subject). Rebuilds count archived
+# attempts as well, so archiving never changes a rollup.
+
+ROLLUP_INSERT_BATCH = 1000
+
+
+def scored_attempts():
+    """Completed attempts, live and archived, as one subquery."""
+    def columns(model):
+        return (model.AttemptID, model.StudentID, model.ExamID, model.AttemptDate, model.Marks, model.TotalMarks)
+    return union_all(
+        select(*columns(Attempt)).filter(Attempt.Status == 'completed'),
+        select(*columns(ArchivedAttempt))
+    ).subquery('scored_attempt')
+
+
+def _upsert(model, keys, sums, maximums=None, minimums=None):
+    # INSERT ... ON CONFLICT DO UPDATE: `sums` columns are added to, `maximums`/`minimums` kept as extremes
+    maximums, minimums = maximums or {}, minimums or {}
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+    greatest = func.greatest if dialect == 'postgresql' else func.max
+    least = func.least if dialect == 'postgresql' else func.min
+
+    stmt = insert(table).values({**keys, **sums, **maximums, **minimums})
+    excluded = stmt.excluded
+    updates = {column: table.c[column] + excluded[column] for column in sums}
+    updates.update({
+        column: greatest(func.coalesce(table.c[column], excluded[column]), excluded[column])
+        for column in maximums
+    })
+    updates.update({
+        column: least(func.coalesce(table.c[column], excluded[column]), excluded[column])
+        for column in minimums
+    })
+    db.session.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_=updates))
+
+
+def record_scores(exam, marks):
+    """
+    Folds newly finalized marks of one exam into its exam and subject rollups.
+    Staged on the session; the caller owns the commit.
+    """
+    if not marks:
+        return
+    sums = {'AttemptCount': len(marks), 'MarksSum': sum(marks), 'MarksSquareSum': sum(m * m for m in marks)}
+    high, low = {'MaxMarks': max(marks)}, {'MinMarks': min(marks)}
+    _upsert(ExamRollup, {'ExamID': exam.ExamID}, sums, high, low)
+    _upsert(SubjectRollup, {'SubjectID': exam.chapter.SubjectID}, sums, high, low)
+
+
+def _series_append(series, bucket, marks, total_marks):
+    # Keeps at most STUDENT_SERIES_POINTS points; when full, adjacent points are merged
+    # pairwise and the bucket width doubles, so any history downsamples to a bounded series
+    if series and series[-1][2] < bucket:
+        point = series[-1]
+        point[0] += marks
+        point[1] += total_marks
+        point[2] += 1
+    else:
+        series.append([marks, total_marks, 1])
+    if len(series) > current_app.config['STUDENT_SERIES_POINTS']:
+        series[:] = [
+            [a[0] + b[0], a[1] + b[1], a[2] + b[2]] if b else a
+            for a, b in zip_longest(series[0::2], series[1::2])
+        ]
+        bucket *= 2
+    return bucket
+
+
+def record_student_score(student_id, subject_id, marks, total_marks):
+    """
+    Folds one finalized attempt into the student's rollups. Staged on the session;
+    the caller owns the commit.
+    """
+    rollup = db.session.get(StudentRollup, student_id)
+    if rollup is None:
+        rollup = StudentRollup(StudentID=student_id, AttemptCount=0, MarksSum=0, Series='[]', SeriesBucket=1)
+        db.session.add(rollup)
+    series = json.loads(rollup.Series)
+    rollup.SeriesBucket = _series_append(series, rollup.SeriesBucket, marks, total_marks)
+    rollup.Series = json.dumps(series, separators=(',', ':'))
+    rollup.AttemptCount += 1
+    rollup.MarksSum += marks
+    rollup.BestMarks = marks if rollup.BestMarks is None else max(rollup.BestMarks, marks)
+
+    _upsert(StudentSubjectRollup, {'StudentID': student_id, 'SubjectID': subject_id},
+            {'AttemptCount': 1, 'MarksSum': marks})
+
+
+def rebuild_student_rollups(student_ids=None):
+    """
+    Recomputes student rollups from completed attempts, streaming them in
+    (StudentID, AttemptDate) order so memory stays bounded by one student's series.
+    Staged on the session; the caller owns the commit.
+    """
+    scored = scored_attempts()
+    attempts = db.session.query(
+        scored.c.StudentID, scored.c.Marks, scored.c.TotalMarks, Chapter.SubjectID
+    ).join(Exam, Exam.ExamID == scored.c.ExamID).join(Exam.chapter) \
+     .order_by(scored.c.StudentID, scored.c.AttemptDate, scored.c.AttemptID)
+    if student_ids is not None:
+        student_ids = list(student_ids)
+        attempts = attempts.filter(scored.c.StudentID.in_(student_ids))
+        StudentRollup.query.filter(StudentRollup.StudentID.in_(student_ids)).delete(synchronize_session=False)
+        StudentSubjectRollup.query.filter(StudentSubjectRollup.StudentID.in_(student_ids)).delete(synchronize_session=False)
+    else:
+        StudentRollup.query.delete(synchronize_session=False)
+        StudentSubjectRollup.query.delete(synchronize_session=False)
+
+    rebuilt = 0
+    # Written ROLLUP_INSERT_BATCH students at a time, one executemany per table
+    student_rows, subject_rows = [], []
+    for student_id, rows in groupby(attempts.yield_per(5000), key=lambda row: row.StudentID):
+        series, bucket, count, total, best = [], 1, 0, 0, None
+        subjects = {}
+        for row in rows:
+            bucket = _series_append(series, bucket, row.Marks, row.TotalMarks)
+            count += 1
+            total += row.Marks
+            best = row.Marks if best is None else max(best, row.Marks)
+            subject_count, subject_total = subjects.get(row.SubjectID, (0, 0))
+            subjects[row.SubjectID] = (subject_count + 1, subject_total + row.Marks)
+        student_rows.append({
+            'StudentID': student_id,
+            'AttemptCount': count,
+            'MarksSum': total,
+            'BestMarks': best,
+            'Series': json.dumps(series, separators=(',', ':')),
+            'SeriesBucket': bucket
+        })
+        subject_rows.extend({
+            'StudentID': student_id,
+            'SubjectID': subject_id,
+            'AttemptCount': subject_count,
+            'MarksSum': subject_total
+        } for subject_id, (subject_count, subject_total) in subjects.items())
+        rebuilt += 1
+        if len(student_rows) >= ROLLUP_INSERT_BATCH:
+            _insert_student_rollups(student_rows, subject_rows)
+            student_rows, subject_rows = [], []
+    _insert_student_rollups(student_rows, subject_rows)
+    return rebuilt
+
+
+def _insert_student_rollups(student_rows, subject_rows):
+    if student_rows:
+        db.session.execute(StudentRollup.__table__.insert(), student_rows)
+    if subject_rows:
+        db.session.execute(StudentSubjectRollup.__table__.insert(), subject_rows)
+
+
+def _aggregate_columns(scored):
+    return (
+        func.count(scored.c.AttemptID),
+        func.coalesce(func.sum(scored.c.Marks), 0),
+        func.coalesce(func.sum(scored.c.Marks * scored.c.Marks), 0),
+        func.max(scored.c.Marks),
+        func.min(scored.c.Marks)
+    )
+
+
+def rebuild_rollups(exam_ids=None, subject_ids=()):
+    """
+    Recomputes rollups from completed attempts: everything, or only the given exams
+    and the subjects they belong to (plus `subject_ids`, for exams already deleted).
+    Used for backfill and after marks change in place.
+    Staged on the session; the caller owns the commit.
+    """
+    scored = scored_attempts()
+
+    exam_query = db.session.query(scored.c.ExamID, *_aggregate_columns(scored))
+    subject_query = db.session.query(Chapter.SubjectID, *_aggregate_columns(scored)) \
+        .join(Exam, Exam.ExamID == scored.c.ExamID).join(Exam.chapter)
+    if exam_ids is not None:
+        exam_ids = list(exam_ids)
+        subject_ids = set(subject_ids) | {row.SubjectID for row in db.session.query(Chapter.SubjectID).distinct()
+                                          .join(Exam, Exam.ChapterID == Chapter.ChapterID).filter(Exam.ExamID.in_(exam_ids))}
+        exam_query = exam_query.filter(scored.c.ExamID.in_(exam_ids))
+        # Filtered on ExamID, which reaches the attempt indexes inside the union; a filter on
+        # SubjectID would scan every attempt
+        subject_exam_ids = [exam_id for (exam_id,) in db.session.query(Exam.ExamID)
+                            .join(Exam.chapter).filter(Chapter.SubjectID.in_(subject_ids))]
+        subject_query = subject_query.filter(scored.c.ExamID.in_(subject_exam_ids))
+        ExamRollup.query.filter(ExamRollup.ExamID.in_(exam_ids)).delete(synchronize_session=False)
+        SubjectRollup.query.filter(SubjectRollup.SubjectID.in_(subject_ids)).delete(synchronize_session=False)
+    else:
+        ExamRollup.query.delete(synchronize_session=False)
+        SubjectRollup.query.delete(synchronize_session=False)
+
+    columns = ('AttemptCount', 'MarksSum', 'MarksSquareSum', 'MaxMarks', 'MinMarks')
+    exam_rows = [dict(zip(('ExamID',) + columns, row)) for row in exam_query.group_by(scored.c.ExamID)]
+    subject_rows = [dict(zip(('SubjectID',) + columns, row)) for row in subject_query.group_by(Chapter.SubjectID)]
+    if exam_rows:
+        db.session.execute(ExamRollup.__table__.insert(), exam_rows)
+    if subject_rows:
+        db.session.execute(SubjectRollup.__table__.insert(), subject_rows)
+    return len(exam_rows), len(subject_rows)
+
+
+def rollup_scope(exam_ids):
+    """
+    Subjects and students whose rollups include attempts of these exams; taken
+    before the exams are deleted, to rebuild exactly those rollups afterwards.
+    """
+    exam_ids = list(exam_ids)
+    subject_ids = [subject_id for (subject_id,) in db.session.query(Chapter.SubjectID).distinct()
+                   .join(Exam, Exam.ChapterID == Chapter.ChapterID).filter(Exam.ExamID.in_(exam_ids))]
+    scored = scored_attempts()
+    student_ids = [student_id for (student_id,) in db.session.query(scored.c.StudentID).distinct()
+                   .filter(scored.c.ExamID.in_(exam_ids))]
+    return subject_ids, student_ids
+
+
+def exams_attempted_by(student_id):
+    # Max/min cannot be decremented, so removing a student's attempts means recomputing these exams
+    scored = scored_attempts()
+    return [exam_id for (exam_id,) in db.session.query(scored.c.ExamID).distinct()
+            .filter(scored.c.StudentID == student_id)]
+
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Backfill the exam, subject and student rollup tables from existing attempts."""
+    exams, subjects = rebuild_rollups()
+    students = rebuild_student_rollups()
+    db.session.commit()
+    click.echo(f"Rebuilt rollups for {exams} exams, {subjects} subjects and {students} students.")
@@ -0,0 +1,113 @@
+from flask import current_app
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn, CreateTable
+from app.extension import db
+
+# Tables are created, and columns declared on tables that already exist are added, here
+# on startup. Every worker process runs this, so two of them may try to make the same
+# change at once; each change is therefore applied on its own and a lost race skipped.
+
+
+def execute_ddl(statement, applied):
+    """
+    Runs one DDL statement in its own transaction. If it fails because another process
+    applied the same change first, which `applied()` confirms afterwards, it returns
+    False instead of raising. Returns True when this call made the change.
+    """
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(statement)
+        return True
+    except DBAPIError:
+        if applied():
+            return False
+        raise
+
+
+def create_tables():
+    """Creates the declared tables missing from the database, like db.create_all()."""
+    for table in db.metadata.sorted_tables:
+        execute_ddl(CreateTable(table, if_not_exists=True), lambda: inspect(db.engine).has_table(table.name))
+
+
+def _has_column(table_name, column_name):
+    return any(column['name'] == column_name for column in inspect(db.engine).get_columns(table_name))
+
+
+def ensure_columns():
+    """
+    Adds declared columns missing from existing tables. Only columns that are nullable
+    or have a server default can be added this way. Returns their qualified names.
+    """
+    inspector = inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not (column.nullable or column.server_default is not None):
+                continue
+            ddl = CreateColumn(column).compile(dialect=db.engine.dialect)
+            if execute_ddl(text(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}'),
+                           lambda: _has_column(table.name, column.name)):
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _sqlite_table_sql(cursor, table_name):
+    row = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone()
+    return row[0] if row else None
+
+
+def _rebuild_with_autoincrement(table):
+    # SQLite cannot add AUTOINCREMENT to an existing table, so the rows are copied into a
+    # new table that replaces it (https://sqlite.org/lang_altertable.html#otheralter). The
+    # indexes go with the old table; ensure_indexes() creates them again. BEGIN IMMEDIATE
+    # takes the write lock before the check, so only one process rebuilds.
+    staging = f"_rebuild_{table.name}"
+    dialect = db.engine.dialect
+    create = str(CreateTable(table).compile(dialect=dialect)).replace(
+        f"CREATE TABLE {dialect.identifier_preparer.format_table(table)} ", f'CREATE TABLE "{staging}" ', 1)
+    columns = ', '.join(f'"{column.name}"' for column in table.columns)
+    connection = db.engine.raw_connection()
+    sqlite_connection = connection.driver_connection
+    isolation_level = sqlite_connection.isolation_level
+    cursor = sqlite_connection.cursor()
+    try:
+        sqlite_connection.isolation_level = None
+        cursor.execute('PRAGMA foreign_keys=OFF')
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            sql = _sqlite_table_sql(cursor, table.name)
+            if sql is None or 'AUTOINCREMENT' in sql.upper():
+                cursor.execute('ROLLBACK')
+                return False
+            cursor.execute(create)
+            cursor.execute(f'INSERT INTO "{staging}" ({columns}) SELECT {columns} FROM "{table.name}"')
+            cursor.execute(f'DROP TABLE "{table.name}"')
+            cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{table.name}"')
+            cursor.execute('COMMIT')
+            return True
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+    finally:
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+        sqlite_connection.isolation_level = isolation_level
+        connection.close()
+
+
+def ensure_sqlite_autoincrement():
+    """
+    Rebuilds the SQLite tables declared with sqlite_autoincrement that were created
+    without it, so the ids of deleted rows are never handed out again. Returns their names.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return []
+    rebuilt = []
+    for table in db.metadata.sorted_tables:
+        if table.dialect_options['sqlite']['autoincrement'] and _rebuild_with_autoincrement(table):
+            current_app.logger.info(f"Rebuilt table {table.name} with AUTOINCREMENT ids")
+            rebuilt.append(table.name)
+    return rebuilt
@@ -0,0 +1,115 @@
+import re
+from flask import current_app
+from sqlalchemy import func, literal, literal_column, select, table, column, text
+from sqlalchemy.exc import OperationalError
+from app.extension import db
+from app.models import Student, Subject, Chapter, Exam
+from app.schema import execute_ddl
+
+# Name search for the admin listings. SQLite keeps an external-content FTS5 table per
+# entity in sync with triggers; PostgreSQL uses a GIN index on to_tsvector(name), which
+# the database maintains itself. Each word of the search term is matched as a prefix,
+# and results come with a rank where lower is more relevant.
+
+SEARCH_TARGETS = {
+    'student': (Student, 'StudentID', 'Name'),
+    'subject': (Subject, 'SubjectID', 'SubjectName'),
+    'chapter': (Chapter, 'ChapterID', 'ChapterName'),
+    'exam': (Exam, 'ExamID', 'ExamName'),
+}
+TS_CONFIG = "'simple'::regconfig"
+
+_fts_ready = set()
+
+
+def _fts_table(name):
+    return f"{name}_fts"
+
+
+def _sqlite_ddl(name, key, field):
+    fts = _fts_table(name)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5(\"{field}\", content='{name}', content_rowid='{key}', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {name} BEGIN "
+        f"INSERT INTO {fts}(rowid, \"{field}\") VALUES (new.\"{key}\", new.\"{field}\"); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, \"{field}\") VALUES ('delete', old.\"{key}\", old.\"{field}\"); END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF \"{field}\" ON {name} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, \"{field}\") VALUES ('delete', old.\"{key}\", old.\"{field}\"); "
+        f"INSERT INTO {fts}(rowid, \"{field}\") VALUES (new.\"{key}\", new.\"{field}\"); END",
+        # index whatever rows the table already holds
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _exists(catalog_query, name):
+    with db.engine.connect() as connection:
+        return connection.execute(text(catalog_query), {'name': name}).first() is not None
+
+
+def _has_fts_table(name):
+    return _exists("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name", _fts_table(name))
+
+
+def _has_search_index(name):
+    return _exists("SELECT 1 FROM pg_indexes WHERE indexname = :name", f"ix_{name}_search")
+
+
+def ensure_search_index():
+    """
+    Creates the search index structures missing from the database. Idempotent, and safe
+    to run from several processes at once: each entity's structures are created in their
+    own transaction, and one that fails because another process created them first is
+    used all the same.
+    """
+    dialect = db.engine.dialect.name
+    for name, (model, key, field) in SEARCH_TARGETS.items():
+        if dialect == 'sqlite':
+            if not _has_fts_table(name):
+                try:
+                    with db.engine.begin() as connection:
+                        for statement in _sqlite_ddl(name, key, field):
+                            connection.execute(text(statement))
+                except OperationalError as e:
+                    if not _has_fts_table(name):
+                        # SQLite built without FTS5: searches fall back to ILIKE
+                        current_app.logger.warning(f"Full-text search unavailable for {name}: {e}")
+                        continue
+            _fts_ready.add(name)
+        elif dialect == 'postgresql':
+            execute_ddl(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{name}_search ON {name} "
+                f"USING GIN (to_tsvector({TS_CONFIG}, \"{field}\"))"
+            ), lambda: _has_search_index(name))
+            _fts_ready.add(name)
+
+
+def _terms(search):
+    return re.findall(r'\w+', search)
+
+
+def apply_search(query, name, search):
+    """
+    Restricts `query` (over the entity `name`) to rows matching `search` and returns
+    (query, rank). Lower ranks are better; the rank is a constant when falling back to ILIKE.
+    """
+    model, key, field = SEARCH_TARGETS[name]
+    pk, column_ = getattr(model, key), getattr(model, field)
+    terms = _terms(search)
+    dialect = db.engine.dialect.name
+    if not terms or name not in _fts_ready:
+        return query.filter(column_.ilike(f'%{search}%')), literal(0)
+
+    if dialect == 'sqlite':
+        fts = table(_fts_table(name), column('rowid'))
+        fts_name = literal_column(_fts_table(name))
+        matches = select(
+            fts.c.rowid.label('id'),
+            func.bm25(fts_name).label('rank')
+        ).where(fts_name.op('MATCH')(' '.join(f'"{term}"*' for term in terms))).subquery()
+        return query.join(matches, matches.c.id == pk), matches.c.rank
+
+    vector = func.to_tsvector(literal_column(TS_CONFIG), column_)
+    tsquery = func.to_tsquery(literal_column(TS_CONFIG), ' & '.join(f'{term}:*' for term in terms))
+    return query.filter(vector.op('@@')(tsquery)), -func.ts_rank(vector, tsquery)
@@ -1,6 +1,6 @@
-from app import create_app
-
-app = create_app()
-app.app_context().push()
-
+from app import create_app
+
+app = create_app()
+app.app_context().push()
+
 from app.extension import celery
\ No newline at end of file
@@ -0,0 +1,156 @@
+import os
+from contextlib import contextmanager
+from datetime import datetime
+import fakeredis
+import pytest
+from sqlalchemy import event
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-with-at-least-32-bytes')
+os.environ.setdefault('Admin_Username', 'admin')
+os.environ.setdefault('Admin_Email', 'admin@example.com')
+os.environ.setdefault('Admin_Password', 'admin-password')
+
+from app import create_app, grading, leaderboard, packed_answers, paper_cache, passwords, principal_cache, search
+from app.config import Config
+from app.extension import db, celery, redis_client
+from app.models import Subject, Chapter, Exam, Question, Student
+
+
+class TestConfig(Config):
+    TESTING = True
+    CACHE_TYPE = 'SimpleCache'
+    PRINCIPAL_CACHE_SHARED = False
+    LEADERBOARD_BACKEND = 'memory'
+    BCRYPT_LOG_ROUNDS = 4
+    MAIL_SUPPRESS_SEND = True
+    MAIL_DEFAULT_SENDER = 'quizmaster@example.com'
+
+
+def _clear_process_caches():
+    # Per-process caches are keyed by ids that every test database reuses
+    for cache in (grading._answer_keys, packed_answers._layouts, paper_cache._papers, principal_cache._principals):
+        cache.clear()
+    search._fts_ready.clear()
+    leaderboard._backends['memory'] = leaderboard.MemoryLeaderboard()
+    passwords._rounds = None
+
+
+def make_app(tmp_path, **settings):
+    """Yields a test app built with `settings` overriding the test config, then disposes its engines."""
+    class Settings(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        EXPORT_DIR = str(tmp_path / 'exports')
+    for name, value in settings.items():
+        setattr(Settings, name, value)
+
+    _clear_process_caches()
+    app = create_app(Settings)
+    redis_client._client = fakeredis.FakeRedis()
+    celery.conf.update(task_always_eager=True, task_eager_propagates=True, result_backend=None)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def app(tmp_path):
+    yield from make_app(tmp_path)
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """An app whose replica bind is a second engine on the same database file."""
+    yield from make_app(tmp_path, DATABASE_REPLICA_URL=f"sqlite:///{tmp_path / 'test.db'}")
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def exam(app):
+    """A published five-question exam: options 1 and 2 alternate as correct, +2/-1 marks each."""
+    with app.app_context():
+        subject = Subject(SubjectName='Mathematics')
+        db.session.add(subject)
+        db.session.flush()
+        chapter = Chapter(SubjectID=subject.SubjectID, ChapterName='Algebra')
+        db.session.add(chapter)
+        db.session.flush()
+        exam = Exam(ExamName='Algebra I', TotalMarks=10, TotalQuestions=5, TotalDuration=30,
+                    ExamDate=datetime(2026, 1, 1), ChapterID=chapter.ChapterID, Published=True)
+        db.session.add(exam)
+        db.session.flush()
+        for i in range(5):
+            db.session.add(Question(ExamID=exam.ExamID, QuestionStatement=f'Question {i + 1}',
+                                    Option1='a', Option2='b', Option3='c', Option4='d',
+                                    CorrectOption=1 + i % 2, Marks=2, NegMarks=1))
+        db.session.commit()
+        return exam.ExamID
+
+
+def add_student(app, email='student@example.com', password='student-password', name='Student'):
+    with app.app_context():
+        student = Student(Name=name, DOB=datetime(2000, 1, 1), Email=email, Degree='BSc')
+        student.set_password(password)
+        db.session.add(student)
+        db.session.commit()
+        return student.StudentID
+
+
+@pytest.fixture
+def student(app):
+    return add_student(app)
+
+
+def login(client, login_type, email, password):
+    """Logs in through /api/auth/login and returns the Authorization header of the token."""
+    response = client.post('/api/auth/login', json={'type': login_type, 'email': email, 'password': password})
+    assert response.status_code == 200, response.get_json()
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+@pytest.fixture
+def admin_headers(client):
+    return login(client, 'admin', os.environ['Admin_Email'], os.environ['Admin_Password'])
+
+
+@pytest.fixture
+def student_headers(client, student):
+    return login(client, 'student', 'student@example.com', 'student-password')
+
+
+def start_attempt(client, headers, student_id, exam_id):
+    response = client.post(f'/api/student/{student_id}/exam/{exam_id}/start', headers=headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['attempt_id']
+
+
+def submit(client, headers, student_id, attempt_id, answers):
+    return client.post(f'/api/student/{student_id}/attempt/{attempt_id}/submit',
+                       json={'answers': answers}, headers=headers)
+
+
+def question_ids(app, exam_id):
+    with app.app_context():
+        return [q.QuestionID for q in Question.query.filter_by(ExamID=exam_id).order_by(Question.QuestionID)]
+
+
+@contextmanager
+def captured_statements(app, bind=None):
+    """Collects the SQL statements the app's engine (or that of `bind`) executes inside the block."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engines[bind]
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
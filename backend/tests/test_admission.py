@@ -0,0 +1,25 @@
+import redis
+from app import admission
+from app.extension import db
+from app.models import Attempt
+from conftest import start_attempt
+
+
+def test_exam_start_beyond_the_burst_is_refused_with_retry_after(app, client, exam, student, student_headers):
+    app.config.update(ADMISSION_RATE=0.5, ADMISSION_BURST=2)
+    for _ in range(2):
+        start_attempt(client, student_headers, student, exam)
+
+    response = client.post(f'/api/student/{student}/exam/{exam}/start', headers=student_headers)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    assert response.get_json()['retry_after'] == 2
+    with app.app_context():
+        assert db.session.query(Attempt).count() == 2
+
+
+def test_exam_start_is_admitted_when_the_limiter_is_down(app, client, exam, student, student_headers, monkeypatch):
+    def unavailable(bucket):
+        raise redis.ConnectionError('down')
+    monkeypatch.setattr(admission, 'take_token', unavailable)
+    start_attempt(client, student_headers, student, exam)
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app.archive import archive_attempts, reserve_archived_ids
+from app.extension import db
+from app.indexes import ensure_indexes
+from app.models import ArchivedAttempt, Attempt, Exam, Question, SelectedAnswer
+from app.schema import ensure_sqlite_autoincrement
+from conftest import start_attempt, submit, question_ids
+
+
+def _take(client, headers, student_id, exam_id, answers):
+    attempt = start_attempt(client, headers, student_id, exam_id)
+    assert submit(client, headers, student_id, attempt, answers).status_code == 200
+    return attempt
+
+
+def _age(app, attempt_ids, days):
+    with app.app_context():
+        for attempt_id in attempt_ids:
+            db.session.get(Attempt, attempt_id).AttemptDate -= timedelta(days=days)
+        db.session.commit()
+
+
+def _archive(app):
+    with app.app_context():
+        return archive_attempts(datetime.utcnow() - timedelta(days=30), 1)
+
+
+def test_old_completed_attempts_move_to_the_archive(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    app.config['ANSWER_STORAGE'] = 'rows'
+    old = _take(client, student_headers, student, exam, {questions[0]: 1, questions[1]: 1})
+    app.config['ANSWER_STORAGE'] = 'packed'
+    newest_old = _take(client, student_headers, student, exam, {questions[0]: 2})
+    recent = _take(client, student_headers, student, exam, {questions[1]: 2})
+    in_progress = start_attempt(client, student_headers, student, exam)
+    _age(app, [old, newest_old, in_progress], 60)
+    before = client.get(f'/api/student/{student}/attempt/{old}/results', headers=student_headers).get_json()
+
+    # The newest old attempt is archived too: ids are never reused, so nothing has to stay behind
+    assert _archive(app) == 2
+    with app.app_context():
+        assert sorted(a.AttemptID for a in ArchivedAttempt.query) == [old, newest_old]
+        assert sorted(a.AttemptID for a in Attempt.query) == [recent, in_progress]
+        assert db.session.query(SelectedAnswer).count() == 0
+    after = client.get(f'/api/student/{student}/attempt/{old}/results', headers=student_headers).get_json()
+    assert after == before
+
+
+def test_history_reads_live_and_archived_attempts(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    archived = _take(client, student_headers, student, exam, {questions[0]: 1})
+    live = _take(client, student_headers, student, exam, {questions[1]: 2})
+    _age(app, [archived], 60)
+    _archive(app)
+
+    def history(query):
+        response = client.get(f'/api/student/{student}/history{query}', headers=student_headers)
+        assert response.status_code == 200
+        return [attempt['attempt_id'] for attempt in response.get_json()]
+
+    assert history('') == [live]
+    assert history('?archived=true') == [live, archived]
+
+
+def test_rescore_reaches_archived_attempts(app, client, exam, student, student_headers, admin_headers):
+    questions = question_ids(app, exam)
+    archived = _take(client, student_headers, student, exam, {questions[0]: 1, questions[1]: 2})
+    _age(app, [archived], 60)
+    _archive(app)
+
+    with app.app_context():
+        db.session.get(Question, questions[0]).CorrectOption = 2
+        db.session.get(Exam, exam).Version += 1
+        db.session.commit()
+    assert client.post(f'/api/admin/exams/{exam}/rescore', headers=admin_headers).status_code == 202
+    with app.app_context():
+        assert db.session.get(ArchivedAttempt, archived).Marks == 1
+
+
+def test_new_attempts_never_take_an_archived_id(app, client, exam, student, student_headers, admin_headers):
+    first = _take(client, student_headers, student, exam, {})
+    newest = _take(client, student_headers, student, exam, {})
+    _age(app, [first, newest], 60)
+    _archive(app)
+    assert start_attempt(client, student_headers, student, exam) > newest
+
+
+def test_tables_created_without_autoincrement_are_rebuilt(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    attempt = _take(client, student_headers, student, exam, {questions[0]: 1})
+    with app.app_context():
+        # The attempt table as created before it was declared with AUTOINCREMENT
+        sql = db.session.execute(text("SELECT sql FROM sqlite_master WHERE name = 'attempt'")).scalar()
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.exec_driver_sql(sql.replace('attempt', '_old_attempt', 1).replace('AUTOINCREMENT', ''))
+            connection.exec_driver_sql('INSERT INTO _old_attempt SELECT * FROM attempt')
+            connection.exec_driver_sql('DROP TABLE attempt')
+            connection.exec_driver_sql('ALTER TABLE _old_attempt RENAME TO attempt')
+            connection.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'attempt'")
+            connection.commit()
+            connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+        # Archived before the rebuild, above every live attempt
+        db.session.add(ArchivedAttempt(AttemptID=50, StudentID=student, ExamID=exam, AttemptDate=datetime(2025, 1, 1),
+                                       Marks=0, TotalMarks=10, PackedAnswers=b'', PackedVersion=1,
+                                       ArchivedAt=datetime(2025, 6, 1)))
+        db.session.commit()
+
+        assert ensure_sqlite_autoincrement() == ['attempt']
+        assert ensure_sqlite_autoincrement() == []
+        reserve_archived_ids()
+        assert 'ix_attempt_student_date' in ensure_indexes()
+        assert db.session.get(Attempt, attempt).Marks == 2
+
+    assert start_attempt(client, student_headers, student, exam) == 51
+    with app.app_context():
+        assert db.session.execute(text('PRAGMA foreign_key_check')).all() == []
@@ -0,0 +1,67 @@
+import jwt
+from werkzeug.routing import IntegerConverter
+from conftest import add_student, login, start_attempt, submit
+
+
+def test_admin_login_token_authenticates_admin_routes(client, admin_headers):
+    response = client.get('/api/admin/dashboard', headers=admin_headers)
+    assert response.status_code == 200
+
+
+def test_student_login_token_authenticates_student_routes(client, student, student_headers):
+    response = client.get(f'/api/student/{student}', headers=student_headers)
+    assert response.status_code == 200
+    assert response.get_json()['email'] == 'student@example.com'
+
+
+def test_student_token_is_refused_on_admin_routes(client, student_headers):
+    response = client.get('/api/admin/dashboard', headers=student_headers)
+    assert response.status_code == 403
+
+
+def test_token_with_non_numeric_subject_is_rejected(app, client):
+    token = jwt.encode({'sub': 'admin', 'type': 'admin'}, app.config['SECRET_KEY'], algorithm='HS256')
+    response = client.get('/api/admin/dashboard', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 401
+
+
+def test_profile_update_is_seen_by_the_next_authenticated_request(client, student, student_headers):
+    response = client.put(f'/api/student/{student}', json={'name': 'Renamed'}, headers=student_headers)
+    assert response.status_code == 200
+    response = client.get(f'/api/student/{student}', headers=student_headers)
+    assert response.get_json()['name'] == 'Renamed'
+
+
+
+
+def _admin_requests(app):
+    for rule in app.url_map.iter_rules():
+        if not rule.endpoint.startswith('admin.'):
+            continue
+        values = {
+            name: 1 if isinstance(converter, IntegerConverter) else '0' * 32
+            for name, converter in rule._converters.items()
+        }
+        path = app.url_map.bind('localhost').build(rule.endpoint, values)
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            yield method, path
+
+
+def test_every_admin_route_rejects_anonymous_callers(app, client):
+    requests = list(_admin_requests(app))
+    assert requests
+    for method, path in requests:
+        response = client.open(path, method=method, json={})
+        assert response.status_code == 401, f"{method} {path} answered {response.status_code}"
+
+
+def test_attempts_are_submitted_only_by_their_student(app, client, exam, student, student_headers):
+    attempt = start_attempt(client, student_headers, student, exam)
+    add_student(app, email='other@example.com', password='other-password')
+    other_headers = login(client, 'student', 'other@example.com', 'other-password')
+
+    assert submit(client, {}, student, attempt, {}).status_code == 401
+    assert submit(client, other_headers, student, attempt, {}).status_code == 403
+    response = client.patch(f'/api/student/{student}/attempt/{attempt}/answers', json={'answers': {}}, headers=other_headers)
+    assert response.status_code == 403
+    assert submit(client, student_headers, student, attempt, {}).status_code == 200
@@ -0,0 +1,122 @@
+import redis
+from app import autosave
+from app.extension import db, redis_client
+from app.models import Attempt, SelectedAnswer
+from conftest import start_attempt, submit, question_ids
+
+
+def _saved_rows(app, attempt_id):
+    with app.app_context():
+        return {row.QuestionID: row.SelectedOption
+                for row in SelectedAnswer.query.filter_by(AttemptID=attempt_id)}
+
+
+def test_autosaved_answers_are_flushed_and_finalized_on_submit(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+    response = client.patch(f'/api/student/{student}/attempt/{attempt}/answers',
+                            json={'answers': {questions[0]: 1, questions[1]: 1}}, headers=student_headers)
+    assert response.status_code == 200
+
+    with app.app_context():
+        assert autosave.flush_dirty(100) == 1
+    assert _saved_rows(app, attempt) == {questions[0]: 1, questions[1]: 1}
+
+    response = submit(client, student_headers, student, attempt, {questions[1]: 2})
+    assert response.get_json()['score'] == 4
+    assert _saved_rows(app, attempt) == {}
+    assert not redis_client.exists(f'autosave:{attempt}:answers')
+
+
+def test_flush_skips_attempts_submitted_since_they_were_buffered(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+    submit(client, student_headers, student, attempt, {questions[0]: 1})
+    # An autosave that raced the submit leaves a buffer and a dirty mark behind
+    with app.app_context():
+        autosave.record_answers(attempt, {questions[0]: 2})
+        assert autosave.flush_dirty(100) == 1
+        assert db.session.get(Attempt, attempt).Marks == 2
+    assert _saved_rows(app, attempt) == {}
+    assert not redis_client.exists(f'autosave:{attempt}:answers')
+    assert not redis_client.sismember(autosave.DIRTY_SET, attempt)
+
+
+def test_autosave_requires_the_student_token(app, client, exam, student, student_headers):
+    attempt = start_attempt(client, student_headers, student, exam)
+    response = client.patch(f'/api/student/{student}/attempt/{attempt}/answers', json={'answers': {}})
+    assert response.status_code == 401
+
+
+def test_invalid_autosaves_are_refused(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+    for answers in ({'999999': 1}, {questions[0]: 7}, {questions[0]: 'b'}, {'first': None}):
+        response = client.patch(f'/api/student/{student}/attempt/{attempt}/answers',
+                                json={'answers': answers}, headers=student_headers)
+        assert response.status_code == 400, answers
+    assert not redis_client.exists(f'autosave:{attempt}:answers')
+
+
+def test_a_bad_buffer_does_not_hold_back_the_rest_of_the_flush(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    bad = start_attempt(client, student_headers, student, exam)
+    good = start_attempt(client, student_headers, student, exam)
+    with app.app_context():
+        # Written around the PATCH validation, e.g. a question deleted after it was answered
+        autosave.record_answers(bad, {999999: 1, questions[0]: 1})
+        autosave.record_answers(good, {questions[1]: 2})
+        assert autosave.flush_dirty(100) == 2
+    assert _saved_rows(app, bad) == {questions[0]: 1}
+    assert _saved_rows(app, good) == {questions[1]: 2}
+    assert not redis_client.smembers(autosave.DIRTY_SET)
+
+
+def test_flushed_answers_survive_a_lost_buffer(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+    client.patch(f'/api/student/{student}/attempt/{attempt}/answers',
+                 json={'answers': {q: 1 for q in questions}}, headers=student_headers)
+    with app.app_context():
+        autosave.flush_dirty(100)
+    redis_client.flushall()
+
+    response = submit(client, student_headers, student, attempt, {questions[4]: 2})
+    assert response.status_code == 200
+    # right, wrong, right, wrong, wrong
+    assert response.get_json()['score'] == 1
+
+
+def test_submit_asks_for_every_answer_when_none_were_kept(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+    client.patch(f'/api/student/{student}/attempt/{attempt}/answers',
+                 json={'answers': {questions[0]: 1}}, headers=student_headers)
+    redis_client.flushall()
+
+    response = submit(client, student_headers, student, attempt, {})
+    assert response.status_code == 503
+    assert response.get_json()['resend'] == 'complete'
+    with app.app_context():
+        assert db.session.get(Attempt, attempt).Status == 'in_progress'
+
+    response = client.post(f'/api/student/{student}/attempt/{attempt}/submit',
+                           json={'answers': {questions[0]: 1}, 'complete': True}, headers=student_headers)
+    assert response.status_code == 200
+    assert response.get_json()['score'] == 2
+
+
+def test_submit_falls_back_to_flushed_answers_when_redis_is_down(app, client, exam, student, student_headers, monkeypatch):
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+    client.patch(f'/api/student/{student}/attempt/{attempt}/answers',
+                 json={'answers': {questions[0]: 1, questions[1]: 2}}, headers=student_headers)
+    with app.app_context():
+        autosave.flush_dirty(100)
+
+    def unavailable(*args, **kwargs):
+        raise redis.ConnectionError('Redis is down')
+    monkeypatch.setattr(redis_client._client, 'get', unavailable)
+    response = submit(client, student_headers, student, attempt, {})
+    assert response.status_code == 200
+    assert response.get_json()['score'] == 4
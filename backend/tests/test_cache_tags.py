@@ -0,0 +1,30 @@
+from app.extension import cache
+
+
+def _cached_keys(prefix):
+    return [key for key in cache.cache._cache if prefix in key]
+
+
+def test_cached_views_are_keyed_on_the_authenticated_role(app, client, admin_headers):
+    first = client.get('/api/admin/subjects', headers=admin_headers)
+    assert first.status_code == 200
+    with app.app_context():
+        assert _cached_keys('tagged:admin:/api/admin/subjects')
+        assert not _cached_keys('tagged:anonymous:')
+
+    second = client.get('/api/admin/subjects', headers={**admin_headers, 'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+
+
+def test_anonymous_callers_never_reach_the_cache(app, client, admin_headers):
+    client.get('/api/admin/subjects', headers=admin_headers)
+    response = client.get('/api/admin/subjects')
+    assert response.status_code == 401
+
+
+def test_cache_stats_count_hits_and_misses(client, admin_headers):
+    for _ in range(2):
+        client.get('/api/admin/subjects', headers=admin_headers)
+    response = client.get('/api/admin/cache/stats', headers=admin_headers)
+    assert response.status_code == 200
+    assert response.get_json()['get_subjects'] == {'hits': 1, 'misses': 1}
@@ -0,0 +1,68 @@
+import pytest
+from flask import g
+from sqlalchemy import text
+from app.database import read_replica
+from app.extension import db
+from app.models import Subject
+from conftest import make_app
+
+
+@pytest.fixture
+def split_app(tmp_path):
+    """Primary and replica on separate files, so a row shows which bind served a read."""
+    for app in make_app(tmp_path, DATABASE_REPLICA_URL=f"sqlite:///{tmp_path / 'replica.db'}"):
+        with app.app_context():
+            db.metadata.create_all(db.engines['replica'])
+            with db.engines['replica'].begin() as connection:
+                connection.execute(Subject.__table__.insert(), {'SubjectName': 'On the replica'})
+        yield app
+
+
+def _names():
+    return [subject.SubjectName for subject in Subject.query.order_by(Subject.SubjectID)]
+
+
+def test_reads_in_replica_views_use_the_replica(split_app):
+    @read_replica
+    def view():
+        return _names()
+
+    with split_app.test_request_context():
+        db.session.add(Subject(SubjectName='On the primary'))
+        db.session.commit()
+        assert view() == ['On the replica']
+        # The flag only lasts for the view
+        assert not g.read_replica
+        assert _names() == ['On the primary']
+
+
+def test_writes_in_replica_views_go_to_the_primary(split_app):
+    @read_replica
+    def view():
+        subject = Subject(SubjectName='Written in a view')
+        db.session.add(subject)
+        # The flush's INSERT and the raw SQL both go to the primary
+        db.session.flush()
+        count = db.session.execute(text('SELECT count(*) FROM subject')).scalar()
+        db.session.commit()
+        return subject.SubjectID, count
+
+    with split_app.test_request_context():
+        subject_id, count = view()
+        assert count == 1
+        assert db.session.get(Subject, subject_id).SubjectName == 'Written in a view'
+        with db.engines['replica'].connect() as connection:
+            names = connection.execute(text('SELECT "SubjectName" FROM subject')).scalars().all()
+        assert names == ['On the replica']
+
+
+def test_new_connections_get_the_sqlite_profile(split_app):
+    expected = {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 5000, 'foreign_keys': 1,
+                'cache_size': -65536}
+    with split_app.app_context():
+        for engine in db.engines.values():
+            # A fresh pool, so the connection below is opened now rather than reused
+            engine.dispose()
+            with engine.connect() as connection:
+                settings = {pragma: connection.exec_driver_sql(f'PRAGMA {pragma}').scalar() for pragma in expected}
+            assert settings == expected, engine.url
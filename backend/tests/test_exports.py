@@ -0,0 +1,58 @@
+import csv
+import gzip
+import io
+from conftest import add_student, login, start_attempt, submit, question_ids
+
+
+def _completed_attempt(app, client, exam, student, headers):
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, headers, student, exam)
+    response = submit(client, headers, student, attempt, {questions[0]: 1})
+    assert response.status_code == 200
+    return attempt
+
+
+def _csv_rows(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/gzip'
+    return list(csv.reader(io.StringIO(gzip.decompress(response.data).decode())))
+
+
+def test_admin_downloads_the_attempts_export_it_triggered(app, client, exam, student, student_headers, admin_headers):
+    attempt = _completed_attempt(app, client, exam, student, student_headers)
+
+    response = client.post('/api/admin/attempts/export', headers=admin_headers)
+    assert response.status_code == 202
+    export_id = response.get_json()['export_id']
+
+    # Celery runs eagerly, so the file is written by the time the kickoff returns
+    rows = _csv_rows(client.get(f'/api/admin/exports/{export_id}', headers=admin_headers))
+    assert rows[0][:2] == ['Attempt ID', 'Student ID']
+    assert [(int(row[0]), int(row[1])) for row in rows[1:]] == [(attempt, student)]
+
+    streamed = _csv_rows(client.get('/api/admin/attempts/export', headers=admin_headers))
+    assert streamed == rows
+
+
+def test_student_downloads_their_history_export(app, client, exam, student, student_headers):
+    attempt = _completed_attempt(app, client, exam, student, student_headers)
+
+    response = client.post(f'/api/student/{student}/history/export', headers=student_headers)
+    assert response.status_code == 202
+    export_id = response.get_json()['export_id']
+
+    rows = _csv_rows(client.get(f'/api/student/{student}/history/export/{export_id}', headers=student_headers))
+    assert rows[0][0] == 'Attempt ID'
+    assert [int(row[0]) for row in rows[1:]] == [attempt]
+
+    streamed = _csv_rows(client.get(f'/api/student/{student}/history/export', headers=student_headers))
+    assert streamed == rows
+
+
+def test_history_exports_belong_to_their_student(app, client, student, student_headers):
+    add_student(app, email='other@example.com', password='other-password')
+    other_headers = login(client, 'student', 'other@example.com', 'other-password')
+    response = client.post(f'/api/student/{student}/history/export', headers=other_headers)
+    assert response.status_code == 403
+    assert client.post(f'/api/student/{student}/history/export').status_code == 401
+    assert client.post('/api/admin/attempts/export').status_code == 401
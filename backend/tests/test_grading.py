@@ -0,0 +1,215 @@
+import json
+from datetime import datetime
+import numpy as np
+from sqlalchemy import insert
+from app import celery_tasks
+from app.extension import db
+from app.grading import UNANSWERED, AnswerKey, get_answer_key, rescore_exam
+from app.models import Attempt, Exam, PendingSubmission, Question, SelectedAnswer, Student
+from conftest import add_student, captured_statements, login, start_attempt, submit, question_ids
+
+
+def test_submission_is_scored_against_the_answer_key(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+    # right, right, wrong, unanswered, right: 3 * 2 - 1
+    response = submit(client, student_headers, student, attempt, {questions[0]: 1, questions[1]: 2, questions[2]: 2, questions[4]: 1})
+    assert response.status_code == 200
+    assert response.get_json()['score'] == 5
+
+
+def test_rescore_updates_completed_attempts_only(app, client, exam, student, student_headers, admin_headers):
+    questions = question_ids(app, exam)
+    finished = start_attempt(client, student_headers, student, exam)
+    submit(client, student_headers, student, finished, {questions[0]: 1, questions[1]: 2})
+    other = add_student(app, email='other@example.com', password='other-password')
+    other_headers = login(client, 'student', 'other@example.com', 'other-password')
+    in_progress = start_attempt(client, other_headers, other, exam)
+
+    with app.app_context():
+        # The first question's key changes from option 1 to option 3
+        question = db.session.get(Question, questions[0])
+        question.CorrectOption = 3
+        db.session.get(Exam, exam).Version += 1
+        db.session.commit()
+
+    response = client.post(f'/api/admin/exams/{exam}/rescore', headers=admin_headers)
+    assert response.status_code == 202
+
+    with app.app_context():
+        rescored = db.session.get(Attempt, finished)
+        assert (rescored.Marks, rescored.Status) == (1, 'completed')
+        untouched = db.session.get(Attempt, in_progress)
+        assert (untouched.Marks, untouched.Status) == (0, 'in_progress')
+
+
+def test_options_the_question_does_not_have_are_rejected(app, client, exam, student, student_headers):
+    with app.app_context():
+        question = Question.query.filter_by(ExamID=exam).order_by(Question.QuestionID).first()
+        question.Option3 = question.Option4 = None
+        db.session.get(Exam, exam).Version += 1
+        db.session.commit()
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+
+    for option in (3, 0, 1000, 'b'):
+        response = submit(client, student_headers, student, attempt, {questions[0]: option})
+        assert response.status_code == 400, option
+    response = submit(client, student_headers, student, attempt, {'first': 1})
+    assert response.status_code == 400
+
+    with app.app_context():
+        assert db.session.get(Attempt, attempt).Status == 'in_progress'
+    assert submit(client, student_headers, student, attempt, {questions[0]: 2}).status_code == 200
+
+
+def _results(client, headers, student_id, attempt_id):
+    return client.get(f'/api/student/{student_id}/attempt/{attempt_id}/results', headers=headers)
+
+
+def test_results_of_an_open_attempt_are_refused(app, client, exam, student, student_headers):
+    attempt = start_attempt(client, student_headers, student, exam)
+    response = _results(client, student_headers, student, attempt)
+    assert response.status_code == 409
+    assert 'results' not in response.get_json()
+
+
+def test_async_submissions_are_staged_and_graded_in_batches(app, client, exam, student, student_headers):
+    app.config['SUBMISSION_MODE'] = 'async'
+    app.config['GRADING_BATCH_SIZE'] = 2
+    questions = question_ids(app, exam)
+    students = [(student, student_headers)]
+    for n in range(2):
+        other = add_student(app, email=f'other{n}@example.com', password='other-password')
+        students.append((other, login(client, 'student', f'other{n}@example.com', 'other-password')))
+    attempts = []
+    for student_id, headers in students:
+        attempt = start_attempt(client, headers, student_id, exam)
+        response = submit(client, headers, student_id, attempt, {questions[0]: 1, questions[1]: 1})
+        assert response.status_code == 202
+        assert response.get_json()['status'] == 'grading'
+        attempts.append(attempt)
+
+    with app.app_context():
+        staged = PendingSubmission.query.order_by(PendingSubmission.id).all()
+        assert [p.AttemptID for p in staged] == attempts
+        assert json.loads(staged[0].Answers) == {str(questions[0]): 1, str(questions[1]): 1}
+        assert SelectedAnswer.query.count() == 0
+    # Polled before the worker ran: still being graded
+    response = _results(client, student_headers, student, attempts[0])
+    assert response.status_code == 202
+    assert response.get_json()['status'] == 'grading'
+
+    with app.app_context():
+        assert celery_tasks.grade_pending_submissions() == 'Graded 3 pending submissions.'
+        assert PendingSubmission.query.count() == 0
+        # right, wrong: 2 - 1
+        assert [(a.Status, a.Marks) for a in Attempt.query.order_by(Attempt.AttemptID)] == [('completed', 1)] * 3
+
+    response = _results(client, student_headers, student, attempts[0])
+    assert response.status_code == 200
+    assert response.get_json()['score'] == 1
+
+
+def test_async_submissions_with_invalid_answers_are_not_staged(app, client, exam, student, student_headers):
+    app.config['SUBMISSION_MODE'] = 'async'
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+
+    assert submit(client, student_headers, student, attempt, {questions[0]: 5}).status_code == 400
+    assert submit(client, student_headers, student, attempt, {questions[-1] + 1: 1}).status_code == 400
+    with app.app_context():
+        assert PendingSubmission.query.count() == 0
+        assert db.session.get(Attempt, attempt).Status == 'in_progress'
+    assert submit(client, student_headers, student, attempt, {questions[0]: 1}).status_code == 202
+
+
+def _exam_with(app, exam, questions):
+    with app.app_context():
+        chapter_id = db.session.get(Exam, exam).ChapterID
+        other = Exam(ExamName=f'Long {questions}', TotalMarks=2 * questions, TotalQuestions=questions, TotalDuration=60,
+                     ExamDate=datetime(2026, 1, 1), ChapterID=chapter_id, Published=True)
+        db.session.add(other)
+        db.session.flush()
+        db.session.add_all([Question(ExamID=other.ExamID, QuestionStatement=f'Question {i}', Option1='a', Option2='b',
+                                     CorrectOption=1, Marks=2, NegMarks=1) for i in range(questions)])
+        db.session.commit()
+        return other.ExamID
+
+
+def test_submitted_answer_rows_are_written_in_one_statement(app, client, exam, student, student_headers):
+    app.config['ANSWER_STORAGE'] = 'rows'
+    counts = {}
+    for questions in (50, 100, 200):
+        exam_id = _exam_with(app, exam, questions)
+        attempt = start_attempt(client, student_headers, student, exam_id)
+        answers = {question_id: 1 for question_id in question_ids(app, exam_id)}
+        with captured_statements(app) as statements:
+            response = submit(client, student_headers, student, attempt, answers)
+        assert response.status_code == 200
+        assert response.get_json()['score'] == 2 * questions
+        inserts = [statement for statement in statements if statement.startswith('INSERT INTO selected_answer')]
+        assert len(inserts) == 1
+        counts[questions] = len(statements)
+        with app.app_context():
+            assert SelectedAnswer.query.filter_by(AttemptID=attempt).count() == questions
+    # The statements a submit costs do not grow with the exam
+    assert len(set(counts.values())) == 1, counts
+
+
+def _loop_score(key, selected):
+    # The per-question loop submit_exam graded with before the answer key was compiled
+    total = 0
+    for question_id, option in zip(key.question_ids.tolist(), selected.tolist()):
+        if option == UNANSWERED:
+            continue
+        position = key.index[question_id]
+        if key.correct[position] == option:
+            total += int(key.marks[position])
+        else:
+            total -= abs(int(key.neg_marks[position]))
+    return total
+
+
+def test_vectorized_scores_match_the_per_question_loop():
+    rng = np.random.default_rng(2)
+    questions = 200
+    key = AnswerKey(1, 1, list(range(1000, 1000 + questions)), rng.integers(1, 5, questions),
+                    rng.integers(1, 5, questions), rng.integers(0, 3, questions), [4] * questions)
+    selected = rng.integers(UNANSWERED, 5, (300, questions)).astype(np.int8)
+    selected[selected == 0] = UNANSWERED
+
+    assert key.score_batch(selected).tolist() == [_loop_score(key, row) for row in selected]
+    assert [key.score(row) for row in selected[:10]] == [_loop_score(key, row) for row in selected[:10]]
+
+
+def test_rescore_costs_the_same_statements_for_any_number_of_attempts(app, exam):
+    app.config['ANSWER_STORAGE'] = 'rows'
+    questions = question_ids(app, exam)
+    counts = {}
+    for attempts in (10, 100):
+        with app.app_context():
+            Attempt.query.delete()
+            db.session.execute(insert(Student), [{
+                'Name': f'Student {n}', 'DOB': datetime(2000, 1, 1), 'Email': f'rescore{attempts}-{n}@example.com',
+                'PasswordHash': '-', 'Degree': 'BSc'
+            } for n in range(attempts)])
+            student_ids = db.session.scalars(db.select(Student.StudentID).filter(Student.Email.like(f'rescore{attempts}-%'))).all()
+            db.session.execute(insert(Attempt), [{
+                'StudentID': student_id, 'ExamID': exam, 'AttemptDate': datetime(2026, 1, 1), 'Marks': 0, 'TotalMarks': 10
+            } for student_id in student_ids])
+            attempt_ids = db.session.scalars(db.select(Attempt.AttemptID)).all()
+            # everyone answers option 1 throughout: right, wrong, right, wrong, right
+            db.session.execute(insert(SelectedAnswer), [{
+                'AttemptID': attempt_id, 'QuestionID': question_id, 'SelectedOption': 1
+            } for attempt_id in attempt_ids for question_id in questions])
+            db.session.commit()
+
+            exam_row = db.session.get(Exam, exam)
+            # Loaded once per exam version, not per rescore
+            get_answer_key(exam_row)
+            with captured_statements(app) as statements:
+                assert rescore_exam(exam_row) == attempts
+            counts[attempts] = len(statements)
+            assert {attempt.Marks for attempt in Attempt.query} == {4}
+    assert counts[10] == counts[100], counts
@@ -0,0 +1,21 @@
+from conftest import start_attempt, submit, question_ids
+
+
+def test_item_analysis_reports_option_frequencies(app, client, exam, student, student_headers, admin_headers):
+    questions = question_ids(app, exam)
+    for option in (1, 1, 2):
+        attempt = start_attempt(client, student_headers, student, exam)
+        submit(client, student_headers, student, attempt, {questions[0]: option})
+
+    assert client.post(f'/api/admin/exams/{exam}/item-analysis', headers=admin_headers).status_code == 202
+    response = client.get(f'/api/admin/exams/{exam}/item-analysis', headers=admin_headers)
+    assert response.status_code == 200
+    first = response.get_json()['items'][0]
+    assert first['Responses'] == 3
+    assert first['PValue'] == 2 / 3
+    assert first['OptionFrequencies']['2'] == 1 / 3
+
+
+def test_item_analysis_requires_an_admin(client, exam, student_headers):
+    assert client.post(f'/api/admin/exams/{exam}/item-analysis').status_code == 401
+    assert client.get(f'/api/admin/exams/{exam}/item-analysis', headers=student_headers).status_code == 403
@@ -0,0 +1,31 @@
+from conftest import add_student, login, start_attempt, submit, question_ids
+
+
+def _take(client, headers, student_id, exam_id, answers):
+    attempt = start_attempt(client, headers, student_id, exam_id)
+    submit(client, headers, student_id, attempt, answers)
+
+
+def test_leaderboard_ranks_students_by_best_score(app, client, exam, student, student_headers, admin_headers):
+    questions = question_ids(app, exam)
+    other = add_student(app, email='other@example.com', password='other-password', name='Other')
+    other_headers = login(client, 'student', 'other@example.com', 'other-password')
+    _take(client, student_headers, student, exam, {questions[0]: 1})
+    _take(client, other_headers, other, exam, {questions[0]: 1, questions[1]: 2})
+    _take(client, student_headers, student, exam, {questions[0]: 2})
+
+    response = client.get(f'/api/admin/exams/{exam}/leaderboard?student_id={student}', headers=admin_headers)
+    assert response.status_code == 200
+    board = response.get_json()
+    assert [(entry['name'], entry['marks']) for entry in board['top']] == [('Other', 4), ('Student', 2)]
+    assert board['standing']['rank'] == 2
+
+    response = client.get(f'/api/student/{student}/exam/{exam}/leaderboard', headers=student_headers)
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 2
+
+
+def test_leaderboard_rebuild_requires_an_admin(client, student_headers, admin_headers):
+    assert client.post('/api/admin/leaderboards/rebuild').status_code == 401
+    assert client.post('/api/admin/leaderboards/rebuild', headers=student_headers).status_code == 403
+    assert client.post('/api/admin/leaderboards/rebuild', headers=admin_headers).status_code == 202
@@ -0,0 +1,53 @@
+from app import celery_tasks
+from app.extension import db, mail
+from app.models import Student
+from conftest import add_student, captured_statements
+
+
+def _students(app, count):
+    ids = [add_student(app, email=f'student{n}@example.com', name=f'Student {n}') for n in range(count)]
+    with app.app_context():
+        # Gaps in the ids must not shift or empty a chunk
+        for student_id in ids[1::3]:
+            db.session.delete(db.session.get(Student, student_id))
+        db.session.commit()
+        return [student.Email for student in Student.query.order_by(Student.StudentID)]
+
+
+def test_new_exam_is_announced_to_every_student_once(app, exam):
+    app.config['MAIL_BATCH_SIZE'] = 3
+    emails = _students(app, 10)
+
+    with app.app_context(), mail.record_messages() as outbox:
+        result = celery_tasks.send_new_exam_notification(exam)
+
+    assert len(emails) == 7
+    assert result == "Notification for exam 'Algebra I' queued in 3 batches."
+    assert [message.recipients for message in outbox] == [[email] for email in emails]
+    assert {message.subject for message in outbox} == {'New Quiz Published: Algebra I'}
+
+
+def test_chunks_carry_bounds_not_recipients(app, exam, monkeypatch):
+    app.config['MAIL_BATCH_SIZE'] = 3
+    emails = _students(app, 10)
+    chords = []
+    monkeypatch.setattr(celery_tasks, 'chord', lambda header: chords.append(header) or (lambda callback: None))
+
+    with app.app_context(), captured_statements(app) as statements:
+        celery_tasks.send_new_exam_notification(exam)
+    # Recipients are only read by the batch tasks
+    assert not any('"Email"' in statement for statement in statements)
+
+    (header,) = chords
+    with app.app_context():
+        chunks = [
+            [student.Email for student in Student.query.filter(Student.StudentID > after_id, Student.StudentID <= last_id)
+                                                       .order_by(Student.StudentID)]
+            for after_id, last_id, subject, body in (signature.args for signature in header)
+        ]
+    assert chunks == [emails[:3], emails[3:6], emails[6:]]
+
+
+def test_nobody_to_notify(app, exam):
+    with app.app_context():
+        assert celery_tasks.send_new_exam_notification(exam) == "No students to notify."
@@ -0,0 +1,121 @@
+from datetime import datetime
+from sqlalchemy import func, insert, text
+from app import packed_answers
+from app.extension import db
+from app.grading import UNANSWERED, get_answer_key
+from app.models import AnswerLayout, Attempt, Exam, Question, SelectedAnswer
+from conftest import start_attempt, submit, question_ids
+
+
+def _results(client, headers, student_id, attempt_id):
+    response = client.get(f'/api/student/{student_id}/attempt/{attempt_id}/results', headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_pack_and_unpack_round_trip(app, exam):
+    with app.app_context():
+        key = get_answer_key(db.session.get(Exam, exam))
+        selected = key.selection({int(key.question_ids[0]): 2, int(key.question_ids[3]): 4})
+        packed = packed_answers.pack(selected)
+        assert len(packed) == len(key)
+        assert packed_answers.unpack(packed, key.version, key).tolist() == [2, UNANSWERED, UNANSWERED, 4, UNANSWERED]
+
+
+def test_layout_is_cached_only_once_its_row_is_committed(app, exam):
+    with app.app_context():
+        key = get_answer_key(db.session.get(Exam, exam))
+        layout_key = (key.exam_id, key.version)
+        packed_answers.ensure_layout(key)
+        assert layout_key not in packed_answers._layouts
+        db.session.rollback()
+        assert layout_key not in packed_answers._layouts
+        assert db.session.get(AnswerLayout, layout_key) is None
+
+        packed_answers.ensure_layout(key)
+        db.session.commit()
+        assert layout_key in packed_answers._layouts
+        assert db.session.get(AnswerLayout, layout_key) is not None
+
+
+def test_packed_answers_follow_their_questions_across_exam_edits(app, client, exam, student, student_headers, admin_headers):
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+    submit(client, student_headers, student, attempt, {questions[0]: 1, questions[2]: 2, questions[3]: 2})
+
+    with app.app_context():
+        # A question is removed and another added in front of the answered ones' positions
+        db.session.delete(db.session.get(Question, questions[2]))
+        db.session.add(Question(ExamID=exam, QuestionStatement='Question 6', Option1='a', Option2='b',
+                                CorrectOption=1, Marks=2, NegMarks=1))
+        db.session.get(Exam, exam).Version += 1
+        db.session.commit()
+    packed_answers._layouts.clear()
+
+    answers = {row['QuestionStatement']: row['YourAnswer'] for row in _results(client, student_headers, student, attempt)['results']}
+    assert answers == {'Question 1': 1, 'Question 2': -1, 'Question 4': 2, 'Question 5': -1, 'Question 6': -1}
+
+    assert client.post(f'/api/admin/exams/{exam}/rescore', headers=admin_headers).status_code == 202
+    with app.app_context():
+        assert db.session.get(Attempt, attempt).Marks == 4
+
+
+def test_pack_answers_converts_stored_rows(app, client, exam, student, student_headers):
+    questions = question_ids(app, exam)
+    app.config['ANSWER_STORAGE'] = 'rows'
+    attempts = []
+    for answers in ({questions[0]: 1, questions[1]: 1}, {questions[4]: 3}):
+        attempts.append(start_attempt(client, student_headers, student, exam))
+        submit(client, student_headers, student, attempts[-1], answers)
+    before = [_results(client, student_headers, student, attempt) for attempt in attempts]
+
+    app.config['ANSWER_STORAGE'] = 'packed'
+    result = app.test_cli_runner().invoke(args=['pack-answers', '--batch-size', '1'])
+    assert result.output.strip() == 'Packed answers of 2 attempts.'
+    with app.app_context():
+        assert db.session.query(SelectedAnswer).count() == 0
+        assert db.session.query(Attempt).filter(Attempt.PackedAnswers.is_(None)).count() == 0
+    assert [_results(client, student_headers, student, attempt) for attempt in attempts] == before
+
+
+def _database_pages(app):
+    with app.app_context():
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.exec_driver_sql('VACUUM')
+            return connection.exec_driver_sql('PRAGMA page_count').scalar()
+
+
+def test_packed_storage_shrinks_the_database(app, exam, student):
+    """2,000 fully answered attempts of a 100-question exam, stored as rows and then packed."""
+    with app.app_context():
+        chapter_id = db.session.get(Exam, exam).ChapterID
+        big = Exam(ExamName='Long exam', TotalMarks=200, TotalQuestions=100, TotalDuration=120,
+                   ExamDate=datetime(2026, 1, 1), ChapterID=chapter_id, Published=True)
+        db.session.add(big)
+        db.session.flush()
+        db.session.execute(insert(Question), [{
+            'ExamID': big.ExamID, 'QuestionStatement': f'Question {i}', 'Option1': 'a', 'Option2': 'b',
+            'Option3': 'c', 'Option4': 'd', 'CorrectOption': 1, 'Marks': 2, 'NegMarks': 1
+        } for i in range(100)])
+        db.session.execute(insert(Attempt), [{
+            'StudentID': student, 'ExamID': big.ExamID, 'AttemptDate': datetime(2026, 1, 1),
+            'Marks': 0, 'TotalMarks': 200, 'Status': 'completed'
+        } for _ in range(2000)])
+        question_rows = db.session.scalars(db.select(Question.QuestionID).filter_by(ExamID=big.ExamID)).all()
+        attempt_rows = db.session.scalars(db.select(Attempt.AttemptID)).all()
+        db.session.execute(insert(SelectedAnswer), [
+            {'AttemptID': attempt_id, 'QuestionID': question_id, 'SelectedOption': 1 + question_id % 4}
+            for attempt_id in attempt_rows for question_id in question_rows
+        ])
+        db.session.commit()
+        big_id = big.ExamID
+    as_rows = _database_pages(app)
+
+    with app.app_context():
+        assert packed_answers.pack_exam_answers(db.session.get(Exam, big_id), 500) == 2000
+        assert db.session.scalar(text('SELECT sum(length("PackedAnswers")) FROM attempt')) == 2000 * 100
+        assert db.session.scalar(db.select(func.count()).select_from(SelectedAnswer)) == 0
+    as_packed = _database_pages(app)
+
+    # 200,000 SelectedAnswer rows and their index against 200 KB of blobs
+    assert as_packed * 5 < as_rows
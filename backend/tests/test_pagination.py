@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+import pytest
+from app.extension import db
+from app.models import Attempt
+from conftest import captured_statements
+
+
+@pytest.fixture
+def app(replica_app):
+    # Every list view here is marked @read_replica
+    return replica_app
+
+
+@pytest.fixture
+def history(app, exam, student):
+    """Seven attempts, newest first; the first four share one timestamp."""
+    same = datetime(2025, 6, 1, 12, 0)
+    dates = [same] * 4 + [same - timedelta(days=d) for d in (1, 2, 3)]
+    with app.app_context():
+        attempts = [Attempt(StudentID=student, ExamID=exam, AttemptDate=date, Marks=i, TotalMarks=10)
+                    for i, date in enumerate(dates)]
+        db.session.add_all(attempts)
+        db.session.commit()
+        ids = [attempt.AttemptID for attempt in attempts]
+    # Equal timestamps fall back to AttemptID, descending like the date
+    return sorted(ids[:4], reverse=True) + ids[4:]
+
+
+def _pages(client, headers, url, **params):
+    pages, cursor = [], None
+    while True:
+        response = client.get(url, query_string={**params, **({'cursor': cursor} if cursor else {})}, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        pages.append(body)
+        cursor = body['next_cursor']
+        if not cursor:
+            return pages
+
+
+def test_cursor_pages_cover_the_list_once_in_order(client, student, student_headers, history):
+    url = f'/api/student/{student}/history'
+    unpaged = client.get(url, headers=student_headers).get_json()
+    assert [row['attempt_id'] for row in unpaged] == history
+
+    for limit in (1, 2, 3):
+        pages = _pages(client, student_headers, url, limit=limit)
+        assert [len(page['items']) for page in pages[:-1]] == [limit] * (len(pages) - 1)
+        # The cursor carries (AttemptDate, AttemptID), so equal timestamps neither repeat nor drop rows
+        assert [row for page in pages for row in page['items']] == unpaged
+
+
+def test_total_is_counted_on_request(client, student, student_headers, history):
+    url = f'/api/student/{student}/history'
+    first = client.get(url, query_string={'limit': 2}, headers=student_headers).get_json()
+    assert 'total' not in first
+    counted = client.get(url, query_string={'limit': 2, 'count': 'true'}, headers=student_headers).get_json()
+    assert counted['total'] == len(history)
+    later = client.get(url, query_string={'limit': 2, 'count': 'true', 'cursor': counted['next_cursor']},
+                       headers=student_headers).get_json()
+    assert later['total'] == len(history)
+
+
+def test_malformed_cursors_are_rejected(client, student, student_headers, history):
+    url = f'/api/student/{student}/history'
+    for cursor in ('not-a-cursor', 'WzFd'):  # WzFd is [1]: one value for a two-column key
+        response = client.get(url, query_string={'limit': 2, 'cursor': cursor}, headers=student_headers)
+        assert response.status_code == 400
+
+
+def test_streamed_lists_are_read_from_the_replica(app, client, student, student_headers, history):
+    url = f'/api/student/{student}/history'
+    unpaged = client.get(url, headers=student_headers).get_json()
+
+    with captured_statements(app, 'replica') as replica, captured_statements(app) as primary:
+        response = client.get(url, query_string={'stream': 'true'}, headers=student_headers)
+        assert response.is_streamed
+        streamed = response.get_json()
+    assert streamed == unpaged
+    assert any('FROM attempt' in statement for statement in replica)
+    assert not any('FROM attempt' in statement for statement in primary)
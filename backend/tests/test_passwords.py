@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Event, Lock
+from types import SimpleNamespace
+import time
+import pytest
+from app import passwords
+from app.extension import db
+from app.models import Student
+from conftest import login
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    """A one-worker hashing pool with room for one more hash in its queue."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    slots = BoundedSemaphore(2)
+    monkeypatch.setattr(passwords, '_pool', lambda: (executor, slots))
+    yield executor, slots
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def test_login_is_refused_with_503_when_the_hashing_queue_is_full(client, student, small_pool):
+    _, slots = small_pool
+    for _ in range(2):
+        slots.acquire()
+    response = client.post('/api/auth/login', json={
+        'type': 'student', 'email': 'student@example.com', 'password': 'student-password'
+    })
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_timed_out_hash_is_withdrawn_from_the_queue(app, small_pool):
+    release, ran = Event(), []
+    executor, slots = small_pool
+    app.config['PASSWORD_HASH_TIMEOUT'] = 0.05
+    with app.app_context():
+        blocker = executor.submit(release.wait)
+        with pytest.raises(passwords.PasswordServiceBusy):
+            passwords._run(ran.append, 'queued')
+    release.set()
+    blocker.result()
+    executor.shutdown(wait=True)
+    assert ran == []
+    # the withdrawn hash gave its slot back
+    assert slots.acquire(blocking=False) and slots.acquire(blocking=False)
+
+
+def test_cost_is_calibrated_to_the_target_time(app, monkeypatch):
+    app.config.update(BCRYPT_TARGET_MS=250, BCRYPT_MIN_ROUNDS=10, BCRYPT_MAX_ROUNDS=16)
+    expected = {10: 13, 1: 16, 300: 10}  # ms for a cost-8 hash -> chosen cost, clamped
+    with app.app_context():
+        for sample_ms, rounds in expected.items():
+            ticks = iter([0, sample_ms / 1000])
+            monkeypatch.setattr(passwords, 'time', SimpleNamespace(perf_counter=lambda: next(ticks)))
+            assert passwords.calibrate_rounds() == rounds, sample_ms
+
+
+def test_login_upgrades_hashes_made_at_a_lower_cost(app, client, student):
+    with app.app_context():
+        assert passwords.hash_rounds(db.session.get(Student, student).PasswordHash) == 4
+    passwords._rounds = 5
+    login(client, 'student', 'student@example.com', 'student-password')
+    with app.app_context():
+        assert passwords.hash_rounds(db.session.get(Student, student).PasswordHash) == 5
+    # the upgraded hash still logs in
+    login(client, 'student', 'student@example.com', 'student-password')
+
+
+def test_concurrent_logins_hash_on_the_pool_workers_only(app, student, monkeypatch):
+    executor = ThreadPoolExecutor(max_workers=2)
+    slots = BoundedSemaphore(64)
+    monkeypatch.setattr(passwords, '_pool', lambda: (executor, slots))
+    running, peak, lock = [0], [0], Lock()
+    check = passwords.bcrypt.check_password_hash
+
+    def counted_check(pw_hash, password):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        try:
+            time.sleep(0.02)
+            return check(pw_hash, password)
+        finally:
+            with lock:
+                running[0] -= 1
+
+    monkeypatch.setattr(passwords.bcrypt, 'check_password_hash', counted_check)
+    with ThreadPoolExecutor(max_workers=8) as requests:
+        statuses = list(requests.map(lambda _: app.test_client().post('/api/auth/login', json={
+            'type': 'student', 'email': 'student@example.com', 'password': 'student-password'
+        }).status_code, range(16)))
+    executor.shutdown(wait=True)
+    assert statuses == [200] * 16
+    assert peak[0] == 2
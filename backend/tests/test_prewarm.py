@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+import jwt
+from sqlalchemy import insert
+from app import celery_tasks, grading, paper_cache
+from app.extension import db, cache
+from app.models import Attempt, Exam, Student
+from conftest import captured_statements, question_ids, submit
+
+STUDENTS = 1000
+
+
+def _schedule(app, exam_id, minutes):
+    with app.app_context():
+        exam = db.session.get(Exam, exam_id)
+        exam.ExamType = 'specific_time'
+        exam.StartTime = datetime.now() + timedelta(minutes=minutes)
+        db.session.commit()
+
+
+def _forget_local_caches():
+    # What a web worker that never built the paper or answer key itself starts with
+    grading._answer_keys.clear()
+    paper_cache._papers.clear()
+
+
+def _reads_questions(statements):
+    return [s for s in statements if 'FROM question' in s]
+
+
+def test_prewarm_serves_other_workers_from_the_shared_cache(app, client, exam, student, student_headers):
+    _schedule(app, exam, 5)
+    with app.app_context():
+        assert celery_tasks.prewarm_scheduled_exams() == 'Pre-warmed 1 scheduled exams.'
+    _forget_local_caches()
+
+    questions = question_ids(app, exam)
+    with captured_statements(app) as statements:
+        response = client.post(f'/api/student/{student}/exam/{exam}/start', headers=student_headers)
+        assert response.status_code == 201
+        response = submit(client, student_headers, student, response.get_json()['attempt_id'], {questions[0]: 1})
+        assert response.get_json()['score'] == 2
+    assert _reads_questions(statements) == []
+
+
+def test_prewarm_rewrites_what_the_shared_cache_has_dropped(app, exam):
+    _schedule(app, exam, 5)
+    with app.app_context():
+        celery_tasks.prewarm_scheduled_exams()
+        exam_row = db.session.get(Exam, exam)
+        # Expired from the shared cache while this worker's LRU still holds both
+        cache.delete(paper_cache.paper_cache_key(exam_row))
+        cache.delete(grading.answer_key_cache_key(exam_row))
+        celery_tasks.prewarm_scheduled_exams()
+        assert cache.get(paper_cache.paper_cache_key(exam_row)) is not None
+        assert cache.get(grading.answer_key_cache_key(exam_row)) is not None
+
+
+def test_exams_outside_the_lead_window_are_not_prewarmed(app, exam):
+    _schedule(app, exam, 60)
+    with app.app_context():
+        assert celery_tasks.prewarm_scheduled_exams() == 'Pre-warmed 0 scheduled exams.'
+
+
+def test_start_time_spike_of_a_thousand_students(app, client, exam):
+    """
+    Every student of a scheduled exam presses start at once. Those over the admission
+    burst are turned away with a Retry-After, and no start reads the questions.
+    """
+    _schedule(app, exam, 1)
+    app.config.update(ADMISSION_RATE=50, ADMISSION_BURST=100)
+    with app.app_context():
+        db.session.execute(insert(Student), [{
+            'Name': f'Student {i}', 'DOB': datetime(2000, 1, 1), 'Email': f'student{i}@example.com',
+            'PasswordHash': '-', 'Degree': 'BSc'
+        } for i in range(STUDENTS)])
+        db.session.commit()
+        student_ids = db.session.scalars(db.select(Student.StudentID)).all()
+        celery_tasks.prewarm_scheduled_exams()
+    _forget_local_caches()
+
+    admitted, refused = [], 0
+    with captured_statements(app) as statements:
+        for student_id in student_ids:
+            token = jwt.encode({'sub': str(student_id), 'type': 'student'}, app.config['SECRET_KEY'], algorithm='HS256')
+            headers = {'Authorization': f'Bearer {token}'}
+            response = client.post(f'/api/student/{student_id}/exam/{exam}/start', headers=headers)
+            if response.status_code == 429:
+                assert int(response.headers['Retry-After']) >= 1
+                refused += 1
+            else:
+                assert response.status_code == 201
+                admitted.append((student_id, headers, response.get_json()['attempt_id']))
+
+        questions = question_ids(app, exam)
+        for student_id, headers, attempt_id in admitted:
+            assert submit(client, headers, student_id, attempt_id, {questions[0]: 1}).status_code == 200
+
+    assert len(admitted) >= 100 and refused > 0
+    assert len(admitted) + refused == STUDENTS
+    # question_ids() above is the only read of the questions
+    assert len(_reads_questions(statements)) == 1
+    with app.app_context():
+        assert db.session.query(Attempt).filter_by(Status='completed').count() == len(admitted)
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, insert
+from app import celery_tasks
+from app.archive import archive_attempts
+from app.extension import db
+from app.indexes import FULL_SCAN
+from app.models import Attempt, Exam, Question, SelectedAnswer, Student
+from conftest import start_attempt, submit, question_ids
+
+# Tables that grow with every attempt; none of them may be read with a full scan
+HOT_TABLES = {
+    'attempt', 'archived_attempt', 'selected_answer', 'question', 'pending_submission',
+    'question_stat', 'answer_layout', 'student_rollup', 'student_subject_rollup',
+}
+STUDENTS = 40
+
+
+@pytest.fixture
+def seeded(app, client, exam, student, student_headers):
+    """Three exams, each answered by every student, a quarter of the attempts archived."""
+    with app.app_context():
+        chapter_id = db.session.get(Exam, exam).ChapterID
+        exam_ids = [exam]
+        for n in (2, 3):
+            other = Exam(ExamName=f'Algebra {n}', TotalMarks=10, TotalQuestions=5, TotalDuration=30,
+                         ExamDate=datetime(2026, 1, n), ChapterID=chapter_id, Published=True)
+            db.session.add(other)
+            db.session.flush()
+            db.session.execute(insert(Question), [{
+                'ExamID': other.ExamID, 'QuestionStatement': f'Question {i}', 'Option1': 'a', 'Option2': 'b',
+                'CorrectOption': 1, 'Marks': 2, 'NegMarks': 1
+            } for i in range(5)])
+            exam_ids.append(other.ExamID)
+        db.session.execute(insert(Student), [{
+            'Name': f'Student {i}', 'DOB': datetime(2000, 1, 1), 'Email': f'student{i}@example.com',
+            'PasswordHash': '-', 'Degree': 'BSc'
+        } for i in range(STUDENTS)])
+        db.session.commit()
+        student_ids = db.session.scalars(db.select(Student.StudentID).filter(Student.StudentID != student)).all()
+        db.session.execute(insert(Attempt), [{
+            'StudentID': student_id, 'ExamID': exam_id, 'AttemptDate': datetime(2025, 1, 1) + timedelta(days=i),
+            'Marks': 0, 'TotalMarks': 10, 'Status': 'completed'
+        } for i, (student_id, exam_id) in enumerate((s, e) for s in student_ids for e in exam_ids)])
+        db.session.commit()
+        archive_attempts(datetime(2025, 1, 1) + timedelta(days=len(student_ids) * len(exam_ids) // 4), 1000)
+
+    questions = question_ids(app, exam)
+    attempt = start_attempt(client, student_headers, student, exam)
+    submit(client, student_headers, student, attempt, {questions[0]: 1})
+    return exam, attempt
+
+
+def _planned_selects(app, requests):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            statements.append((statement, parameters))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        for request in requests:
+            response = request()
+            # Tasks run alongside requests return their summary instead of a response
+            assert getattr(response, 'status_code', 200) < 400, response.get_json()
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for statement, parameters in statements:
+            plan = cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+            yield statement, [row[-1] for row in plan]
+    finally:
+        connection.close()
+
+
+def _hot_scans(plan):
+    return [match.group(1) for match in map(FULL_SCAN.match, plan) if match and match.group(1) in HOT_TABLES]
+
+
+def _assert_no_hot_scans(app, requests):
+    scans = [
+        f"{', '.join(tables)} in: {statement}"
+        for statement, plan in _planned_selects(app, requests)
+        for tables in [_hot_scans(plan)] if tables
+    ]
+    assert scans == []
+
+
+def test_student_endpoints_use_indexes(app, client, seeded, student, student_headers):
+    exam, attempt = seeded
+    base = f'/api/student/{student}'
+    _assert_no_hot_scans(app, [
+        lambda: client.get(f'{base}/dashboard', headers=student_headers),
+        lambda: client.get(f'{base}/history?archived=true&limit=10', headers=student_headers),
+        lambda: client.get(f'{base}/attempt/{attempt}/results', headers=student_headers),
+        lambda: client.get(f'{base}/exam/{exam}/leaderboard', headers=student_headers),
+        lambda: client.post(f'{base}/exam/{exam}/start', headers=student_headers),
+        lambda: client.get('/api/student/exams', headers=student_headers),
+    ])
+
+
+def test_admin_endpoints_use_indexes(app, client, seeded, admin_headers):
+    exam, attempt = seeded
+    _assert_no_hot_scans(app, [
+        lambda: client.get('/api/admin/dashboard', headers=admin_headers),
+        lambda: client.get(f'/api/admin/exams/{exam}/questions', headers=admin_headers),
+        lambda: client.get(f'/api/admin/exams/{exam}/leaderboard', headers=admin_headers),
+        lambda: client.post(f'/api/admin/exams/{exam}/rescore', headers=admin_headers),
+        lambda: client.post(f'/api/admin/exams/{exam}/item-analysis', headers=admin_headers),
+        lambda: client.get(f'/api/admin/exams/{exam}/item-analysis', headers=admin_headers),
+    ])
+
+
+def test_daily_reminders_use_indexes(app, seeded, monkeypatch):
+    monkeypatch.setattr(celery_tasks.send_email_batch, 'delay', lambda batch: None)
+    with app.app_context():
+        # Two of the seeded exams fall due today; nearly every student has attempted them
+        for exam in Exam.query.order_by(Exam.ExamID).limit(2):
+            exam.ExamDate = datetime.utcnow()
+        db.session.commit()
+
+    def remind():
+        with app.app_context():
+            return celery_tasks.send_daily_reminders()
+
+    # The students are scanned once on purpose; attempts are only probed through their index
+    _assert_no_hot_scans(app, [remind])
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+import tracemalloc
+from sqlalchemy import insert
+from app import celery_tasks
+from app.extension import db
+from app.models import ArchivedAttempt, Attempt, Exam, Student
+from conftest import add_student
+
+
+def _exam(chapter_id, name, date, published=True):
+    exam = Exam(ExamName=name, TotalMarks=10, TotalQuestions=5, TotalDuration=30,
+                ExamDate=date, ChapterID=chapter_id, Published=published)
+    db.session.add(exam)
+    db.session.flush()
+    return exam.ExamID
+
+
+def test_reminders_go_to_students_with_unattempted_exams_due_today(app, exam, monkeypatch):
+    batches = []
+    monkeypatch.setattr(celery_tasks.send_email_batch, 'delay', batches.append)
+    app.config['MAIL_BATCH_SIZE'] = 2
+    attempted = add_student(app, email='attempted@example.com', name='Attempted')
+    archived = add_student(app, email='archived@example.com', name='Archived')
+    idle = add_student(app, email='idle@example.com', name='Idle')
+
+    with app.app_context():
+        now = datetime.utcnow()
+        chapter_id = db.session.get(Exam, exam).ChapterID
+        first = _exam(chapter_id, 'Due First', now)
+        second = _exam(chapter_id, 'Due Second', now)
+        _exam(chapter_id, 'Due Tomorrow', now + timedelta(days=1))
+        _exam(chapter_id, 'Unpublished', now, published=False)
+        db.session.add(Attempt(StudentID=attempted, ExamID=first, AttemptDate=now, Marks=0, TotalMarks=10))
+        for attempt_id, exam_id in ((100, first), (101, second)):
+            db.session.add(ArchivedAttempt(AttemptID=attempt_id, StudentID=archived, ExamID=exam_id, AttemptDate=now,
+                                           Marks=0, TotalMarks=10, PackedAnswers=b'', PackedVersion=1, ArchivedAt=now))
+        db.session.commit()
+
+        result = celery_tasks.send_daily_reminders()
+
+    assert result == 'Queued reminders for 2 exams to 2 students in 1 batches.'
+    (batch,) = batches
+    assert [message['recipient'] for message in batch] == ['attempted@example.com', 'idle@example.com']
+    assert 'Due Second' in batch[0]['body'] and 'Due First' not in batch[0]['body']
+    assert 'Due First, Due Second' in batch[1]['body']
+
+
+def test_no_reminders_without_exams_due_today(app, exam, student, monkeypatch):
+    batches = []
+    monkeypatch.setattr(celery_tasks.send_email_batch, 'delay', batches.append)
+    with app.app_context():
+        assert celery_tasks.send_daily_reminders() == 'No upcoming exams today.'
+    assert batches == []
+
+
+def _peak_reminder_memory(app, students):
+    """Peak Python memory, in bytes, of a reminder run over `students` idle students."""
+    with app.app_context():
+        db.session.execute(insert(Student), [{
+            'Name': f'Student {n}', 'DOB': datetime(2000, 1, 1), 'Email': f'idle{n}@example.com',
+            'PasswordHash': '-', 'Degree': 'BSc'
+        } for n in range(Student.query.count(), students)])
+        db.session.commit()
+        tracemalloc.start()
+        try:
+            assert celery_tasks.send_daily_reminders().endswith(f'to {students} students in {students // 100} batches.')
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+
+def test_reminder_memory_does_not_grow_with_the_students(app, exam, monkeypatch):
+    monkeypatch.setattr(celery_tasks.send_email_batch, 'delay', lambda batch: None)
+    app.config['MAIL_BATCH_SIZE'] = 100
+    with app.app_context():
+        now = datetime.utcnow()
+        chapter_id = db.session.get(Exam, exam).ChapterID
+        _exam(chapter_id, 'Due First', now)
+        _exam(chapter_id, 'Due Second', now)
+        db.session.commit()
+
+    small = _peak_reminder_memory(app, 1000)
+    large = _peak_reminder_memory(app, 10000)
+    # Streamed and dispatched a batch at a time: ten times the students, about the same peak
+    assert large < small * 1.5, (small, large)
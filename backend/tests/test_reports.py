@@ -0,0 +1,29 @@
+from app.reports import export_progress, start_progress
+
+
+def test_bulk_report_export_progress_is_reported_to_its_admin(app, client, student, admin_headers):
+    response = client.post('/api/admin/students/export', headers=admin_headers)
+    assert response.status_code == 202
+    export_id = response.get_json()['export_id']
+
+    # Celery runs eagerly, so the export has finished by now
+    response = client.get(f'/api/admin/students/export/{export_id}', headers=admin_headers)
+    assert response.status_code == 200
+    progress = response.get_json()
+    assert (progress['admin_id'], progress['status'], progress['total'], progress['done']) == (1, 'completed', 1, 1)
+    assert progress['percent'] == 100.0
+
+
+def test_export_progress_is_hidden_from_other_admins(app, client, admin_headers):
+    with app.app_context():
+        start_progress('other-admin', 2)
+        start_progress('no-admin', None)
+        assert export_progress('no-admin')['admin_id'] is None
+    for export_id in ('other-admin', 'no-admin', 'missing'):
+        response = client.get(f'/api/admin/students/export/{export_id}', headers=admin_headers)
+        assert response.status_code == 404
+
+
+def test_export_progress_requires_a_token(client):
+    assert client.post('/api/admin/students/export').status_code == 401
+    assert client.get('/api/admin/students/export/any').status_code == 401
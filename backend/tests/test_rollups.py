@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from app import rollups
+from app.extension import db
+from app.models import Attempt, Exam, Question, ExamRollup, SubjectRollup, StudentRollup, StudentSubjectRollup
+from app.rollups import rebuild_student_rollups
+from conftest import add_student, captured_statements, login, start_attempt, submit, question_ids
+
+
+def _second_exam(app, exam_id):
+    """A one-question exam in the same chapter, worth 3 marks."""
+    with app.app_context():
+        first = db.session.get(Exam, exam_id)
+        exam = Exam(ExamName='Algebra II', TotalMarks=3, TotalQuestions=1, TotalDuration=10,
+                    ExamDate=datetime(2026, 1, 2), ChapterID=first.ChapterID, Published=True)
+        db.session.add(exam)
+        db.session.flush()
+        db.session.add(Question(ExamID=exam.ExamID, QuestionStatement='Only question',
+                                Option1='a', Option2='b', CorrectOption=1, Marks=3, NegMarks=0))
+        db.session.commit()
+        return exam.ExamID
+
+
+def _take(client, headers, student_id, exam_id, answers):
+    attempt = start_attempt(client, headers, student_id, exam_id)
+    response = submit(client, headers, student_id, attempt, answers)
+    return response.get_json()['score']
+
+
+def _totals(row):
+    return (row.AttemptCount, row.MarksSum) if row else (0, 0)
+
+
+def test_rollups_drop_the_attempts_of_a_deleted_exam(app, client, exam, student, student_headers, admin_headers):
+    second = _second_exam(app, exam)
+    first_score = _take(client, student_headers, student, exam, {question_ids(app, exam)[0]: 1})
+    _take(client, student_headers, student, second, {question_ids(app, second)[0]: 1})
+
+    with app.app_context():
+        subject_id = db.session.get(Exam, exam).chapter.SubjectID
+        assert _totals(db.session.get(SubjectRollup, subject_id)) == (2, first_score + 3)
+
+    response = client.delete(f'/api/admin/exams/{second}', headers=admin_headers)
+    assert response.status_code == 200
+
+    with app.app_context():
+        assert _totals(db.session.get(SubjectRollup, subject_id)) == (1, first_score)
+        assert _totals(db.session.get(StudentRollup, student)) == (1, first_score)
+        assert _totals(db.session.get(StudentSubjectRollup, (student, subject_id))) == (1, first_score)
+        assert db.session.get(StudentRollup, student).BestMarks == first_score
+
+
+def test_rollups_drop_the_attempts_of_a_deleted_student(app, client, exam, student, student_headers, admin_headers):
+    questions = question_ids(app, exam)
+    other = add_student(app, email='other@example.com', password='other-password')
+    other_headers = login(client, 'student', 'other@example.com', 'other-password')
+    kept = _take(client, student_headers, student, exam, {questions[0]: 1, questions[1]: 2})
+    _take(client, other_headers, other, exam, {questions[0]: 2})
+
+    response = client.delete(f'/api/admin/students?student_id={other}', headers=admin_headers)
+    assert response.status_code == 200
+
+    with app.app_context():
+        rollup = db.session.get(ExamRollup, exam)
+        assert _totals(rollup) == (1, kept)
+        assert (rollup.MaxMarks, rollup.MinMarks) == (kept, kept)
+        subject_id = db.session.get(Exam, exam).chapter.SubjectID
+        assert _totals(db.session.get(SubjectRollup, subject_id)) == (1, kept)
+
+
+def test_deleting_a_subject_clears_the_student_rollups(app, client, exam, student, student_headers, admin_headers):
+    _take(client, student_headers, student, exam, {question_ids(app, exam)[0]: 1})
+    with app.app_context():
+        subject_id = db.session.get(Exam, exam).chapter.SubjectID
+
+    response = client.delete(f'/api/admin/subjects/{subject_id}', headers=admin_headers)
+    assert response.status_code == 200
+
+    with app.app_context():
+        assert _totals(db.session.get(StudentRollup, student)) == (0, 0)
+        assert db.session.get(StudentSubjectRollup, (student, subject_id)) is None
+
+
+def _seed_attempts(app, exam_id, student_ids, per_student):
+    with app.app_context():
+        db.session.execute(insert(Attempt), [{
+            'StudentID': student_id, 'ExamID': exam_id, 'AttemptDate': datetime(2025, 1, 1) + timedelta(minutes=n),
+            'Marks': n % 11, 'TotalMarks': 10
+        } for student_id in student_ids for n in range(per_student)])
+        rebuild_student_rollups(student_ids)
+        db.session.commit()
+
+
+def test_dashboard_reads_rollups_only(app, client, exam, student, student_headers):
+    url = f'/api/student/{student}/dashboard'
+    seen = {}
+    for attempts in (10, 1000):
+        with app.app_context():
+            Attempt.query.delete()
+            db.session.commit()
+        _seed_attempts(app, exam, [student], attempts)
+        # The first request also loads the caller's principal
+        client.get(url, headers=student_headers)
+        with captured_statements(app) as statements:
+            body = client.get(url, headers=student_headers).get_json()
+        assert body['total_exams'] == attempts
+        assert body['average_score'] == sum(n % 11 for n in range(attempts)) / attempts
+        assert body['highest_score'] == min(attempts - 1, 10)
+        assert not any(f'{clause} attempt' in statement for statement in statements for clause in ('FROM', 'JOIN'))
+        seen[attempts] = len(statements)
+    # The dashboard costs the same whether the student has ten attempts or a thousand
+    assert seen[10] == seen[1000], seen
+
+
+def test_rollup_rebuilds_insert_in_batches(app, exam, monkeypatch):
+    monkeypatch.setattr(rollups, 'ROLLUP_INSERT_BATCH', 4)
+    student_ids = [add_student(app, email=f'batch{n}@example.com') for n in range(10)]
+    _seed_attempts(app, exam, student_ids, 3)
+
+    with app.app_context(), captured_statements(app) as statements:
+        assert rebuild_student_rollups() == 10
+        db.session.commit()
+        assert StudentRollup.query.count() == 10
+        assert StudentSubjectRollup.query.count() == 10
+    inserts = [statement.split('(')[0] for statement in statements if statement.startswith('INSERT')]
+    assert sorted(inserts) == sorted(['INSERT INTO student_rollup ', 'INSERT INTO student_subject_rollup '] * 3)
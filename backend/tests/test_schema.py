@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from app.extension import db
+from app import search
+from app.indexes import ensure_indexes
+from app.schema import create_tables, ensure_columns, execute_ddl
+from app.search import ensure_search_index
+
+
+def test_missing_columns_are_added_with_their_server_default(app, exam):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text('ALTER TABLE exam DROP COLUMN "Version"'))
+        assert ensure_columns() == ['exam.Version']
+        assert db.session.execute(text('SELECT "Version" FROM exam')).scalar() == 1
+        assert ensure_columns() == []
+
+
+def test_ddl_lost_to_a_concurrent_process_is_not_an_error(app):
+    add_version = text('ALTER TABLE exam ADD COLUMN "Version" INTEGER DEFAULT 1 NOT NULL')
+    with app.app_context():
+        assert execute_ddl(add_version, lambda: True) is False
+        with pytest.raises(OperationalError):
+            execute_ddl(add_version, lambda: False)
+
+
+def test_missing_tables_and_indexes_are_created(app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text('DROP TABLE question_stat'))
+            connection.execute(text('DROP INDEX ix_exam_published_date'))
+        create_tables()
+        assert inspect(db.engine).has_table('question_stat')
+        assert sorted(ensure_indexes()) == ['ix_exam_published_date', 'ix_question_stat_ExamID']
+        # a second process starting afterwards finds nothing left to do
+        create_tables()
+        assert ensure_indexes() == []
+
+
+def test_search_index_created_by_another_process_is_used(app, monkeypatch):
+    # The first check misses student_fts, as if another worker created it just after
+    has_fts_table = search._has_fts_table
+    missed = []
+
+    def racing_check(name):
+        if name == 'student' and not missed:
+            missed.append(name)
+            return False
+        return has_fts_table(name)
+
+    monkeypatch.setattr(search, '_has_fts_table', racing_check)
+    with app.app_context():
+        search._fts_ready.clear()
+        ensure_search_index()
+        assert missed == ['student']
+        assert search._fts_ready == set(search.SEARCH_TARGETS)
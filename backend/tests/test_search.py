@@ -0,0 +1,55 @@
+from app import search
+from app.extension import db
+from app.models import Student
+from conftest import add_student
+
+
+def _search(client, headers, term):
+    response = client.get('/api/admin/students', query_string={'search': term}, headers=headers)
+    assert response.status_code == 200, response.get_json()
+    return [student['Name'] for student in response.get_json()]
+
+
+def test_index_follows_inserts_updates_and_deletes(app, client, admin_headers):
+    student_id = add_student(app, email='ada@example.com', name='Ada Lovelace')
+    assert search._fts_ready == set(search.SEARCH_TARGETS)
+    assert _search(client, admin_headers, 'lovelace') == ['Ada Lovelace']
+
+    with app.app_context():
+        db.session.get(Student, student_id).Name = 'Grace Hopper'
+        db.session.commit()
+    assert _search(client, admin_headers, 'lovelace') == []
+    assert _search(client, admin_headers, 'hopper') == ['Grace Hopper']
+
+    with app.app_context():
+        db.session.delete(db.session.get(Student, student_id))
+        db.session.commit()
+    assert _search(client, admin_headers, 'hopper') == []
+
+
+def test_results_are_ordered_by_relevance(app, client, admin_headers):
+    # Inserted least relevant first, so key order and rank order disagree
+    for n, name in enumerate(['Kim Park Lee Moon Choi Han', 'Kim Lee Moon', 'Kim Kim', 'Lee Park']):
+        add_student(app, email=f'student{n}@example.com', name=name)
+    # bm25: more occurrences and shorter names rank higher
+    assert _search(client, admin_headers, 'kim') == ['Kim Kim', 'Kim Lee Moon', 'Kim Park Lee Moon Choi Han']
+
+
+def test_words_match_as_prefixes_only(app, client, admin_headers):
+    add_student(app, email='ada@example.com', name='Ada Lovelace')
+    add_student(app, email='adam@example.com', name='Adam Smith')
+    assert _search(client, admin_headers, 'love') == ['Ada Lovelace']
+    assert _search(client, admin_headers, 'lace') == []
+    assert _search(client, admin_headers, 'ada') == ['Ada Lovelace', 'Adam Smith']
+    # every word has to match, in any order
+    assert _search(client, admin_headers, 'lov ada') == ['Ada Lovelace']
+
+
+def test_substring_search_without_full_text_index(app, client, admin_headers):
+    add_student(app, email='ada@example.com', name='Ada Lovelace')
+    add_student(app, email='adam@example.com', name='Adam Smith')
+    search._fts_ready.clear()
+    assert _search(client, admin_headers, 'lace') == ['Ada Lovelace']
+    assert _search(client, admin_headers, 'ADA') == ['Ada Lovelace', 'Adam Smith']
+    # the whole term is one substring, so word order matters
+    assert _search(client, admin_headers, 'lovelace ada') == []
@@ -168,12 +168,19 @@ export default {
     }
     return apiClient.post(`/student/${studentId}/exam/${examId}/start`);
   },
-  submitExam(attemptId, answers) {
+  submitExam(attemptId, answers, complete = false) {
     const studentId = localStorage.getItem('student_id');
     if (!studentId) {
       return Promise.reject(new Error('Student ID not found. Please log in again.'));
     }
-    return apiClient.post(`/student/${studentId}/attempt/${attemptId}/submit`, { answers });
+    return apiClient.post(`/student/${studentId}/attempt/${attemptId}/submit`, { answers, complete });
+  },
+  autosaveAnswers(attemptId, answers) {
+    const studentId = localStorage.getItem('student_id');
+    if (!studentId) {
+      return Promise.reject(new Error('Student ID not found. Please log in again.'));
+    }
+    return apiClient.patch(`/student/${studentId}/attempt/${attemptId}/answers`, { answers });
   },
   getExamResults(attemptId) {
     const studentId = localStorage.getItem('student_id');